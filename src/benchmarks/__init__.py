@@ -0,0 +1,4 @@
+"""Offline benchmarks of the pipeline's strategies.
+
+Run them with `python -m src.benchmarks` from the repository's root.
+"""
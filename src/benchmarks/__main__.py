@@ -0,0 +1,52 @@
+"""Run the benchmarks and compare them with the saved baseline.
+
+Exits with a non-zero status when a benchmark regressed.
+"""
+
+import argparse
+import json
+import sys
+
+from . import suite
+
+parser = argparse.ArgumentParser(prog="python -m src.benchmarks")
+parser.add_argument(
+    "groups",
+    nargs="*",
+    default=list(suite.BENCHMARKS),
+    help=f"benchmarks to run among {', '.join(suite.BENCHMARKS)}, "
+    "all of them by default",
+)
+parser.add_argument("--repeat", type=int, default=5)
+parser.add_argument("--baseline", default=str(suite.DEFAULT_BASELINE))
+parser.add_argument(
+    "--tolerance",
+    type=float,
+    default=0.2,
+    help="share by which a benchmark may get slower",
+)
+parser.add_argument(
+    "--save",
+    action="store_true",
+    help="save the results as the new baseline",
+)
+arguments = parser.parse_args()
+unknown = set(arguments.groups) - set(suite.BENCHMARKS)
+if unknown:
+    parser.error(f"unknown benchmarks: {', '.join(sorted(unknown))}")
+
+results = suite.run(arguments.groups, repeat=arguments.repeat)
+sys.stdout.write(f"{suite.format_results(results)}\n")
+if "pipeline" in arguments.groups:
+    sys.stdout.write(f"{json.dumps(suite.query_percentiles(), indent=2)}\n")
+
+regressions = suite.find_regressions(
+    results,
+    suite.load_baseline(arguments.baseline),
+    arguments.tolerance,
+)
+for regression in regressions:
+    sys.stderr.write(f"REGRESSION: {regression}\n")
+if arguments.save:
+    suite.save_baseline(results, arguments.baseline)
+sys.exit(1 if regressions else 0)
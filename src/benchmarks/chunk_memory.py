@@ -0,0 +1,131 @@
+"""Measure the memory held by chunks as documents and as a `ChunkBatch`.
+
+A synthetic Markdown corpus is chunked by `StructuralMarkdownChunker`,
+and its chunks are kept either as a list of LangChain documents or in
+a `ChunkBatch`. The memory retained by each is traced with tracemalloc.
+
+Run it with `python -m src.benchmarks.chunk_memory [SIZE ...]`.
+"""
+
+import argparse
+import dataclasses
+import gc
+import json
+import pathlib
+import sys
+import tempfile
+import tracemalloc
+import typing
+from collections.abc import Callable, Iterator
+
+from langchain_core import documents
+
+from src.rag_pipeline import chunk_batches, chunking
+
+from . import corpus
+
+SIZES = (1_000_000, 10_000_000)
+
+
+@dataclasses.dataclass
+class MemoryComparison:
+    """Memory retained by the chunks of one corpus.
+
+    Attributes:
+        size: Size of the corpus in bytes.
+        chunks: Number of chunks.
+        document_bytes: Memory retained by a list of documents.
+        batch_bytes: Memory retained by a `ChunkBatch`.
+    """
+
+    size: int
+    chunks: int
+    document_bytes: int
+    batch_bytes: int
+
+    @property
+    def saving(self) -> float:
+        """Share of the memory the batch saves."""
+        return 1 - self.batch_bytes / self.document_bytes
+
+
+def _retained(build: Callable[[], typing.Any]) -> tuple[int, typing.Any]:
+    gc.collect()
+    tracemalloc.start()
+    try:
+        _result = build()
+        gc.collect()
+        return tracemalloc.get_traced_memory()[0], _result
+    finally:
+        tracemalloc.stop()
+
+
+def _chunks(generated: corpus.Corpus) -> Iterator[documents.Document]:
+    for _path in generated.files["md"]:
+        for _chunk in chunking.StructuralMarkdownChunker(
+            _path,
+            chunk_size=500,
+            chunk_overlap=100,
+        ).lazy_chunk():
+            _chunk.metadata["source"] = str(_path)
+            yield _chunk
+
+
+def compare(size: int, seed: int = 0) -> MemoryComparison:
+    """Chunk a corpus and measure the memory of both representations.
+
+    Args:
+        size: Size of the corpus in bytes.
+        seed: Seed of the corpus. Defaults to 0.
+
+    Returns:
+        The comparison.
+    """
+    with tempfile.TemporaryDirectory() as directory:
+        _corpus = corpus.generate(directory, size, ["md"], seed=seed)
+        _document_bytes, _documents = _retained(
+            lambda: list(_chunks(_corpus)),
+        )
+        _chunk_count = len(_documents)
+        del _documents
+        _batch_bytes, _ = _retained(
+            lambda: chunk_batches.ChunkBatch.from_documents(_chunks(_corpus)),
+        )
+    return MemoryComparison(size, _chunk_count, _document_bytes, _batch_bytes)
+
+
+def main() -> None:
+    """Run the comparison from the command line."""
+    _parser = argparse.ArgumentParser(
+        prog="python -m src.benchmarks.chunk_memory",
+    )
+    _parser.add_argument(
+        "sizes",
+        nargs="*",
+        type=int,
+        default=list(SIZES),
+        help="corpus sizes in bytes",
+    )
+    _parser.add_argument("--seed", type=int, default=0)
+    _parser.add_argument("--output", help="JSON file to save the results to")
+    _arguments = _parser.parse_args()
+
+    _comparisons = [compare(size, _arguments.seed) for size in _arguments.sizes]
+    for _comparison in _comparisons:
+        sys.stdout.write(
+            f"{_comparison.size / 1e6:>8.1f} MB {_comparison.chunks:>9} chunks"
+            f"{_comparison.document_bytes / 1e6:>10.1f} MB as documents"
+            f"{_comparison.batch_bytes / 1e6:>10.1f} MB as a batch"
+            f"{_comparison.saving:>8.0%} saved\n",
+        )
+    if _arguments.output:
+        pathlib.Path(_arguments.output).write_text(
+            json.dumps(
+                [dataclasses.asdict(comparison) for comparison in _comparisons],
+            ),
+            encoding="utf-8",
+        )
+
+
+if __name__ == "__main__":
+    main()
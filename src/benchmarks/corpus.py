@@ -0,0 +1,281 @@
+"""Seeded generator of large synthetic corpora.
+
+The documents imitate the structure of the test resources: prose with
+headers and sections, tables, CSV rows with quoted fields and JSON
+chat logs. The same seed always yields the same bytes, so runs at
+different scales can be compared. Files are written section by
+section, so corpora far larger than memory can be generated.
+"""
+
+import dataclasses
+import html
+import json
+import pathlib
+import random
+import typing
+from collections.abc import Callable, Iterator
+
+FORMATS = ("txt", "md", "html", "csv", "json")
+VOCABULARY = (
+    "market price money capital labor interest rate inflation policy "
+    "government property trade wage profit saving investment credit bank "
+    "production consumer demand supply exchange value calculation economy "
+    "freedom liberty prosperity industry tariff currency gold debt tax "
+    "entrepreneur competition planning socialism intervention growth "
+    "the of and to in a is that for on as by with from this which are"
+)
+WORDS = tuple(VOCABULARY.split())
+FIRST_NAMES = ("John", "Jack", "Stephen", "Mary", "Anna", "Joan", "Peter")
+LAST_NAMES = ("Doe", "McGinnis", "Repici", "Tyler", "Blankman", "Jet")
+STREETS = ("Jefferson St.", "hobo Av.", "Terrace road", "Main St.")
+CITIES = ("Riverside", "Phila", "SomeTown", "Desert City")
+# Share of the sections or rows getting each optional part.
+TABLE_SHARE = 0.2
+CODE_SHARE = 0.1
+NICKNAME_SHARE = 0.1
+SUITE_SHARE = 0.1
+MISSING_NAME_SHARE = 0.05
+STATES = ("NJ", "PA", "SD", "CO")
+
+
+class _Text:
+    """Random prose built from the seeded generator."""
+
+    def __init__(self, rng: random.Random) -> None:
+        self.rng = rng
+
+    def words(self, low: int, high: int) -> str:
+        return " ".join(
+            self.rng.choice(WORDS) for _ in range(self.rng.randint(low, high))
+        )
+
+    def title(self) -> str:
+        return self.words(2, 6).title()
+
+    def sentence(self) -> str:
+        return self.words(6, 24).capitalize() + "."
+
+    def paragraph(self) -> str:
+        return " ".join(self.sentence() for _ in range(self.rng.randint(2, 8)))
+
+    def table(self) -> list[list[str]]:
+        _columns = self.rng.randint(2, 5)
+        return [
+            [self.words(1, 3) for _ in range(_columns)]
+            for _ in range(self.rng.randint(2, 8))
+        ]
+
+
+def _txt_sections(text: _Text) -> Iterator[str]:
+    yield text.title().upper() + "\n\n"
+    while True:
+        yield text.title() + "\n\n"
+        for _ in range(text.rng.randint(1, 5)):
+            yield text.paragraph() + "\n\n"
+
+
+def _md_sections(text: _Text) -> Iterator[str]:
+    yield f"# {text.title()}\n\n"
+    while True:
+        yield f"## {text.title()}\n\n"
+        for _ in range(text.rng.randint(1, 3)):
+            yield f"### {text.title()}\n\n"
+            for _ in range(text.rng.randint(1, 4)):
+                yield text.paragraph() + "\n\n"
+            _roll = text.rng.random()
+            if _roll < TABLE_SHARE:
+                _rows = text.table()
+                yield "| " + " | ".join(_rows[0]) + " |\n"
+                yield "|" + " --- |" * len(_rows[0]) + "\n"
+                for _row in _rows[1:]:
+                    yield "| " + " | ".join(_row) + " |\n"
+                yield "\n"
+            elif _roll < TABLE_SHARE + CODE_SHARE:
+                _code = f"{text.words(3, 10)}\n\n{text.words(3, 10)}"
+                yield f"```\n{_code}\n```\n\n"
+
+
+def _html_sections(text: _Text) -> Iterator[str]:
+    yield (
+        "<!DOCTYPE html>\n<html>\n<head>\n"
+        f"<title>{html.escape(text.title())}</title>\n"
+        f"</head>\n<body>\n<h1>{html.escape(text.title())}</h1>\n"
+    )
+    while True:
+        yield f"<h2>{html.escape(text.title())}</h2>\n"
+        for _ in range(text.rng.randint(1, 3)):
+            yield f"<h3>{html.escape(text.title())}</h3>\n"
+            for _ in range(text.rng.randint(1, 4)):
+                yield f"<p>{html.escape(text.paragraph())}</p>\n"
+            if text.rng.random() < TABLE_SHARE:
+                _rows = text.table()
+                yield "<table>\n"
+                for _row in _rows:
+                    _cells = "".join(
+                        f"<td>{html.escape(cell)}</td>" for cell in _row
+                    )
+                    yield f"<tr>{_cells}</tr>\n"
+                yield "</table>\n"
+
+
+def _html_end() -> str:
+    return "</body>\n</html>\n"
+
+
+def _csv_field(value: str) -> str:
+    if any(character in value for character in ',"\n'):
+        return '"' + value.replace('"', '""') + '"'
+    return value
+
+
+def _csv_sections(text: _Text) -> Iterator[str]:
+    yield "first_name,last_name,address,city,state,zip,note\n"
+    while True:
+        _rng = text.rng
+        _first = _rng.choice(FIRST_NAMES)
+        if _rng.random() < NICKNAME_SHARE:
+            _first = f'{_first} "{_rng.choice(("Da Man", "The Boss"))}"'
+        _address = f"{_rng.randint(1, 9999)} {_rng.choice(STREETS)}"
+        if _rng.random() < SUITE_SHARE:
+            _address += f", Suite {_rng.randint(1, 99)}"
+        _fields = [
+            "" if _rng.random() < MISSING_NAME_SHARE else _first,
+            _rng.choice(LAST_NAMES),
+            _address,
+            _rng.choice(CITIES),
+            f" {_rng.choice(STATES)}",
+            f"{_rng.randint(0, 99999):05d}",
+            text.sentence(),
+        ]
+        yield ",".join(_csv_field(field) for field in _fields) + "\n"
+
+
+def _json_sections(text: _Text) -> Iterator[str]:
+    yield (
+        '{\n    "participants": [\n'
+        '        {"name": "User 1"},\n        {"name": "User 2"}\n'
+        '    ],\n    "messages": [\n'
+    )
+    _timestamp = 1675597571851
+    _separator = ""
+    while True:
+        _timestamp -= text.rng.randint(1_000, 1_000_000)
+        _message = json.dumps(
+            {
+                "sender_name": f"User {text.rng.randint(1, 2)}",
+                "timestamp_ms": _timestamp,
+                "content": text.paragraph(),
+            },
+        )
+        yield f"{_separator}        {_message}"
+        _separator = ",\n"
+
+
+def _json_end() -> str:
+    return "\n    ]\n}\n"
+
+
+_WRITERS: dict[
+    str,
+    tuple[Callable[[_Text], Iterator[str]], Callable[[], str] | None],
+] = {
+    "txt": (_txt_sections, None),
+    "md": (_md_sections, None),
+    "html": (_html_sections, _html_end),
+    "csv": (_csv_sections, None),
+    "json": (_json_sections, _json_end),
+}
+
+
+def write_document(
+    path: str | pathlib.Path,
+    file_format: str,
+    size: int,
+    seed: int = 0,
+) -> int:
+    """Write one synthetic document.
+
+    Args:
+        path: Where to write the document.
+        file_format: One of `FORMATS`.
+        size: Approximate size of the document in bytes. It is
+            exceeded by at most one section.
+        seed: Seed of the generator. Defaults to 0.
+
+    Returns:
+        The number of bytes written.
+    """
+    _sections, _end = _WRITERS[file_format]
+    _written = 0
+    with pathlib.Path(path).open("w", encoding="utf-8", newline="") as file:
+        for _section in _sections(_Text(random.Random(seed))):
+            file.write(_section)
+            _written += len(_section.encode("utf-8"))
+            if _written >= size:
+                break
+        if _end is not None:
+            _tail = _end()
+            file.write(_tail)
+            _written += len(_tail.encode("utf-8"))
+    return _written
+
+
+@dataclasses.dataclass
+class Corpus:
+    """A generated corpus.
+
+    Attributes:
+        directory: Directory holding the documents.
+        files: Paths of the documents, per format.
+        size: Total size of the documents in bytes.
+    """
+
+    directory: pathlib.Path
+    files: dict[str, list[pathlib.Path]]
+    size: int
+
+
+def generate(
+    directory: str | pathlib.Path,
+    size: int,
+    formats: typing.Iterable[str] = FORMATS,
+    file_size: int = 1_000_000,
+    seed: int = 0,
+) -> Corpus:
+    """Generate a corpus of a target size.
+
+    The size is spread over files of `file_size` bytes, assigned to
+    the formats in turn. Every file gets its own seed derived from
+    `seed`, so a larger corpus starts with the files of a smaller one.
+
+    Args:
+        directory: Directory to write the documents to.
+        size: Approximate total size of the corpus in bytes.
+        formats: Formats of the documents. Defaults to all of them.
+        file_size: Approximate size of every document in bytes.
+            Defaults to 1 MB.
+        seed: Seed of the corpus. Defaults to 0.
+
+    Returns:
+        The generated corpus.
+    """
+    _directory = pathlib.Path(directory)
+    _directory.mkdir(parents=True, exist_ok=True)
+    _formats = list(formats)
+    _files: dict[str, list[pathlib.Path]] = {
+        file_format: [] for file_format in _formats
+    }
+    _total = 0
+    _index = 0
+    while _total < size:
+        _format = _formats[_index % len(_formats)]
+        _path = _directory / f"document_{_index:06d}.{_format}"
+        _total += write_document(
+            _path,
+            _format,
+            min(file_size, size - _total),
+            seed * 1_000_003 + _index,
+        )
+        _files[_format].append(_path)
+        _index += 1
+    return Corpus(_directory, _files, _total)
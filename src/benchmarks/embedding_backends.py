@@ -0,0 +1,161 @@
+"""Compare the ONNX int8 embeddings with the PyTorch ones.
+
+Both backends embed the chunks of the test resources. The speedup is
+reported along with how close the vectors stay: the cosine similarity
+of every text's two embeddings, and the share of each chunk's nearest
+neighbours both backends agree on.
+
+Run it with `python -m src.benchmarks.embedding_backends`.
+"""
+
+import argparse
+import dataclasses
+import json
+import os
+import sys
+
+import numpy as np
+
+from src.rag_pipeline import local_embeddings
+
+from . import suite
+
+
+@dataclasses.dataclass
+class Comparison:
+    """Outcome of comparing two embedding backends.
+
+    Attributes:
+        texts: Number of embedded texts.
+        baseline_seconds: Median duration of the PyTorch backend.
+        candidate_seconds: Median duration of the ONNX backend.
+        mean_similarity: Mean cosine similarity of the two embeddings
+            of a text.
+        min_similarity: Lowest cosine similarity of the two embeddings
+            of a text.
+        neighbour_overlap: Share of the nearest neighbours of a text
+            which both backends agree on.
+    """
+
+    texts: int
+    baseline_seconds: float
+    candidate_seconds: float
+    mean_similarity: float
+    min_similarity: float
+    neighbour_overlap: float
+
+    @property
+    def speedup(self) -> float:
+        """How many times faster the ONNX backend is."""
+        return self.baseline_seconds / self.candidate_seconds
+
+
+def _normalize(vectors: list[list[float]]) -> np.ndarray:
+    _array = np.asarray(vectors, dtype=np.float32)
+    return _array / np.linalg.norm(_array, axis=1, keepdims=True)
+
+
+def _neighbours(vectors: np.ndarray, k: int) -> np.ndarray:
+    _similarities = vectors @ vectors.T
+    np.fill_diagonal(_similarities, -np.inf)
+    return np.argsort(-_similarities, axis=1)[:, :k]
+
+
+def compare(
+    texts: list[str],
+    num_threads: int | None = None,
+    batch_size: int = 32,
+    repeat: int = 3,
+    k: int = 5,
+    **kwargs: object,
+) -> Comparison:
+    """Embed the texts with both backends and compare them.
+
+    Args:
+        texts: The texts to embed.
+        num_threads: Number of threads of both backends. Defaults to
+            None, which leaves the choice to the backends.
+        batch_size: Number of texts per inference. Defaults to 32.
+        repeat: Number of runs of each backend. Defaults to 3.
+        k: Number of nearest neighbours to compare. Defaults to 5.
+        kwargs: Key-word arguments to pass to `ONNXEmbeddings`.
+
+    Returns:
+        The comparison.
+    """
+    if num_threads is not None:
+        import torch
+
+        torch.set_num_threads(num_threads)
+    _baseline = local_embeddings.get_embeddings(
+        backend="huggingface",
+        encode_kwargs={"batch_size": batch_size},
+    )
+    _candidate = local_embeddings.get_embeddings(
+        backend="onnx",
+        batch_size=batch_size,
+        num_threads=num_threads,
+        **kwargs,
+    )
+    _baseline_seconds, _baseline_vectors = suite.measure(
+        lambda: _baseline.embed_documents(texts),
+        repeat,
+    )
+    _candidate_seconds, _candidate_vectors = suite.measure(
+        lambda: _candidate.embed_documents(texts),
+        repeat,
+    )
+
+    _expected = _normalize(_baseline_vectors)
+    _actual = _normalize(_candidate_vectors)
+    _similarities = (_expected * _actual).sum(axis=1)
+    _k = min(k, len(texts) - 1)
+    _overlap = [
+        len(set(expected) & set(actual)) / _k
+        for expected, actual in zip(
+            _neighbours(_expected, _k),
+            _neighbours(_actual, _k),
+            strict=True,
+        )
+    ]
+    return Comparison(
+        len(texts),
+        _baseline_seconds,
+        _candidate_seconds,
+        float(_similarities.mean()),
+        float(_similarities.min()),
+        float(np.mean(_overlap)),
+    )
+
+
+def main() -> None:
+    """Run the comparison from the command line."""
+    _parser = argparse.ArgumentParser(
+        prog="python -m src.benchmarks.embedding_backends",
+    )
+    _parser.add_argument("--threads", type=int, default=os.cpu_count())
+    _parser.add_argument("--batch-size", type=int, default=32)
+    _parser.add_argument("--repeat", type=int, default=3)
+    _parser.add_argument(
+        "--no-quantize",
+        action="store_true",
+        help="compare with the full-precision ONNX model",
+    )
+    _arguments = _parser.parse_args()
+
+    _comparison = compare(
+        [chunk.page_content for chunk in suite.chunk_corpus()],
+        _arguments.threads,
+        _arguments.batch_size,
+        _arguments.repeat,
+        quantize=not _arguments.no_quantize,
+    )
+    _report = {
+        **dataclasses.asdict(_comparison),
+        "speedup": _comparison.speedup,
+    }
+    sys.stdout.write(f"{json.dumps(_report, indent=2)}\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+"""Deterministic stand-ins for the models, so benchmarks run offline."""
+
+import typing
+
+from langchain_core import embeddings, language_models, prompts, retrievers
+
+from src.rag_pipeline import generating
+
+EMBEDDING_SIZE = 384
+PROMPT = prompts.ChatPromptTemplate.from_template(
+    "Answer the question based on the context.\n"
+    "Context: {context}\nQuestion: {question}\nAnswer:",
+)
+
+
+def get_embeddings(size: int = EMBEDDING_SIZE) -> embeddings.Embeddings:
+    """Return embeddings derived from a hash of the text.
+
+    Equal texts get equal vectors across runs, at the cost of
+    a hash and a random draw per text.
+
+    Args:
+        size: Dimension of the vectors. Defaults to 384, the size of
+            the sentence-transformers models the pipeline uses.
+
+    Returns:
+        The fake embeddings.
+    """
+    return embeddings.DeterministicFakeEmbedding(size=size)
+
+
+class StubGenerator(generating.BaseGenerator):
+    """Generator answering with a canned response.
+
+    The prompt is still rendered and the context formatted, so only the
+    model's latency is left out of the measurements.
+    """
+
+    @typing.override
+    def __init__(
+        self,
+        retriever: retrievers.BaseRetriever,
+        response: str = "A stubbed answer.",
+    ) -> None:
+        """Instantiate the class.
+
+        Args:
+            retriever: Object capable of retrieving document objects.
+            response: The answer to every query.
+                Defaults to "A stubbed answer.".
+        """
+        super().__init__(
+            retriever,
+            language_models.FakeListLLM(responses=[response]),
+            prompt=PROMPT,
+        )
+
+    @typing.override
+    def generate(self, query: str) -> str:
+        return super().generate(query)
@@ -0,0 +1,276 @@
+"""Measure how ingest and queries scale with the size of the corpus.
+
+For every size, a synthetic corpus is generated and run through
+`RAGPipeline` with fake embeddings and a stub LLM. The duration and
+peak memory of every stage are recorded, giving the time and memory
+curves of the pipeline as the data grows by orders of magnitude.
+
+Run it with `python -m src.benchmarks.scale [SIZE ...]`.
+"""
+
+import argparse
+import dataclasses
+import json
+import pathlib
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+import typing
+from collections.abc import Callable
+
+from langchain_community import document_loaders
+from langchain_core import documents
+
+from src.rag_pipeline import (
+    chunking,
+    loading,
+    persisting,
+    pipeline,
+    retrieving,
+)
+
+from . import corpus, fakes, suite
+
+SIZES = (1_000_000, 10_000_000, 100_000_000)
+LOADER_CLASSES: dict[str, tuple[type, dict[str, typing.Any]]] = {
+    "txt": (document_loaders.TextLoader, {}),
+    "md": (document_loaders.UnstructuredMarkdownLoader, {}),
+    "html": (document_loaders.UnstructuredHTMLLoader, {}),
+    "csv": (document_loaders.CSVLoader, {}),
+    "json": (
+        document_loaders.JSONLoader,
+        {"jq_schema": ".messages[].content", "text_content": False},
+    ),
+}
+
+
+@dataclasses.dataclass
+class ScalePoint:
+    """Measurements of the pipeline at one corpus size.
+
+    Attributes:
+        size: Size of the corpus in bytes.
+        documents: Number of loaded documents.
+        chunks: Number of chunks.
+        seconds: Duration of every stage.
+        peak_bytes: Peak memory allocated by Python during every stage.
+            Empty when memory is not traced.
+        max_rss: Peak resident set size of the process so far, in bytes.
+    """
+
+    size: int
+    documents: int = 0
+    chunks: int = 0
+    seconds: dict[str, float] = dataclasses.field(default_factory=dict)
+    peak_bytes: dict[str, int] = dataclasses.field(default_factory=dict)
+    max_rss: int = 0
+
+
+class CorpusLoader(loading.BaseLoading):
+    """Load every format of a generated corpus."""
+
+    @typing.override
+    def __init__(
+        self,
+        generated: corpus.Corpus,
+        **kwargs: typing.Any,
+    ) -> None:
+        """Instantiate the class.
+
+        Args:
+            generated: The corpus to load.
+            kwargs: Any arguments to pass to every `FileSystemLoader`.
+        """
+        self._loaders = [
+            loading.FileSystemLoader(
+                str(generated.directory),
+                glob=f"*.{file_format}",
+                loader_cls=LOADER_CLASSES[file_format][0],
+                loader_kwargs=LOADER_CLASSES[file_format][1],
+                **kwargs,
+            )
+            for file_format, files in generated.files.items()
+            if files
+        ]
+
+    @typing.override
+    def load(self) -> list[documents.Document]:
+        return [doc for loader in self._loaders for doc in loader.load()]
+
+
+def _max_rss() -> int:
+    _rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports kilobytes, macOS bytes.
+    return _rss if sys.platform == "darwin" else _rss * 1024
+
+
+def _measure[**P, T](
+    point: ScalePoint,
+    stage: str,
+    function: Callable[P, T],
+    *args: P.args,
+    **kwargs: P.kwargs,
+) -> T:
+    if tracemalloc.is_tracing():
+        tracemalloc.reset_peak()
+    _start = time.perf_counter()
+    _result = function(*args, **kwargs)
+    point.seconds[stage] = time.perf_counter() - _start
+    if tracemalloc.is_tracing():
+        point.peak_bytes[stage] = tracemalloc.get_traced_memory()[1]
+    return _result
+
+
+def measure_size(
+    size: int,
+    directory: pathlib.Path,
+    formats: typing.Iterable[str] = corpus.FORMATS,
+    seed: int = 0,
+) -> ScalePoint:
+    """Run the pipeline on a corpus of one size.
+
+    Args:
+        size: Size of the corpus in bytes.
+        directory: Directory to generate the corpus in.
+        formats: Formats of the documents. Defaults to all of them.
+        seed: Seed of the corpus. Defaults to 0.
+
+    Returns:
+        The measurements of every stage.
+    """
+    _point = ScalePoint(size)
+    _corpus = corpus.generate(directory, size, formats, seed=seed)
+    _pipeline = pipeline.RAGPipeline(
+        loader=CorpusLoader(_corpus),
+        chunker=chunking.RecursiveChunker(
+            directory,
+            chunk_size=500,
+            chunk_overlap=100,
+        ),
+        persister=persisting.FAISSStorage(fakes.get_embeddings()),
+    )
+
+    _loaded = _measure(_point, "load", _pipeline.load_documents)
+    _point.documents = len(_loaded)
+    # Passed as arguments, so the inputs are freed once a stage is over.
+    _chunks = _measure(_point, "chunk", _pipeline.chunk_documents, _loaded)
+    _point.chunks = len(_chunks)
+    del _loaded
+    _store = _measure(_point, "persist", _pipeline.persist_documents, _chunks)
+    del _chunks
+
+    _pipeline.retriever = retrieving.StandardRetriever(_store)
+    _pipeline.generator = fakes.StubGenerator(_pipeline.get_retriever())
+    _measure(
+        _point,
+        "query",
+        lambda: [_pipeline.query(query) for query in suite.QUERIES],
+    )
+    _point.seconds["query"] /= len(suite.QUERIES)
+    _point.max_rss = _max_rss()
+    return _point
+
+
+def run(
+    sizes: typing.Iterable[int] = SIZES,
+    formats: typing.Iterable[str] = corpus.FORMATS,
+    *,
+    trace_memory: bool = True,
+    seed: int = 0,
+) -> list[ScalePoint]:
+    """Measure the pipeline at growing corpus sizes.
+
+    Args:
+        sizes: Sizes of the corpora in bytes. Defaults to 1 MB, 10 MB
+            and 100 MB.
+        formats: Formats of the documents. Defaults to all of them.
+        trace_memory: Whether to trace the peak memory of every stage.
+            Tracing slows Python down, so the durations are inflated
+            when it is on. Defaults to True.
+        seed: Seed of the corpora. Defaults to 0.
+
+    Returns:
+        The measurements at every size, in the order of `sizes`.
+    """
+    _formats = list(formats)
+    _points = []
+    if trace_memory:
+        tracemalloc.start()
+    try:
+        for _size in sizes:
+            with tempfile.TemporaryDirectory() as directory:
+                _points.append(
+                    measure_size(
+                        _size,
+                        pathlib.Path(directory),
+                        _formats,
+                        seed,
+                    ),
+                )
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    return _points
+
+
+def format_points(points: list[ScalePoint]) -> str:
+    """Render the measurements as a table, one row per size."""
+    _stages = ("load", "chunk", "persist", "query")
+    _lines = [
+        f"{'MB':>8}{'chunks':>10}"
+        + "".join(f"{stage + ' s':>12}" for stage in _stages)
+        + f"{'peak MB':>10}{'RSS MB':>10}",
+    ]
+    _lines.extend(
+        f"{_point.size / 1e6:>8.1f}{_point.chunks:>10}"
+        + "".join(f"{_point.seconds.get(stage, 0):>12.3f}" for stage in _stages)
+        + f"{max(_point.peak_bytes.values(), default=0) / 1e6:>10.1f}"
+        + f"{_point.max_rss / 1e6:>10.1f}"
+        for _point in points
+    )
+    return "\n".join(_lines)
+
+
+def main() -> None:
+    """Run the scale test from the command line."""
+    _parser = argparse.ArgumentParser(prog="python -m src.benchmarks.scale")
+    _parser.add_argument(
+        "sizes",
+        nargs="*",
+        type=int,
+        default=list(SIZES),
+        help="corpus sizes in bytes",
+    )
+    _parser.add_argument(
+        "--formats",
+        nargs="+",
+        choices=corpus.FORMATS,
+        default=list(corpus.FORMATS),
+    )
+    _parser.add_argument("--seed", type=int, default=0)
+    _parser.add_argument(
+        "--no-trace-memory",
+        action="store_true",
+        help="skip tracemalloc, for undistorted durations",
+    )
+    _parser.add_argument("--output", help="JSON file to save the curves to")
+    _arguments = _parser.parse_args()
+
+    _points = run(
+        _arguments.sizes,
+        _arguments.formats,
+        trace_memory=not _arguments.no_trace_memory,
+        seed=_arguments.seed,
+    )
+    sys.stdout.write(f"{format_points(_points)}\n")
+    if _arguments.output:
+        pathlib.Path(_arguments.output).write_text(
+            json.dumps([dataclasses.asdict(point) for point in _points]),
+            encoding="utf-8",
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,526 @@
+"""Benchmarks of the loaders, chunkers, stores and the whole pipeline.
+
+Every benchmark runs on the test resources with fake embeddings and
+a stub LLM, so the numbers only depend on the code and the machine.
+Results are saved as a JSON baseline, and later runs are compared
+against it to flag regressions.
+"""
+
+import dataclasses
+import json
+import logging
+import pathlib
+import statistics
+import tempfile
+import time
+import typing
+import uuid
+from collections.abc import Callable, Sized
+
+from langchain_community import document_loaders
+from langchain_core import documents
+
+from src.rag_pipeline import (
+    batch_evaluation,
+    chunking,
+    loading,
+    persisting,
+    pipeline,
+    retrieving,
+)
+
+from . import fakes
+
+logger = logging.getLogger(__name__)
+
+RESOURCES = pathlib.Path("src/tests/resources/documents")
+DEFAULT_BASELINE = pathlib.Path("benchmarks/baseline.json")
+QUERIES = (
+    "What role does private property play in economic efficiency?",
+    "How does inflation affect monetary policy?",
+    "Why is economic calculation impossible under socialism?",
+    "What is comparative advantage?",
+    "What are the dangers of central planning?",
+)
+HEADERS = [("h1", "Header 1"), ("h2", "Header 2"), ("h3", "Header 3")]
+MARKDOWN_HEADERS = [("#", "Header 1"), ("##", "Header 2"), ("###", "Header 3")]
+
+
+@dataclasses.dataclass
+class BenchmarkResult:
+    """Outcome of one benchmark.
+
+    Attributes:
+        group: What is measured, such as "load" or "chunk".
+        name: The strategy measured, such as "html" or "recursive".
+        seconds: Median duration of a run.
+        items: Number of documents, chunks or queries per run.
+        bytes: Number of bytes processed per run.
+        error: Why the benchmark could not run, if it could not.
+    """
+
+    group: str
+    name: str
+    seconds: float = 0.0
+    items: int = 0
+    bytes: int = 0
+    error: str | None = None
+
+    @property
+    def key(self) -> str:
+        """Identifier of the benchmark in a baseline."""
+        return f"{self.group}/{self.name}"
+
+    @property
+    def items_per_second(self) -> float:
+        """Throughput in items."""
+        return self.items / self.seconds if self.seconds else 0.0
+
+    @property
+    def bytes_per_second(self) -> float:
+        """Throughput in bytes."""
+        return self.bytes / self.seconds if self.seconds else 0.0
+
+
+def measure[T](function: Callable[[], T], repeat: int = 5) -> tuple[float, T]:
+    """Time a function.
+
+    Args:
+        function: The function to time.
+        repeat: Number of runs. Defaults to 5.
+
+    Returns:
+        The median duration of a run and the result of the last one.
+    """
+    _durations = []
+    for _ in range(repeat):
+        _start = time.perf_counter()
+        _result = function()
+        _durations.append(time.perf_counter() - _start)
+    return statistics.median(_durations), _result
+
+
+def _size(docs: list[documents.Document]) -> int:
+    return sum(len(doc.page_content.encode("utf-8")) for doc in docs)
+
+
+def _run(
+    group: str,
+    name: str,
+    function: Callable[[], Sized],
+    repeat: int,
+    size: Callable[[typing.Any], int] = _size,
+) -> BenchmarkResult:
+    try:
+        _seconds, _result = measure(function, repeat)
+    except Exception as error:
+        logger.warning("Benchmark %s/%s failed.", group, name, exc_info=True)
+        return BenchmarkResult(group, name, error=repr(error))
+    return BenchmarkResult(group, name, _seconds, len(_result), size(_result))
+
+
+def get_loaders(
+    resources: pathlib.Path = RESOURCES,
+) -> dict[str, loading.BaseLoading]:
+    """Return a loader per format, for the resources which exist.
+
+    Args:
+        resources: Directory with the documents to load.
+            Defaults to the test resources.
+
+    Returns:
+        The loaders keyed by format.
+    """
+    _factories: dict[str, tuple[str, Callable[[str], loading.BaseLoading]]] = {
+        "txt": (
+            "economic_policy.txt",
+            lambda _: loading.FileSystemLoader(
+                str(resources),
+                glob="*.txt",
+                loader_cls=document_loaders.TextLoader,
+            ),
+        ),
+        "md": ("economic_policy.md", loading.MarkdownLoader),
+        "md_stream": (
+            "economic_policy.md",
+            lambda path: loading.MarkdownLoader(path, strategy="stream"),
+        ),
+        "html": ("economic_policy.html", loading.HTMLLoader),
+        "html_lxml": (
+            "economic_policy.html",
+            lambda path: loading.HTMLLoader(path, strategy="lxml"),
+        ),
+        "csv": ("addresses.csv", loading.CSVLoader),
+        "json": (
+            "json_example.json",
+            lambda path: loading.JSONLoader(
+                path,
+                jq_schema=".messages[].content",
+                text_content=False,
+            ),
+        ),
+        "pdf": (
+            "Economic Policy Thoughts for Today and Tomorrow.pdf",
+            loading.PDFLoader,
+        ),
+    }
+    return {
+        name: factory(str(resources / file_name))
+        for name, (file_name, factory) in _factories.items()
+        if (resources / file_name).exists()
+    }
+
+
+def get_chunkers(
+    resources: pathlib.Path = RESOURCES,
+) -> dict[str, chunking.BaseChunker]:
+    """Return a chunker per strategy.
+
+    Args:
+        resources: Directory with the documents to chunk.
+            Defaults to the test resources.
+
+    Returns:
+        The chunkers keyed by strategy.
+    """
+    _text = resources / "economic_policy.txt"
+    _html = resources / "economic_policy.html"
+    _markdown = resources / "economic_policy.md"
+    return {
+        "character": chunking.CharacterChunker(
+            _text,
+            chunk_size=500,
+            chunk_overlap=100,
+        ),
+        "recursive": chunking.RecursiveChunker(
+            _text,
+            chunk_size=500,
+            chunk_overlap=100,
+        ),
+        "token": chunking.TokenChunker(
+            _text,
+            chunk_size=128,
+            chunk_overlap=16,
+        ),
+        "html_header": chunking.HTMLHeaderChunker(
+            _html,
+            headers_to_split_on=HEADERS,
+        ),
+        "html_section": chunking.HTMLSectionChunker(
+            _html,
+            headers_to_split_on=HEADERS,
+        ),
+        "html_structural": chunking.StructuralHTMLChunker(
+            _html,
+            chunk_size=500,
+            chunk_overlap=100,
+            headers_to_split_on=HEADERS,
+        ),
+        "markdown_header": chunking.MarkdownHeaderChunker(
+            _markdown,
+            headers_to_split_on=MARKDOWN_HEADERS,
+        ),
+        "markdown_structural": chunking.StructuralMarkdownChunker(
+            _markdown,
+            chunk_size=500,
+            chunk_overlap=100,
+            headers_to_split_on=MARKDOWN_HEADERS,
+        ),
+        "semantic": chunking.SemanticChunker(_text, fakes.get_embeddings()),
+    }
+
+
+def get_storages(
+    directory: pathlib.Path,
+) -> dict[
+    str,
+    tuple[persisting.BaseStorage, Callable[[], dict[str, typing.Any]]],
+]:
+    """Return a storage per backend, with the arguments to store with.
+
+    Args:
+        directory: Where the backends writing to disk may do so.
+
+    Returns:
+        The storages and a function returning the arguments of a
+        `store` call, keyed by backend.
+    """
+    _embedding = fakes.get_embeddings()
+    return {
+        "faiss": (persisting.FAISSStorage(_embedding), dict),
+        "chroma": (
+            persisting.ChromaStorage(_embedding),
+            # A fresh collection per run, so runs do not add up.
+            lambda: {"collection_name": f"benchmark-{uuid.uuid4().hex}"},
+        ),
+        "lance": (
+            persisting.LanceStorage(_embedding),
+            lambda: {"uri": str(directory / "lance"), "mode": "overwrite"},
+        ),
+    }
+
+
+def chunk_corpus(
+    resources: pathlib.Path = RESOURCES,
+) -> list[documents.Document]:
+    """Return the chunks the stores are benchmarked with."""
+    return chunking.RecursiveChunker(
+        resources / "economic_policy.txt",
+        chunk_size=500,
+        chunk_overlap=100,
+    ).chunk()
+
+
+def bench_loaders(
+    resources: pathlib.Path = RESOURCES,
+    repeat: int = 5,
+) -> list[BenchmarkResult]:
+    """Measure the throughput of every loader."""
+    return [
+        _run("load", name, loader.load, repeat)
+        for name, loader in get_loaders(resources).items()
+    ]
+
+
+def bench_chunkers(
+    resources: pathlib.Path = RESOURCES,
+    repeat: int = 5,
+) -> list[BenchmarkResult]:
+    """Measure the throughput of every chunker."""
+    return [
+        _run("chunk", name, chunker.chunk, repeat)
+        for name, chunker in get_chunkers(resources).items()
+    ]
+
+
+def bench_storages(
+    resources: pathlib.Path = RESOURCES,
+    repeat: int = 5,
+) -> list[BenchmarkResult]:
+    """Measure the build and query latency of every store.
+
+    The build is measured as "store/<backend>", the queries as
+    "query/<backend>", with one item per query.
+    """
+    _chunks = chunk_corpus(resources)
+    _results = []
+    with tempfile.TemporaryDirectory() as directory:
+        for name, (storage, kwargs) in get_storages(
+            pathlib.Path(directory),
+        ).items():
+
+            def build(
+                storage: persisting.BaseStorage = storage,
+                kwargs: Callable[[], dict[str, typing.Any]] = kwargs,
+            ) -> list[documents.Document]:
+                storage.store(_chunks, **kwargs())
+                return _chunks
+
+            _build = _run("store", name, build, repeat)
+            _results.append(_build)
+            if _build.error is not None:
+                continue
+            _retriever = storage.vectorstore.as_retriever()
+            _results.append(
+                _run(
+                    "query",
+                    name,
+                    lambda retriever=_retriever: [
+                        retriever.invoke(query) for query in QUERIES
+                    ],
+                    repeat,
+                    lambda answers: sum(map(_size, answers)),
+                ),
+            )
+    return _results
+
+
+def get_pipeline(
+    resources: pathlib.Path = RESOURCES,
+) -> pipeline.RAGPipeline:
+    """Return a pipeline indexing the test resources offline."""
+    _pipeline = pipeline.RAGPipeline(
+        persister=persisting.FAISSStorage(fakes.get_embeddings()),
+    )
+    _store = _pipeline.persist_documents(chunk_corpus(resources))
+    _pipeline.retriever = retrieving.StandardRetriever(_store)
+    _pipeline.generator = fakes.StubGenerator(_pipeline.get_retriever())
+    return _pipeline
+
+
+def bench_pipeline(
+    resources: pathlib.Path = RESOURCES,
+    repeat: int = 5,
+) -> list[BenchmarkResult]:
+    """Measure the end-to-end latency of `RAGPipeline.query`.
+
+    The whole query set is one run; see `query_percentiles` for
+    the latency distribution of single queries.
+    """
+    _pipeline = get_pipeline(resources)
+    return [
+        _run(
+            "pipeline",
+            "query",
+            lambda: [_pipeline.query(query) for query in QUERIES],
+            repeat,
+            lambda results: sum(
+                len(result.answer.encode("utf-8")) for result in results
+            ),
+        ),
+    ]
+
+
+BENCHMARKS: dict[str, Callable[..., list[BenchmarkResult]]] = {
+    "load": bench_loaders,
+    "chunk": bench_chunkers,
+    "store": bench_storages,
+    "pipeline": bench_pipeline,
+}
+
+
+def run(
+    groups: typing.Iterable[str] = BENCHMARKS,
+    resources: pathlib.Path = RESOURCES,
+    repeat: int = 5,
+) -> list[BenchmarkResult]:
+    """Run the benchmarks.
+
+    Args:
+        groups: Benchmarks to run, among the keys of `BENCHMARKS`.
+            Defaults to all of them.
+        resources: Directory with the documents.
+            Defaults to the test resources.
+        repeat: Number of runs of every benchmark. Defaults to 5.
+
+    Returns:
+        The result of every benchmark.
+    """
+    return [
+        result
+        for group in groups
+        for result in BENCHMARKS[group](resources, repeat)
+    ]
+
+
+def save_baseline(
+    results: list[BenchmarkResult],
+    path: str | pathlib.Path = DEFAULT_BASELINE,
+) -> None:
+    """Save the results as the baseline to compare later runs with.
+
+    Args:
+        results: The results to save. Failed benchmarks are left out.
+        path: Path to the JSON file. Defaults to
+            "benchmarks/baseline.json".
+    """
+    _path = pathlib.Path(path)
+    _path.parent.mkdir(parents=True, exist_ok=True)
+    _path.write_text(
+        json.dumps(
+            {
+                result.key: dataclasses.asdict(result)
+                for result in results
+                if result.error is None
+            },
+            indent=2,
+        ),
+        encoding="utf-8",
+    )
+
+
+def load_baseline(
+    path: str | pathlib.Path = DEFAULT_BASELINE,
+) -> dict[str, BenchmarkResult]:
+    """Load a saved baseline.
+
+    Args:
+        path: Path to the JSON file. Defaults to
+            "benchmarks/baseline.json".
+
+    Returns:
+        The results keyed by benchmark, empty if there is no baseline.
+    """
+    _path = pathlib.Path(path)
+    if not _path.exists():
+        return {}
+    return {
+        key: BenchmarkResult(**result)
+        for key, result in json.loads(_path.read_text("utf-8")).items()
+    }
+
+
+def find_regressions(
+    results: list[BenchmarkResult],
+    baseline: dict[str, BenchmarkResult],
+    tolerance: float = 0.2,
+) -> list[str]:
+    """Compare results with a baseline.
+
+    Args:
+        results: Results of the current run.
+        baseline: Results of the baseline run.
+        tolerance: Share by which a benchmark may get slower before
+            it counts as a regression. Defaults to 0.2.
+
+    Returns:
+        A description of every regression.
+    """
+    _regressions = []
+    for _result in results:
+        _previous = baseline.get(_result.key)
+        if _previous is None:
+            continue
+        if _result.error is not None:
+            _regressions.append(f"{_result.key} failed: {_result.error}")
+        elif _result.seconds > _previous.seconds * (1 + tolerance):
+            _regressions.append(
+                f"{_result.key} took {_result.seconds:.4f}s, "
+                f"{_result.seconds / _previous.seconds - 1:.0%} more than "
+                f"the baseline's {_previous.seconds:.4f}s",
+            )
+    return _regressions
+
+
+def format_results(results: list[BenchmarkResult]) -> str:
+    """Render the results as a table."""
+    _lines = [
+        f"{'benchmark':<28}{'seconds':>12}{'items/s':>14}{'MB/s':>10}",
+    ]
+    for _result in results:
+        if _result.error is not None:
+            _lines.append(f"{_result.key:<28}{'failed':>12}")
+            continue
+        _lines.append(
+            f"{_result.key:<28}{_result.seconds:>12.4f}"
+            f"{_result.items_per_second:>14.1f}"
+            f"{_result.bytes_per_second / 1e6:>10.2f}",
+        )
+    return "\n".join(_lines)
+
+
+def query_percentiles(
+    resources: pathlib.Path = RESOURCES,
+    repeat: int = 20,
+) -> dict[str, dict[str, float]]:
+    """Return the latency percentiles of single pipeline queries.
+
+    Args:
+        resources: Directory with the documents.
+            Defaults to the test resources.
+        repeat: Number of times the query set is run. Defaults to 20.
+
+    Returns:
+        Per stage of `RAGPipeline.query`, the percentiles of
+        its latency.
+    """
+    _pipeline = get_pipeline(resources)
+    _latencies: dict[str, list[float]] = {}
+    for _ in range(repeat):
+        for query in QUERIES:
+            for stage, seconds in _pipeline.query(query).latencies.items():
+                _latencies.setdefault(stage, []).append(seconds)
+    return {
+        stage: batch_evaluation.percentiles(values)
+        for stage, values in _latencies.items()
+    }
@@ -4,17 +4,22 @@ import logging
 import pathlib
 
 import dotenv
-import langchain_huggingface
 from langchain_openai import embeddings
 
 from . import (
+    batch_evaluation,
+    caching,
     chunking,
+    clients,
+    deduplicating,
     generating,
     loading,
+    local_embeddings,
     persisting,
     pipeline,
     quality_metrics,
     retrieving,
+    structured_logging,
 )
 
 dotenv.load_dotenv()
@@ -25,12 +30,6 @@ MD_PATH = "/Users/af/Development/thesis/context/src/tests/resources/documents/ec
 HTML_PATH = "/Users/af/Development/thesis/context/src/tests/resources/documents/economic_policy.html"
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(
-    filename="logs/pipeline.log",
-    filemode="w+",
-    encoding="utf-8",
-    level=logging.INFO,
-)
 
 
 def get_text_loader() -> loading.FileSystemLoader:
@@ -117,48 +116,52 @@ def get_quality_metrics(
     output: str,
     context: list[str],
     use_local_LLM: bool = True,
+    cache: caching.LLMCache | None = None,
 ) -> list[quality_metrics.BaseEvaluation]:
     """Return a list of instantiated quality metrics."""
     model = "gpt-4o-mini"
     return [
         quality_metrics.RAGAsEval(query, output, model=model),
         quality_metrics.LLMGraderEval(query, output, model=model),
-        quality_metrics.SelfCheckEval(query, output, use_local_LLM),
-        quality_metrics.LLMJudgeEval(query, output, examiner_model=model),
+        quality_metrics.SelfCheckEval(query, output, use_local_LLM, cache),
+        quality_metrics.LLMJudgeEval(
+            query,
+            output,
+            examiner_model=model,
+            cache=cache,
+        ),
         quality_metrics.ListwiseRerankingEval(
             query,
             context=context,
             output=output,
             model=model,
+            cache=cache,
         ),
     ]
 
 
-def main() -> None:
-    """Launch the pipeline."""
-    queries = [
-        "What role does private property play in promoting economic efficiency and resource allocation?",
-        "Explain the merits of market institutions in contrast to the dangers of government intervention.",
-        "How does Mises clarify the quantity theory of money? What implications does this theory have for inflation and monetary policy?",
-        "According to Mises, why is socialism inherently flawed in terms of economic calculation?",
-        "Explore Mises's views on interest rates and their impact on investment decisions.",
-        "Discuss the concept of comparative advantage and its relevance to free trade.",
-        "Analyze Mises's perspective on inflation.",
-        "Compare and contrast fascism with other economic systems.",
-        "What dangers does Mises highlight regarding industrial policy and central planning? How do these policies affect economic progress?",
-        "Summarize Mises's core message about the relationship between liberty, private property, and prosperity.",
-    ]
-
+def get_pipeline(
+    cache: caching.LLMCache | None = None,
+    embedding_backend: str = "huggingface",
+) -> pipeline.RAGPipeline:
+    """Return a pipeline with the documents indexed and ready to answer."""
     loader = get_text_loader()
     chunker = get_recursive_chunker()
 
-    _pipeline = pipeline.RAGPipeline(loader, chunker)
+    _pipeline = pipeline.RAGPipeline(
+        loader,
+        chunker,
+        deduplicator=deduplicating.Deduplicator(),
+    )
 
     loaded_documents = _pipeline.load_documents()
-    chunked_documents = _pipeline.chunk_documents(loaded_documents)
+    chunked_documents = _pipeline.deduplicate_documents(
+        _pipeline.chunk_documents(loaded_documents),
+    )
     persister = persisting.ChromaStorage(
-        langchain_huggingface.HuggingFaceEmbeddings(
-            model_name="sentence-transformers/all-MiniLM-L6-v2",
+        local_embeddings.get_embeddings(
+            "sentence-transformers/all-MiniLM-L6-v2",
+            embedding_backend,
         ),
     )
 
@@ -170,21 +173,73 @@ def main() -> None:
 
     lc_retriever = _pipeline.get_retriever()
 
-    generator = generating.LLAMAFileGenerator(lc_retriever)
+    generator = generating.LLAMAFileGenerator(lc_retriever, cache=cache)
     _pipeline.generator = generator
+    return _pipeline
+
+
+def evaluate_query_file(
+    query_file: str,
+    output_dir: str = "evaluations",
+) -> dict:
+    """Evaluate the pipeline on every query of a JSON Lines file.
+
+    Args:
+        query_file: Path to the file with one {"query": ...} per line.
+        output_dir: Directory to checkpoint the results to.
+            Defaults to "evaluations".
+
+    Returns:
+        The aggregate scores and latencies.
+    """
+    cache = caching.LLMCache()
+    evaluator = batch_evaluation.BatchEvaluator(
+        get_pipeline(cache),
+        lambda query, output, context: get_quality_metrics(
+            query,
+            output,
+            context,
+            cache=cache,
+        ),
+        output_dir,
+        evaluation_timeout=300,
+    )
+    summary = evaluator.run(query_file)
+    logger.info("LLM client stats: %s", clients.stats())
+    return summary
 
-    for query in queries:
-        context = lc_retriever.invoke(query)
-        logger.info("Context received: %s", context)
 
-        answer = _pipeline.generate_answer(query)
+def main() -> None:
+    """Launch the pipeline."""
+    queries = [
+        "What role does private property play in promoting economic efficiency and resource allocation?",
+        "Explain the merits of market institutions in contrast to the dangers of government intervention.",
+        "How does Mises clarify the quantity theory of money? What implications does this theory have for inflation and monetary policy?",
+        "According to Mises, why is socialism inherently flawed in terms of economic calculation?",
+        "Explore Mises's views on interest rates and their impact on investment decisions.",
+        "Discuss the concept of comparative advantage and its relevance to free trade.",
+        "Analyze Mises's perspective on inflation.",
+        "Compare and contrast fascism with other economic systems.",
+        "What dangers does Mises highlight regarding industrial policy and central planning? How do these policies affect economic progress?",
+        "Summarize Mises's core message about the relationship between liberty, private property, and prosperity.",
+    ]
+
+    cache = caching.LLMCache()
+    _pipeline = get_pipeline(cache)
+
+    for query in queries:
+        result = _pipeline.query(query)
+        structured_logging.log_documents(logger, "retrieved", result.documents)
 
         _pipeline.eveluators = get_quality_metrics(
             query,
-            answer,
-            context=[context[i].page_content for i in range(len(context))],
+            result.answer,
+            context=[document.page_content for document in result.documents],
+            cache=cache,
         )
-        quality = _pipeline.evaluate()
+        quality = _pipeline.evaluate(parallel=True, timeout=300)
 
-        print(answer)
+        print(result.answer)
         print(quality)
+
+    logger.info("LLM client stats: %s", clients.stats())
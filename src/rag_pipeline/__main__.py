@@ -1,5 +1,11 @@
 """The app is run from here."""
 
-from . import main
+import sys
 
-main()
+from . import evaluate_query_file, main, structured_logging
+
+structured_logging.configure()
+if len(sys.argv) > 1:
+    sys.stdout.write(f"{evaluate_query_file(*sys.argv[1:3])}\n")
+else:
+    main()
@@ -0,0 +1,315 @@
+"""Offline evaluation of the pipeline over a set of queries.
+
+Queries are read from a JSON Lines file and answered concurrently.
+Every finished query is checkpointed to disk, so an interrupted run
+picks up where it stopped.
+"""
+
+import concurrent.futures
+import dataclasses
+import hashlib
+import json
+import logging
+import pathlib
+import statistics
+import threading
+import time
+from collections.abc import Callable
+
+from . import pipeline, quality_metrics
+
+logger = logging.getLogger(__name__)
+
+MetricsFactory = Callable[
+    [str, str, list[str]],
+    list[quality_metrics.BaseEvaluation],
+]
+STAGES = ("retrieve", "generate", "evaluate")
+PERCENTILES = (50, 90, 95, 99)
+
+
+@dataclasses.dataclass
+class Query:
+    """A query to evaluate the pipeline on.
+
+    Attributes:
+        query_id: Identifier of the query, stable between runs.
+        query: The question asked by the user.
+    """
+
+    query_id: str
+    query: str
+
+
+@dataclasses.dataclass
+class QueryEvaluation:
+    """Outcome of evaluating the pipeline on one query.
+
+    Attributes:
+        query_id: Identifier of the query.
+        query: The question asked by the user.
+        answer: The answer generated by the pipeline.
+        score: Quality score from 0 to 100.
+        evaluations: Result of every evaluator.
+        latencies: Number of seconds spent in every stage.
+    """
+
+    query_id: str
+    query: str
+    answer: str
+    score: int
+    evaluations: list[pipeline.EvaluationResult]
+    latencies: dict[str, float]
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "QueryEvaluation":
+        """Restore an evaluation from its checkpointed form."""
+        return cls(
+            **{
+                **data,
+                "evaluations": [
+                    pipeline.EvaluationResult(**evaluation)
+                    for evaluation in data["evaluations"]
+                ],
+            },
+        )
+
+
+def read_queries(query_file: str | pathlib.Path) -> list[Query]:
+    """Read the queries from a JSON Lines file.
+
+    Every line holds an object with a "query" and, optionally,
+    an "id". Queries without an id are identified by their hash.
+
+    Args:
+        query_file: Path to the file.
+
+    Returns:
+        The queries in the order of the file.
+    """
+    _queries = []
+    with pathlib.Path(query_file).open(encoding="utf-8") as file:
+        for line in file:
+            if not line.strip():
+                continue
+            _record = json.loads(line)
+            _query = _record["query"]
+            _id = _record.get(
+                "id",
+                hashlib.sha256(_query.encode("utf-8")).hexdigest()[:16],
+            )
+            _queries.append(Query(str(_id), _query))
+    return _queries
+
+
+def percentiles(values: list[float]) -> dict[str, float]:
+    """Summarize latencies by their percentiles.
+
+    Args:
+        values: The latencies.
+
+    Returns:
+        The percentiles and the maximum, keyed as "p50", ..., "max".
+    """
+    if not values:
+        return {}
+    if len(values) == 1:
+        _cuts = values * 99
+    else:
+        _cuts = statistics.quantiles(values, n=100, method="inclusive")
+    return {
+        **{f"p{p}": _cuts[p - 1] for p in PERCENTILES},
+        "max": max(values),
+    }
+
+
+class BatchEvaluator:
+    """Evaluate a pipeline over a query set with bounded concurrency."""
+
+    def __init__(
+        self,
+        rag_pipeline: pipeline.RAGPipeline,
+        metrics_factory: MetricsFactory,
+        output_dir: str | pathlib.Path = "evaluations",
+        max_workers: int = 4,
+        evaluation_timeout: float | None = None,
+    ) -> None:
+        """Instantiate the class.
+
+        Args:
+            rag_pipeline: Pipeline with its retriever and generator set.
+                Queries go through `RAGPipeline.query`, so the
+                evaluators score the context the answer was based on.
+            metrics_factory: Function building the evaluators from
+                the query, the answer and the retrieved context.
+            output_dir: Directory to write the results to.
+                Defaults to "evaluations".
+            max_workers: Number of queries processed at once.
+                Defaults to 4.
+            evaluation_timeout: Number of seconds each evaluator
+                may take. Defaults to None.
+        """
+        self.rag_pipeline = rag_pipeline
+        self.metrics_factory = metrics_factory
+        self.output_dir = pathlib.Path(output_dir)
+        self.max_workers = max_workers
+        self.evaluation_timeout = evaluation_timeout
+        self._lock = threading.Lock()
+
+    @property
+    def results_path(self) -> pathlib.Path:
+        """Path to the checkpoint holding one result per line."""
+        return self.output_dir / "results.jsonl"
+
+    @property
+    def summary_path(self) -> pathlib.Path:
+        """Path to the aggregate scores and latencies."""
+        return self.output_dir / "summary.json"
+
+    def load_results(self) -> list[QueryEvaluation]:
+        """Read the results checkpointed so far.
+
+        A line cut short by an interrupted run is skipped,
+        so its query is evaluated again.
+        """
+        if not self.results_path.exists():
+            return []
+        _results = []
+        with self.results_path.open(encoding="utf-8") as file:
+            for line in file:
+                if not line.strip():
+                    continue
+                try:
+                    _record = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.warning("Skipping a truncated checkpoint line.")
+                    continue
+                _results.append(QueryEvaluation.from_dict(_record))
+        return _results
+
+    def run(self, query_file: str | pathlib.Path) -> dict:
+        """Evaluate the pipeline on every query not evaluated yet.
+
+        Queries which fail are logged and left out of the checkpoint,
+        so they are retried on the next run. A line cut short by an
+        interrupted run is dropped before appending to the checkpoint.
+
+        Args:
+            query_file: Path to a JSON Lines file with the queries.
+
+        Returns:
+            The summary, which is also written to `summary_path`.
+        """
+        self.output_dir.mkdir(parents=True, exist_ok=True)
+        self._drop_partial_line()
+        _done = {result.query_id for result in self.load_results()}
+        _pending = [
+            query
+            for query in read_queries(query_file)
+            if query.query_id not in _done
+        ]
+        logger.info(
+            "%d queries already evaluated, %d to go.",
+            len(_done),
+            len(_pending),
+        )
+        with concurrent.futures.ThreadPoolExecutor(
+            self.max_workers,
+        ) as executor:
+            _futures = {
+                executor.submit(self._evaluate, query): query
+                for query in _pending
+            }
+            for _future in concurrent.futures.as_completed(_futures):
+                try:
+                    self._checkpoint(_future.result())
+                except Exception:
+                    logger.exception(
+                        "Query %s failed.",
+                        _futures[_future].query_id,
+                    )
+        _summary = self.summarize(self.load_results())
+        self.summary_path.write_text(
+            json.dumps(_summary, indent=2),
+            encoding="utf-8",
+        )
+        return _summary
+
+    @staticmethod
+    def summarize(results: list[QueryEvaluation]) -> dict:
+        """Aggregate the scores and latencies of all queries.
+
+        Args:
+            results: Results of the evaluated queries.
+
+        Returns:
+            The number of queries, the mean score, the mean score of
+            every evaluator and the latency percentiles of every stage.
+        """
+        _scores: dict[str, list[float]] = {}
+        for _result in results:
+            for _evaluation in _result.evaluations:
+                if _evaluation.score is not None:
+                    _scores.setdefault(_evaluation.evaluator, []).append(
+                        _evaluation.score,
+                    )
+        return {
+            "queries": len(results),
+            "score": statistics.fmean(result.score for result in results)
+            if results
+            else 0,
+            "evaluators": {
+                evaluator: statistics.fmean(scores)
+                for evaluator, scores in _scores.items()
+            },
+            "latencies": {
+                stage: percentiles(
+                    [
+                        result.latencies[stage]
+                        for result in results
+                        if stage in result.latencies
+                    ],
+                )
+                for stage in STAGES
+            },
+        }
+
+    def _evaluate(self, query: Query) -> QueryEvaluation:
+        _result = self.rag_pipeline.query(query.query)
+        _latencies = dict(_result.latencies)
+
+        _start = time.perf_counter()
+        _evaluations = pipeline.run_evaluations(
+            self.metrics_factory(
+                query.query,
+                _result.answer,
+                [document.page_content for document in _result.documents],
+            ),
+            parallel=True,
+            timeout=self.evaluation_timeout,
+        )
+        _latencies["evaluate"] = time.perf_counter() - _start
+
+        return QueryEvaluation(
+            query.query_id,
+            query.query,
+            _result.answer,
+            pipeline.aggregate_score(_evaluations),
+            _evaluations,
+            _latencies,
+        )
+
+    def _drop_partial_line(self) -> None:
+        if not self.results_path.exists():
+            return
+        with self.results_path.open("rb+") as file:
+            _data = file.read()
+            _end = _data.rfind(b"\n") + 1
+            if _end < len(_data):
+                logger.warning("Dropping a truncated checkpoint line.")
+                file.truncate(_end)
+
+    def _checkpoint(self, result: QueryEvaluation) -> None:
+        with self._lock, self.results_path.open("a", encoding="utf-8") as file:
+            file.write(json.dumps(dataclasses.asdict(result)) + "\n")
+            file.flush()
@@ -0,0 +1,340 @@
+"""A persistent cache for LLM responses.
+
+The cache is shared by the generators and the mad skillz. It is backed
+by SQLite, so answers survive between runs of the pipeline.
+"""
+
+import json
+import pathlib
+import sqlite3
+import threading
+import time
+import typing
+from collections.abc import Callable, Sequence
+
+from langchain_core import caches, language_models, outputs
+from langchain_core.load import dumps, loads
+
+from . import clients, identifiers
+
+DEFAULT_PATH = "cache/llm_cache.sqlite3"
+
+
+def hash_prompt(prompt: object) -> str:
+    """Return a stable hash of the fully rendered prompt.
+
+    Args:
+        prompt: A string or a JSON-serializable structure, such as
+            a list of chat messages.
+
+    Returns:
+        A hex digest identifying the prompt.
+    """
+    return identifiers.stable_hash(prompt)
+
+
+class LLMCache(caches.BaseCache):
+    """SQLite-backed cache of LLM responses.
+
+    Entries are keyed by the model, its parameters and a hash of
+    the fully rendered prompt. It implements LangChain's `BaseCache`,
+    so it can be attached to any LangChain model, and it can also wrap
+    arbitrary calls through `get_or_call`.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_PATH,
+        ttl: float | None = None,
+        max_entries: int | None = 10_000,
+        *,
+        cache_nonzero_temperature: bool = False,
+    ) -> None:
+        """Instantiate the class.
+
+        Args:
+            path: Path to the SQLite database. Use ":memory:" for
+                a cache that lives as long as the process.
+                Defaults to "cache/llm_cache.sqlite3".
+            ttl: Number of seconds an entry stays valid.
+                Defaults to None, which means entries never expire.
+            max_entries: Maximum number of entries to keep. The least
+                recently used ones are evicted first. Defaults to 10000.
+            cache_nonzero_temperature: Whether to cache calls sampled
+                with a non-zero temperature. Such calls are expected
+                to differ each time, so they bypass the cache
+                by default.
+        """
+        if path != ":memory:":
+            pathlib.Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.cache_nonzero_temperature = cache_nonzero_temperature
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute(
+                """CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    response TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )""",
+            )
+            self._connection.execute(
+                """CREATE INDEX IF NOT EXISTS responses_accessed_at
+                ON responses (accessed_at)""",
+            )
+
+    @staticmethod
+    def make_key(model: str, prompt: object, **params: object) -> str:
+        """Return the key identifying a call.
+
+        Args:
+            model: Name of the model, or any string describing it.
+            prompt: The fully rendered prompt.
+            params: Parameters the model is called with.
+
+        Returns:
+            A hex digest identifying the call.
+        """
+        return hash_prompt(
+            {
+                "model": model,
+                "params": json.dumps(params, sort_keys=True, default=str),
+                "prompt": hash_prompt(prompt),
+            },
+        )
+
+    def bypasses(self, temperature: float | None) -> bool:
+        """Check whether calls sampled at this temperature skip the cache.
+
+        Args:
+            temperature: Temperature of the call. None means the
+                provider's default, which is assumed to be deterministic.
+
+        Returns:
+            True if the cache must not be used.
+        """
+        return not self.cache_nonzero_temperature and bool(temperature)
+
+    def get(
+        self,
+        model: str,
+        prompt: object,
+        **params: object,
+    ) -> str | None:
+        """Return a cached response.
+
+        Args:
+            model: Name of the model.
+            prompt: The fully rendered prompt.
+            params: Parameters the model is called with.
+
+        Returns:
+            The cached response or None on a miss.
+        """
+        _value = self._select(self.make_key(model, prompt, **params))
+        return None if _value is None else json.loads(_value)
+
+    def put(
+        self,
+        model: str,
+        prompt: object,
+        response: str,
+        **params: object,
+    ) -> None:
+        """Cache a response.
+
+        Args:
+            model: Name of the model.
+            prompt: The fully rendered prompt.
+            response: The model's response.
+            params: Parameters the model is called with.
+        """
+        self._insert(
+            self.make_key(model, prompt, **params),
+            json.dumps(response),
+        )
+
+    def get_or_call(
+        self,
+        call: Callable[[], str],
+        model: str,
+        prompt: object,
+        **params: object,
+    ) -> str:
+        """Return a cached response, calling the model on a miss.
+
+        Args:
+            call: Function performing the actual call.
+            model: Name of the model.
+            prompt: The fully rendered prompt.
+            params: Parameters the model is called with.
+
+        Returns:
+            The model's response.
+        """
+        _temperature = typing.cast("float | None", params.get("temperature"))
+        if self.bypasses(_temperature):
+            return call()
+        _response = self.get(model, prompt, **params)
+        if _response is None:
+            _response = call()
+            self.put(model, prompt, _response, **params)
+        return _response
+
+    @typing.override
+    def lookup(
+        self,
+        prompt: str,
+        llm_string: str,
+    ) -> Sequence[outputs.Generation] | None:
+        _value = self._select(self.make_key(llm_string, prompt))
+        if _value is None:
+            return None
+        return [loads(generation) for generation in json.loads(_value)]
+
+    @typing.override
+    def update(
+        self,
+        prompt: str,
+        llm_string: str,
+        return_val: Sequence[outputs.Generation],
+    ) -> None:
+        self._insert(
+            self.make_key(llm_string, prompt),
+            json.dumps([dumps(generation) for generation in return_val]),
+        )
+
+    @typing.override
+    def clear(self, **kwargs: typing.Any) -> None:
+        with self._lock, self._connection:
+            self._connection.execute("DELETE FROM responses")
+
+    def __len__(self) -> int:
+        """Return the number of cached entries."""
+        with self._lock:
+            return self._connection.execute(
+                "SELECT COUNT(*) FROM responses",
+            ).fetchone()[0]
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            self._connection.close()
+
+    def _select(self, key: str) -> str | None:
+        _now = time.time()
+        with self._lock, self._connection:
+            _row = self._connection.execute(
+                "SELECT response, created_at FROM responses WHERE key = ?",
+                (key,),
+            ).fetchone()
+            if _row is None:
+                return None
+            if self.ttl is not None and _row[1] < _now - self.ttl:
+                self._connection.execute(
+                    "DELETE FROM responses WHERE key = ?",
+                    (key,),
+                )
+                return None
+            self._connection.execute(
+                "UPDATE responses SET accessed_at = ? WHERE key = ?",
+                (_now, key),
+            )
+        return _row[0]
+
+    def _insert(self, key: str, value: str) -> None:
+        _now = time.time()
+        with self._lock, self._connection:
+            self._connection.execute(
+                """INSERT OR REPLACE INTO responses
+                (key, response, created_at, accessed_at)
+                VALUES (?, ?, ?, ?)""",
+                (key, value, _now, _now),
+            )
+            if self.ttl is not None:
+                self._connection.execute(
+                    "DELETE FROM responses WHERE created_at < ?",
+                    (_now - self.ttl,),
+                )
+            if self.max_entries is not None:
+                self._connection.execute(
+                    """DELETE FROM responses WHERE key IN (
+                        SELECT key FROM responses
+                        ORDER BY accessed_at DESC
+                        LIMIT -1 OFFSET ?
+                    )""",
+                    (self.max_entries,),
+                )
+
+
+def attach(
+    llm: language_models.BaseLanguageModel,
+    cache: LLMCache | None,
+) -> language_models.BaseLanguageModel:
+    """Return a copy of the model which uses the cache.
+
+    The original model is left untouched, so shared instances keep
+    their own caching behaviour. The model is returned as is when
+    there is no cache or when its temperature bypasses it.
+
+    Args:
+        llm: The language model to attach the cache to.
+        cache: The cache to use. Defaults to None.
+
+    Returns:
+        The language model using the cache.
+    """
+    if cache is None or cache.bypasses(getattr(llm, "temperature", None)):
+        return llm
+    return llm.copy(update={"cache": cache})
+
+
+def cached_call_openai(
+    cache: LLMCache | None,
+    messages: list[dict[str, str]],
+    model: str | None,
+    temperature: float,
+    **kwargs: object,
+) -> str:
+    """Call OpenAI's chat completions API through the cache.
+
+    The call goes through the shared SDK client of `clients.REGISTRY`,
+    so it reuses the pooled connections and shows in its statistics.
+
+    Args:
+        cache: The cache to use. None disables caching.
+        messages: Chat messages to send.
+        model: Name of the model.
+        temperature: Sampling temperature.
+        kwargs: Key-word arguments to pass to the API, and `is_azure`
+            to talk to Azure OpenAI instead.
+
+    Returns:
+        The model's response.
+    """
+
+    def _call() -> str:
+        _kwargs = dict(kwargs)
+        _client = clients.get_openai_sdk(
+            is_azure=bool(_kwargs.pop("is_azure", False)),
+        )
+        _completion = _client.chat.completions.create(
+            messages=typing.cast("typing.Any", messages),
+            model=str(model),
+            temperature=temperature,
+            **typing.cast("dict[str, typing.Any]", _kwargs),
+        )
+        return _completion.choices[0].message.content or ""
+
+    if cache is None:
+        return _call()
+    return cache.get_or_call(
+        _call,
+        str(model),
+        messages,
+        temperature=temperature,
+        **kwargs,
+    )
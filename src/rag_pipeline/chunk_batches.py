@@ -0,0 +1,202 @@
+"""A memory-compact batch of chunks.
+
+A LangChain `Document` per chunk costs a Python object, a string and
+a metadata dictionary, while most chunks of a corpus share the same
+source and headers. `ChunkBatch` stores chunks in columns instead: the
+text of a chunk is a span of a shared buffer, and its metadata an index
+into a table of distinct, interned dictionaries. Documents are only
+created at the boundaries with LangChain, such as when the chunks are
+embedded and stored.
+"""
+
+import array
+import json
+import sys
+import typing
+from collections.abc import Iterable, Iterator
+
+from langchain_core import documents
+
+ARENA_SIZE = 1 << 20
+"""Number of characters of added texts joined into one buffer."""
+
+
+def _intern(value: object) -> object:
+    return sys.intern(value) if isinstance(value, str) else value
+
+
+def _metadata_key(metadata: dict[str, typing.Any]) -> typing.Hashable:
+    try:
+        # With the types, as 1, 1.0 and True are equal and hash alike.
+        _key = tuple(
+            sorted(
+                (name, type(value), value) for name, value in metadata.items()
+            ),
+        )
+        hash(_key)
+    except TypeError:
+        # Values such as lists are not hashable, but serializable.
+        return json.dumps(metadata, sort_keys=True, default=str)
+    return _key
+
+
+class ChunkBatch:
+    """Chunks stored as columns over shared text buffers.
+
+    Texts are either spans of a source text, added with `add_span`, or
+    copied by `append` into an arena buffer holding many chunks, so no
+    chunk owns a string of its own. Metadata dictionaries are stored
+    once per distinct value, with their keys and string values interned.
+    """
+
+    __slots__ = (
+        "_arena",
+        "_arena_length",
+        "_buffer_ids",
+        "_buffers",
+        "_ends",
+        "_metadata",
+        "_metadata_ids",
+        "_metadata_keys",
+        "_source_ids",
+        "_starts",
+    )
+
+    def __init__(self) -> None:
+        """Instantiate an empty batch."""
+        self._buffers: list[str] = []
+        self._source_ids: dict[int, int] = {}
+        self._arena: list[str] = []
+        self._arena_length = 0
+        self._buffer_ids = array.array("I")
+        self._starts = array.array("q")
+        self._ends = array.array("q")
+        self._metadata: list[dict[str, typing.Any]] = []
+        self._metadata_keys: dict[typing.Hashable, int] = {}
+        self._metadata_ids = array.array("I")
+
+    @classmethod
+    def from_documents(
+        cls,
+        docs: Iterable[documents.Document],
+    ) -> typing.Self:
+        """Build a batch from documents.
+
+        Args:
+            docs: The chunks, such as the ones lazily yielded by
+                a chunker, so they are never all held as documents.
+
+        Returns:
+            The batch.
+        """
+        _batch = cls()
+        for _doc in docs:
+            _batch.append(_doc.page_content, _doc.metadata)
+        return _batch
+
+    def __len__(self) -> int:
+        """Return the number of chunks."""
+        return len(self._starts)
+
+    def __getitem__(self, index: int) -> documents.Document:
+        """Return a chunk as a document."""
+        return documents.Document(
+            page_content=self.text(index),
+            metadata=dict(self.metadata(index)),
+        )
+
+    def __iter__(self) -> Iterator[documents.Document]:
+        """Yield the chunks as documents."""
+        for _index in range(len(self)):
+            yield self[_index]
+
+    def _metadata_id(self, metadata: dict[str, typing.Any]) -> int:
+        _key = _metadata_key(metadata)
+        _id = self._metadata_keys.get(_key)
+        if _id is None:
+            _id = len(self._metadata)
+            self._metadata.append(
+                {
+                    sys.intern(name): _intern(value)
+                    for name, value in metadata.items()
+                },
+            )
+            self._metadata_keys[_key] = _id
+        return _id
+
+    def _flush_arena(self) -> None:
+        if self._arena:
+            self._buffers.append("".join(self._arena))
+            self._arena = []
+            self._arena_length = 0
+
+    def append(self, text: str, metadata: dict[str, typing.Any]) -> None:
+        """Add a chunk, copying its text into the arena.
+
+        Args:
+            text: Content of the chunk.
+            metadata: Metadata of the chunk. It is copied, so it may
+                be modified afterwards.
+        """
+        if self._arena_length >= ARENA_SIZE:
+            self._flush_arena()
+        # The arena becomes the next buffer once flushed.
+        self._buffer_ids.append(len(self._buffers))
+        self._starts.append(self._arena_length)
+        self._ends.append(self._arena_length + len(text))
+        self._metadata_ids.append(self._metadata_id(metadata))
+        self._arena.append(text)
+        self._arena_length += len(text)
+
+    def add_span(
+        self,
+        source: str,
+        start: int,
+        end: int,
+        metadata: dict[str, typing.Any],
+    ) -> None:
+        """Add a chunk which is a span of a source text, without copying.
+
+        Args:
+            source: The text the chunk was split from. It is kept alive
+                by the batch and shared by all its chunks.
+            start: Index of the first character of the chunk.
+            end: Index past the last character of the chunk.
+            metadata: Metadata of the chunk. It is copied, so it may
+                be modified afterwards.
+        """
+        _id = self._source_ids.get(id(source))
+        if _id is None:
+            self._flush_arena()
+            _id = len(self._buffers)
+            self._buffers.append(source)
+            self._source_ids[id(source)] = _id
+        self._buffer_ids.append(_id)
+        self._starts.append(start)
+        self._ends.append(end)
+        self._metadata_ids.append(self._metadata_id(metadata))
+
+    def text(self, index: int) -> str:
+        """Return the content of a chunk."""
+        if self._buffer_ids[index] == len(self._buffers):
+            # The chunk is in the arena, which is not a buffer yet.
+            self._flush_arena()
+        return self._buffers[self._buffer_ids[index]][
+            self._starts[index] : self._ends[index]
+        ]
+
+    def metadata(self, index: int) -> dict[str, typing.Any]:
+        """Return the metadata of a chunk.
+
+        The dictionary is shared with the chunks with the same metadata,
+        so it must not be modified.
+        """
+        return self._metadata[self._metadata_ids[index]]
+
+    def texts(self) -> list[str]:
+        """Return the contents of all chunks, such as to embed them."""
+        return [self.text(index) for index in range(len(self))]
+
+    def to_documents(self) -> list[documents.Document]:
+        """Return the chunks as documents, for LangChain."""
+        return list(self)
@@ -7,14 +7,16 @@ import abc
 import io
 import pathlib
 import typing
+from collections.abc import Iterable, Iterator, Sequence
 
-import langchain_huggingface
 import langchain_text_splitters
 from langchain_core import documents, embeddings
 from langchain_experimental.text_splitter import (
     SemanticChunker as ExperimentalSemanticTextSplitter,
 )
 
+from . import chunk_batches, local_embeddings, markup
+
 
 class BaseChunker(abc.ABC):
     """Abstract base class defining common chunking operations."""
@@ -37,6 +39,22 @@ class BaseChunker(abc.ABC):
         """
 
 
+def _spans(text: str, chunks: Iterable[str]) -> chunk_batches.ChunkBatch:
+    # Chunks are looked for in order, from after the start of the
+    # previous one, as they may overlap. A chunk which is not a span of
+    # the text, such as one joined with another separator, is copied.
+    _batch = chunk_batches.ChunkBatch()
+    _start = 0
+    for _chunk in chunks:
+        _index = text.find(_chunk, _start)
+        if _index < 0:
+            _batch.append(_chunk, {})
+            continue
+        _batch.add_span(text, _index, _index + len(_chunk), {})
+        _start = _index + 1
+    return _batch
+
+
 class CharacterChunker(BaseChunker):
     """Split text based on a character sequence.
 
@@ -56,6 +74,15 @@ class CharacterChunker(BaseChunker):
             text = file.read()
         return self.text_splitter.create_documents([text])
 
+    def chunk_batch(self) -> chunk_batches.ChunkBatch:
+        """Split the data into a batch of spans of the file's text.
+
+        Unlike `chunk`, the chunks do not hold strings of their own.
+        """
+        with self.doc_path.open() as file:
+            text = file.read()
+        return _spans(text, self.text_splitter.split_text(text))
+
 
 class RecursiveChunker(BaseChunker):
     """Recursively split text based on a character sequence.
@@ -76,6 +103,15 @@ class RecursiveChunker(BaseChunker):
             text = file.read()
         return self.text_splitter.create_documents([text])
 
+    def chunk_batch(self) -> chunk_batches.ChunkBatch:
+        """Split the data into a batch of spans of the file's text.
+
+        Unlike `chunk`, the chunks do not hold strings of their own.
+        """
+        with self.doc_path.open() as file:
+            text = file.read()
+        return _spans(text, self.text_splitter.split_text(text))
+
 
 class HTMLHeaderChunker(BaseChunker):
     """Split an HTML document by headers.
@@ -125,6 +161,68 @@ class HTMLSectionChunker(BaseChunker):
         return self.text_splitter.split_text_from_file(io.StringIO(text))
 
 
+class StructuralHTMLChunker(BaseChunker):
+    """Split an HTML document by headers and size in a single pass.
+
+    The document is parsed incrementally by `lxml.etree.iterparse`,
+    and its blocks are packed into chunks as they are parsed, so memory
+    does not grow with the size of the page. Chunks never span two
+    sections, and carry the headers of theirs as metadata.
+    """
+
+    @typing.override
+    def __init__(
+        self,
+        doc_path: pathlib.Path,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 0,
+        headers_to_split_on: Sequence[tuple[str, str]] = markup.HTML_HEADERS,
+        encoding: str | None = None,
+    ) -> None:
+        """Instantiate the class.
+
+        Args:
+            doc_path: Path to the file to chunk.
+            chunk_size: Maximum number of characters of a chunk.
+                Defaults to 1000.
+            chunk_overlap: Maximum number of characters shared by
+                consecutive chunks of a section. Defaults to 0.
+            headers_to_split_on: Tags of the headers to split on, and
+                their metadata names. Defaults to h1 to h3.
+            encoding: Encoding of the file. Defaults to None, which
+                detects it from the document.
+        """
+        super().__init__()
+        if chunk_overlap >= chunk_size:
+            msg = "chunk_overlap must be smaller than chunk_size."
+            raise ValueError(msg)
+        self.doc_path = doc_path
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.headers_to_split_on = headers_to_split_on
+        self.encoding = encoding
+
+    @typing.override
+    def chunk(self) -> list[documents.Document]:
+        return list(self.lazy_chunk())
+
+    def lazy_chunk(self) -> Iterator[documents.Document]:
+        """Yield the chunks as the document is parsed."""
+        for _chunk in markup.iter_chunks(
+            markup.iter_html_blocks(
+                self.doc_path,
+                self.headers_to_split_on,
+                self.encoding,
+            ),
+            self.chunk_size,
+            self.chunk_overlap,
+        ):
+            yield documents.Document(
+                page_content=_chunk.text,
+                metadata=dict(_chunk.headers),
+            )
+
+
 class MarkdownHeaderChunker(BaseChunker):
     """Split a Markdown document.
 
@@ -148,6 +246,64 @@ class MarkdownHeaderChunker(BaseChunker):
         return self.text_splitter.split_text(text)
 
 
+class StructuralMarkdownChunker(BaseChunker):
+    """Split a Markdown document by headers and size in a single pass.
+
+    The document is read line by line while the stack of headers is
+    tracked, and its blocks are packed into chunks bounded in size as
+    they are read. Fenced code and tables are never split. Chunks never
+    span two sections, and carry the headers of theirs as metadata.
+    """
+
+    @typing.override
+    def __init__(
+        self,
+        doc_path: pathlib.Path,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 0,
+        headers_to_split_on: Sequence[tuple[str, str]] = (
+            markup.MARKDOWN_HEADERS
+        ),
+    ) -> None:
+        """Instantiate the class.
+
+        Args:
+            doc_path: Path to the file to chunk.
+            chunk_size: Maximum number of characters of a chunk, unless
+                a code block or a table alone is longer.
+                Defaults to 1000.
+            chunk_overlap: Maximum number of characters shared by
+                consecutive chunks of a section. Defaults to 0.
+            headers_to_split_on: Markers of the headers to split on, and
+                their metadata names. Defaults to "#" to "###".
+        """
+        super().__init__()
+        if chunk_overlap >= chunk_size:
+            msg = "chunk_overlap must be smaller than chunk_size."
+            raise ValueError(msg)
+        self.doc_path = doc_path
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.headers_to_split_on = headers_to_split_on
+
+    @typing.override
+    def chunk(self) -> list[documents.Document]:
+        return list(self.lazy_chunk())
+
+    def lazy_chunk(self) -> Iterator[documents.Document]:
+        """Yield the chunks as the document is read."""
+        with self.doc_path.open(encoding="utf-8") as file:
+            for _chunk in markup.iter_chunks(
+                markup.iter_markdown_blocks(file, self.headers_to_split_on),
+                self.chunk_size,
+                self.chunk_overlap,
+            ):
+                yield documents.Document(
+                    page_content=_chunk.text,
+                    metadata=dict(_chunk.headers),
+                )
+
+
 class SemanticChunker(BaseChunker):
     """Semantically split text.
 
@@ -159,12 +315,24 @@ class SemanticChunker(BaseChunker):
         self,
         doc_path: pathlib.Path,
         embedding_model: embeddings.Embeddings | str,
+        embedding_backend: str = "huggingface",
         **kwargs: typing.Any,
     ) -> None:
+        """Instantiate the class.
+
+        Args:
+            doc_path: Path to the file to chunk.
+            embedding_model: The embeddings or the name of a local model.
+            embedding_backend: Backend running a local model, see
+                `local_embeddings.get_embeddings`.
+                Defaults to "huggingface".
+            kwargs: Any arguments to pass to the wrapped object.
+        """
         super().__init__()
         if isinstance(embedding_model, str):
-            embedding_model = langchain_huggingface.HuggingFaceEmbeddings(
-                model_name=embedding_model,
+            embedding_model = local_embeddings.get_embeddings(
+                embedding_model,
+                embedding_backend,
             )
         self.doc_path = doc_path
         self.text_splitter = ExperimentalSemanticTextSplitter(
@@ -0,0 +1,387 @@
+"""A process-wide registry of pooled LLM clients.
+
+Clients are expensive to construct and each one owns its own HTTP
+connection pool. The registry hands out one shared instance per
+backend and configuration, so generators and evaluators reuse the same
+keep-alive connections.
+"""
+
+import collections
+import dataclasses
+import threading
+import typing
+from collections.abc import Callable, Hashable
+
+import httpx
+import langchain_anthropic
+import langchain_openai
+import openai
+import requests
+from langchain_community.llms import llamafile
+from langchain_core import callbacks, language_models
+from langchain_core import messages as core_messages
+from requests import adapters
+
+
+class PooledLlamafile(llamafile.Llamafile):
+    """Llamafile client which sends its requests through a session.
+
+    LangChain's `Llamafile` opens a new connection for every request.
+    This subclass reuses the connections of the session it was given.
+
+    Attributes:
+        session: Session used to talk to the server.
+            Falls back to a new connection per request if None.
+    """
+
+    session: requests.Session | None = None
+
+    @property
+    @typing.override
+    def _param_fieldnames(self) -> list[str]:
+        # The session is a field, but not a generation option.
+        return [name for name in super()._param_fieldnames if name != "session"]
+
+    @typing.override
+    def _call(
+        self,
+        prompt: str,
+        stop: list[str] | None = None,
+        run_manager: callbacks.CallbackManagerForLLMRun | None = None,
+        **kwargs: typing.Any,
+    ) -> str:
+        if self.streaming or self.session is None:
+            return super()._call(prompt, stop, run_manager, **kwargs)
+        _params = self._get_parameters(stop=stop, **kwargs)
+        try:
+            _response = self.session.post(
+                url=f"{self.base_url}/completion",
+                headers={"Content-Type": "application/json"},
+                json={"prompt": prompt, **_params},
+                stream=False,
+                timeout=self.request_timeout,
+            )
+        except requests.exceptions.ConnectionError as error:
+            msg = (
+                "Could not connect to Llamafile server. Please make sure "
+                f"that a server is running at {self.base_url}."
+            )
+            raise requests.exceptions.ConnectionError(msg) from error
+        _response.raise_for_status()
+        _response.encoding = "utf-8"
+        return _response.json()["content"]
+
+
+@dataclasses.dataclass
+class ClientStats:
+    """Usage statistics of one backend.
+
+    Attributes:
+        created: Number of clients constructed.
+        reused: Number of times an existing client was handed out.
+        requests: Number of requests sent through the shared clients.
+            Anthropic requests are counted per model call.
+        connections: Number of HTTP connections opened by the shared
+            pools. Only known for backends using `requests`.
+    """
+
+    created: int = 0
+    reused: int = 0
+    requests: int = 0
+    connections: int = 0
+
+
+class _RequestCounter(callbacks.BaseCallbackHandler):
+    """Count the calls of a chat model in the registry's statistics."""
+
+    def __init__(self, registry: "ClientRegistry", backend: str) -> None:
+        self.registry = registry
+        self.backend = backend
+
+    @typing.override
+    def on_chat_model_start(
+        self,
+        serialized: dict[str, typing.Any],
+        messages: list[list[core_messages.BaseMessage]],
+        **kwargs: typing.Any,
+    ) -> None:
+        self.registry.count_request(self.backend)
+
+
+def _freeze(kwargs: dict[str, typing.Any]) -> tuple:
+    return tuple(
+        sorted(
+            (key, value if isinstance(value, Hashable) else repr(value))
+            for key, value in kwargs.items()
+        ),
+    )
+
+
+class ClientRegistry:
+    """Registry handing out shared LLM clients.
+
+    One client is constructed per backend and set of arguments.
+    All llamafile clients pointing at the same server share a `requests`
+    session and all OpenAI clients, LangChain's and the SDK's alike,
+    share one `httpx` client.
+    """
+
+    def __init__(self, pool_maxsize: int = 16) -> None:
+        """Instantiate the class.
+
+        Args:
+            pool_maxsize: Maximum number of keep-alive connections
+                per server. Defaults to 16.
+        """
+        self.pool_maxsize = pool_maxsize
+        self._lock = threading.Lock()
+        self._clients: dict[tuple, language_models.BaseLanguageModel] = {}
+        self._stats: collections.defaultdict[str, ClientStats] = (
+            collections.defaultdict(ClientStats)
+        )
+        self._sessions: dict[str, requests.Session] = {}
+        self._http_client: httpx.Client | None = None
+
+    def get_llamafile(self, **kwargs: object) -> PooledLlamafile:
+        """Return a shared llamafile client.
+
+        Args:
+            kwargs: Key-word arguments to pass to the model.
+
+        Returns:
+            The client.
+        """
+
+        def _create() -> PooledLlamafile:
+            _client = PooledLlamafile(**kwargs)
+            _client.session = self.session(_client.base_url)
+            return _client
+
+        return self._get("llamafile", kwargs, _create)
+
+    def get_openai(
+        self,
+        model_name: str = "gpt-4o-mini",
+        **kwargs: object,
+    ) -> langchain_openai.ChatOpenAI:
+        """Return a shared OpenAI chat client.
+
+        Args:
+            model_name: The name of the model to use.
+                Defaults to "gpt-4o-mini".
+            kwargs: Key-word arguments to pass to the model.
+
+        Returns:
+            The client.
+        """
+        return self._get(
+            "openai",
+            {"model": model_name, **kwargs},
+            lambda: langchain_openai.ChatOpenAI(
+                model=model_name,
+                http_client=kwargs.pop("http_client", self.http_client()),
+                **kwargs,
+            ),
+        )
+
+    def get_openai_sdk(self, *, is_azure: bool = False) -> openai.OpenAI:
+        """Return a shared client of the OpenAI SDK.
+
+        It is meant for code calling the chat completions API directly,
+        such as the mad skillz, and uses the same pooled `httpx` client
+        as the LangChain clients.
+
+        Args:
+            is_azure: Whether to talk to Azure OpenAI instead.
+                Defaults to False.
+
+        Returns:
+            The client.
+        """
+        if is_azure:
+            return self._get(
+                "openai",
+                {"sdk": "azure"},
+                lambda: openai.AzureOpenAI(http_client=self.http_client()),
+            )
+        return self._get(
+            "openai",
+            {"sdk": "openai"},
+            lambda: openai.OpenAI(http_client=self.http_client()),
+        )
+
+    def get_anthropic(
+        self,
+        model_name: str = "claude-3-5-sonnet-20240620",
+        **kwargs: object,
+    ) -> langchain_anthropic.ChatAnthropic:
+        """Return a shared Anthropic chat client.
+
+        The Anthropic SDK keeps a connection pool per client,
+        so sharing the client is what keeps the connections alive.
+        Its calls are counted through a callback.
+
+        Args:
+            model_name: The name of the model to use.
+                Defaults to "claude-3-5-sonnet-20240620".
+            kwargs: Key-word arguments to pass to the model.
+
+        Returns:
+            The client.
+        """
+        return self._get(
+            "anthropic",
+            {"model": model_name, **kwargs},
+            lambda: langchain_anthropic.ChatAnthropic(
+                model=model_name,
+                callbacks=[
+                    *typing.cast("list", kwargs.pop("callbacks", None) or []),
+                    _RequestCounter(self, "anthropic"),
+                ],
+                **kwargs,
+            ),
+        )
+
+    def session(self, base_url: str) -> requests.Session:
+        """Return the pooled session used for a server.
+
+        Args:
+            base_url: URL of the server.
+
+        Returns:
+            The session.
+        """
+        with self._lock:
+            if base_url not in self._sessions:
+                _session = requests.Session()
+                _adapter = adapters.HTTPAdapter(
+                    pool_connections=1,
+                    pool_maxsize=self.pool_maxsize,
+                )
+                _session.mount("http://", _adapter)
+                _session.mount("https://", _adapter)
+                self._sessions[base_url] = _session
+            return self._sessions[base_url]
+
+    def http_client(self) -> httpx.Client:
+        """Return the pooled `httpx` client shared by OpenAI clients."""
+        with self._lock:
+            if self._http_client is None:
+                self._http_client = httpx.Client(
+                    limits=httpx.Limits(
+                        max_connections=self.pool_maxsize,
+                        max_keepalive_connections=self.pool_maxsize,
+                    ),
+                    event_hooks={"request": [self._count_openai_request]},
+                )
+            return self._http_client
+
+    def count_request(self, backend: str) -> None:
+        """Record a request sent by a backend.
+
+        Args:
+            backend: Name of the backend.
+        """
+        with self._lock:
+            self._stats[backend].requests += 1
+
+    def stats(self) -> dict[str, ClientStats]:
+        """Return the usage statistics of every backend."""
+        with self._lock:
+            _stats = {
+                backend: dataclasses.replace(stats)
+                for backend, stats in self._stats.items()
+            }
+            _pools = [
+                pool
+                for session in self._sessions.values()
+                for pool in _connection_pools(session)
+            ]
+        if _pools:
+            _llamafile = _stats.setdefault("llamafile", ClientStats())
+            _llamafile.requests = sum(pool.num_requests for pool in _pools)
+            _llamafile.connections = sum(
+                pool.num_connections for pool in _pools
+            )
+        return _stats
+
+    def close(self) -> None:
+        """Close all pooled connections and forget the clients."""
+        with self._lock:
+            for _session in self._sessions.values():
+                _session.close()
+            if self._http_client is not None:
+                self._http_client.close()
+            self._sessions.clear()
+            self._http_client = None
+            self._clients.clear()
+            self._stats.clear()
+
+    def _get[T](
+        self,
+        backend: str,
+        kwargs: dict[str, typing.Any],
+        create: Callable[[], T],
+    ) -> T:
+        _key = (backend, _freeze(kwargs))
+        with self._lock:
+            if _key in self._clients:
+                self._stats[backend].reused += 1
+                return typing.cast("T", self._clients[_key])
+        # Construct outside of the lock, as it may need the lock itself.
+        _client = create()
+        with self._lock:
+            if _key in self._clients:
+                self._stats[backend].reused += 1
+                return typing.cast("T", self._clients[_key])
+            self._stats[backend].created += 1
+            self._clients[_key] = _client
+            return _client
+
+    def _count_openai_request(self, _: httpx.Request) -> None:
+        self.count_request("openai")
+
+
+def _connection_pools(session: requests.Session) -> list[typing.Any]:
+    _pools = []
+    for _adapter in set(session.adapters.values()):
+        _manager = getattr(_adapter, "poolmanager", None)
+        if _manager is not None:
+            # The container refuses iteration; keys() returns a snapshot.
+            _keys = _manager.pools.keys()
+            _pools.extend(_manager.pools[key] for key in _keys)
+    return _pools
+
+
+REGISTRY = ClientRegistry()
+
+
+def get_llamafile(**kwargs: object) -> PooledLlamafile:
+    """Return a llamafile client from the process-wide registry."""
+    return REGISTRY.get_llamafile(**kwargs)
+
+
+def get_openai(
+    model_name: str = "gpt-4o-mini",
+    **kwargs: object,
+) -> langchain_openai.ChatOpenAI:
+    """Return an OpenAI client from the process-wide registry."""
+    return REGISTRY.get_openai(model_name, **kwargs)
+
+
+def get_openai_sdk(*, is_azure: bool = False) -> openai.OpenAI:
+    """Return an OpenAI SDK client from the process-wide registry."""
+    return REGISTRY.get_openai_sdk(is_azure=is_azure)
+
+
+def get_anthropic(
+    model_name: str = "claude-3-5-sonnet-20240620",
+    **kwargs: object,
+) -> langchain_anthropic.ChatAnthropic:
+    """Return an Anthropic client from the process-wide registry."""
+    return REGISTRY.get_anthropic(model_name, **kwargs)
+
+
+def stats() -> dict[str, ClientStats]:
+    """Return the usage statistics of the process-wide registry."""
+    return REGISTRY.stats()
@@ -0,0 +1,143 @@
+"""Helpers for issuing LLM calls concurrently and measuring their cost.
+
+The calls are bounded by a rate limit, so running them in parallel
+does not trip the provider's quotas. The mad skillz issue their calls
+through these helpers and the telemetry counts tokens with them.
+"""
+
+import concurrent.futures
+import dataclasses
+import functools
+import threading
+import time
+from collections.abc import Callable, Iterable
+
+import tiktoken
+
+
+class RateLimiter:
+    """Token bucket shared by all threads issuing calls."""
+
+    def __init__(self, calls_per_second: float, burst: int = 1) -> None:
+        """Instantiate the class.
+
+        Args:
+            calls_per_second: Sustained number of calls per second.
+            burst: Number of calls that may be issued at once.
+                Defaults to 1.
+        """
+        if calls_per_second <= 0:
+            msg = "calls_per_second must be positive."
+            raise ValueError(msg)
+        self.calls_per_second = calls_per_second
+        self.burst = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        """Block until a call may be issued."""
+        with self._lock:
+            _now = time.monotonic()
+            self._tokens = min(
+                self.burst,
+                self._tokens + (_now - self._updated) * self.calls_per_second,
+            )
+            self._updated = _now
+            # Reserve the token even if it is not there yet,
+            # so waiting threads are served in order.
+            self._tokens -= 1
+            _wait = -self._tokens / self.calls_per_second
+        if _wait > 0:
+            time.sleep(_wait)
+
+
+@functools.cache
+def _encoding() -> tiktoken.Encoding:
+    return tiktoken.get_encoding("cl100k_base")
+
+
+def count_tokens(text: str) -> int:
+    """Return the number of tokens in the text.
+
+    The count is made with the `cl100k_base` encoding,
+    so it is exact for OpenAI models and approximate for the rest.
+    """
+    return len(_encoding().encode(text, disallowed_special=()))
+
+
+@dataclasses.dataclass
+class CallStats:
+    """Cost and latency of an evaluation.
+
+    Attributes:
+        calls: Number of LLM calls issued.
+        prompt_tokens: Number of tokens sent.
+        completion_tokens: Number of tokens received.
+        seconds: Wall time of the evaluation.
+    """
+
+    calls: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    seconds: float = 0.0
+    _lock: threading.Lock = dataclasses.field(
+        default_factory=threading.Lock,
+        repr=False,
+        compare=False,
+    )
+
+    def track(self, prompt: str, call: Callable[[], str]) -> str:
+        """Issue a call and record its cost.
+
+        Args:
+            prompt: The fully rendered prompt.
+            call: Function performing the call.
+
+        Returns:
+            The call's response.
+        """
+        _response = call()
+        _prompt_tokens = count_tokens(prompt)
+        _completion_tokens = count_tokens(_response)
+        with self._lock:
+            self.calls += 1
+            self.prompt_tokens += _prompt_tokens
+            self.completion_tokens += _completion_tokens
+        return _response
+
+
+def track(
+    stats: CallStats | None,
+    prompt: str,
+    call: Callable[[], str],
+) -> str:
+    """Issue a call, recording its cost if stats are collected."""
+    return call() if stats is None else stats.track(prompt, call)
+
+
+def map_concurrently[T, R](
+    function: Callable[[T], R],
+    items: Iterable[T],
+    max_workers: int,
+    limiter: RateLimiter | None = None,
+) -> list[R]:
+    """Apply the function to every item on a thread pool.
+
+    Args:
+        function: Function to apply, usually one issuing an LLM call.
+        items: Items to apply the function to.
+        max_workers: Maximum number of calls in flight.
+        limiter: Rate limit of the calls. Defaults to None.
+
+    Returns:
+        The results in the order of the items.
+    """
+
+    def _run(item: T) -> R:
+        if limiter is not None:
+            limiter.acquire()
+        return function(item)
+
+    with concurrent.futures.ThreadPoolExecutor(max_workers) as executor:
+        return list(executor.map(_run, items))
@@ -0,0 +1,340 @@
+"""Near-duplicate detection of chunks with MinHash and LSH.
+
+Every chunk is reduced to a MinHash signature of its word shingles,
+whose agreement with another signature estimates the Jaccard similarity
+of their shingles. Signatures are split into bands and hashed into
+buckets, so only chunks sharing a bucket are compared: finding the
+duplicates of a chunk does not depend on the size of the index. The
+index can be saved, so chunks stored by earlier runs are recognized too.
+"""
+
+import hashlib
+import logging
+import pathlib
+import re
+import typing
+from collections.abc import Iterable
+
+import numpy as np
+from langchain_core import documents
+
+from . import identifiers
+
+logger = logging.getLogger(__name__)
+
+_PRIME = (1 << 61) - 1
+_MAX_HASH = (1 << 32) - 1
+_WORD = re.compile(r"\w+")
+
+
+def shingles(text: str, size: int = 5) -> set[bytes]:
+    """Return the word shingles of a text.
+
+    Words are lowercased and punctuation is ignored, so the same text
+    extracted from different formats yields the same shingles.
+
+    Args:
+        text: The text.
+        size: Number of words per shingle. Defaults to 5.
+
+    Returns:
+        The shingles, encoded. A text shorter than `size` words is
+        a single shingle, and so is a text without words, such as a
+        line of punctuation, with its whitespace normalized.
+    """
+    _words = _WORD.findall(text.lower())
+    if not _words:
+        # Otherwise every such text would have the same signature.
+        return {" ".join(text.lower().split()).encode("utf-8")}
+    return {
+        " ".join(_words[start : start + size]).encode("utf-8")
+        for start in range(max(1, len(_words) - size + 1))
+    }
+
+
+def lsh_parameters(threshold: float, num_perm: int) -> tuple[int, int]:
+    """Choose the number of bands and rows for a similarity threshold.
+
+    Two signatures sharing a band with probability 1/2 have a similarity
+    of about (1 / bands) ** (1 / rows), which is made as close to the
+    threshold as the number of permutations allows.
+
+    Args:
+        threshold: Jaccard similarity from which chunks are duplicates.
+        num_perm: Number of permutations of a signature.
+
+    Returns:
+        The number of bands and of rows per band.
+    """
+    return min(
+        ((bands, num_perm // bands) for bands in range(1, num_perm + 1)),
+        key=lambda option: abs(
+            (1 / option[0]) ** (1 / option[1]) - threshold,
+        ),
+    )
+
+
+class MinHasher:
+    """Compute MinHash signatures of texts."""
+
+    def __init__(
+        self,
+        num_perm: int = 128,
+        shingle_size: int = 5,
+        seed: int = 0,
+    ) -> None:
+        """Instantiate the class.
+
+        Args:
+            num_perm: Number of permutations, the length of a signature.
+                More are more precise, and slower. Defaults to 128.
+            shingle_size: Number of words per shingle. Defaults to 5.
+            seed: Seed of the permutations. Signatures are only
+                comparable when computed with the same seed.
+                Defaults to 0.
+        """
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.seed = seed
+        _generator = np.random.default_rng(seed)
+        self._a = _generator.integers(1, _PRIME, num_perm, dtype=np.uint64)
+        self._b = _generator.integers(0, _PRIME, num_perm, dtype=np.uint64)
+
+    def signature(self, text: str) -> np.ndarray:
+        """Return the signature of a text, `num_perm` unsigned ints."""
+        _hashes = np.fromiter(
+            (
+                int.from_bytes(
+                    hashlib.blake2b(shingle, digest_size=4).digest(),
+                    "little",
+                )
+                for shingle in shingles(text, self.shingle_size)
+            ),
+            dtype=np.uint64,
+        )
+        # Universal hashing; the products wrap around, as in datasketch.
+        _permuted = (_hashes[:, np.newaxis] * self._a + self._b) % _PRIME
+        return (_permuted & _MAX_HASH).min(axis=0).astype(np.uint32)
+
+
+class SignatureIndex:
+    """Signatures of chunks, bucketed by band for fast lookups."""
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128) -> None:
+        """Instantiate the class.
+
+        Args:
+            threshold: Estimated Jaccard similarity from which chunks
+                are duplicates. Defaults to 0.8.
+            num_perm: Length of the signatures. Defaults to 128.
+        """
+        if not 0 < threshold <= 1:
+            msg = "threshold must be in (0, 1]."
+            raise ValueError(msg)
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.bands, self.rows = lsh_parameters(threshold, num_perm)
+        # Other parameters the signatures were computed with, such as
+        # the seed, saved alongside them.
+        self.parameters: dict[str, int] = {}
+        self.keys: list[str] = []
+        self._signatures: list[np.ndarray] = []
+        self._buckets: list[dict[bytes, list[int]]] = [
+            {} for _ in range(self.bands)
+        ]
+
+    def __len__(self) -> int:
+        """Return the number of signatures."""
+        return len(self.keys)
+
+    def _bands(self, signature: np.ndarray) -> Iterable[bytes]:
+        for _band in range(self.bands):
+            yield signature[
+                _band * self.rows : (_band + 1) * self.rows
+            ].tobytes()
+
+    def query(self, signature: np.ndarray) -> str | None:
+        """Return the key of a duplicate of the signature, if any.
+
+        Args:
+            signature: Signature from a `MinHasher`.
+
+        Returns:
+            The key of the most similar signature above the threshold,
+            or None.
+        """
+        _candidates = {
+            _position
+            for _buckets, _band in zip(
+                self._buckets,
+                self._bands(signature),
+                strict=True,
+            )
+            for _position in _buckets.get(_band, ())
+        }
+        _best, _best_similarity = None, self.threshold
+        for _position in _candidates:
+            _similarity = float(
+                np.mean(self._signatures[_position] == signature),
+            )
+            if _similarity >= _best_similarity:
+                _best, _best_similarity = _position, _similarity
+        return None if _best is None else self.keys[_best]
+
+    def add(self, key: str, signature: np.ndarray) -> None:
+        """Add the signature of a chunk.
+
+        Args:
+            key: Identifier of the chunk.
+            signature: Signature from a `MinHasher`.
+        """
+        _position = len(self.keys)
+        self.keys.append(key)
+        self._signatures.append(signature)
+        for _buckets, _band in zip(
+            self._buckets,
+            self._bands(signature),
+            strict=True,
+        ):
+            _buckets.setdefault(_band, []).append(_position)
+
+    def save(self, path: str | pathlib.Path) -> None:
+        """Save the signatures to a NumPy archive.
+
+        Args:
+            path: Path to the archive.
+        """
+        _path = pathlib.Path(path)
+        _path.parent.mkdir(parents=True, exist_ok=True)
+        with _path.open("wb") as file:
+            np.savez(
+                file,
+                keys=np.array(self.keys, dtype=np.str_),
+                signatures=np.array(
+                    self._signatures,
+                    dtype=np.uint32,
+                ).reshape(-1, self.num_perm),
+                threshold=self.threshold,
+                **self.parameters,
+            )
+
+    @classmethod
+    def load(cls, path: str | pathlib.Path) -> typing.Self:
+        """Load signatures saved by `save`.
+
+        Args:
+            path: Path to the archive.
+
+        Returns:
+            The index, with the threshold and parameters it was saved
+            with.
+        """
+        with np.load(path) as archive:
+            _signatures = archive["signatures"]
+            _index = cls(float(archive["threshold"]), _signatures.shape[1])
+            _index.parameters = {
+                _name: int(archive[_name])
+                for _name in archive.files
+                if _name not in {"keys", "signatures", "threshold"}
+            }
+            for _key, _signature in zip(
+                archive["keys"].tolist(),
+                _signatures,
+                strict=True,
+            ):
+                _index.add(_key, _signature)
+        return _index
+
+
+class Deduplicator:
+    """Drop chunks which are near-duplicates of ones already seen.
+
+    Meant to run between chunking and persisting, so duplicates cost
+    neither embeddings nor space in the vector store. The first chunk
+    of a group of duplicates is kept.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.8,
+        num_perm: int = 128,
+        shingle_size: int = 5,
+        index_path: str | pathlib.Path | None = None,
+        seed: int = 0,
+    ) -> None:
+        """Instantiate the class.
+
+        Args:
+            threshold: Estimated Jaccard similarity of the shingles from
+                which chunks are duplicates. Defaults to 0.8.
+            num_perm: Length of the signatures. Defaults to 128.
+            shingle_size: Number of words per shingle. Defaults to 5.
+            index_path: Archive the signatures are loaded from, if it
+                exists, and saved to by `save`. Chunks stored by earlier
+                runs then count as seen, and the threshold the index was
+                saved with applies. Defaults to None, which keeps the
+                index in memory.
+            seed: Seed of the permutations. Defaults to 0.
+
+        Raises:
+            ValueError: If the signatures at `index_path` were computed
+                with other parameters.
+        """
+        self.hasher = MinHasher(num_perm, shingle_size, seed)
+        self.index_path = (
+            None if index_path is None else pathlib.Path(index_path)
+        )
+        _parameters = {"shingle_size": shingle_size, "seed": seed}
+        if self.index_path is not None and self.index_path.exists():
+            self.index = SignatureIndex.load(self.index_path)
+            _saved = {"num_perm": self.index.num_perm, **self.index.parameters}
+            for _name, _value in {"num_perm": num_perm, **_parameters}.items():
+                if _saved.get(_name, _value) != _value:
+                    msg = (
+                        f"{self.index_path} holds signatures computed with "
+                        f"{_name}={_saved[_name]}, not {_value}."
+                    )
+                    raise ValueError(msg)
+        else:
+            self.index = SignatureIndex(threshold, num_perm)
+        self.index.parameters = _parameters
+
+    def deduplicate(
+        self,
+        docs: Iterable[documents.Document],
+    ) -> list[documents.Document]:
+        """Return the chunks which are not near-duplicates.
+
+        Kept chunks are added to the index, so they count as seen by
+        later calls. The index is only saved by `save`.
+
+        Args:
+            docs: The chunks.
+
+        Returns:
+            The kept chunks, in their order.
+        """
+        _kept = []
+        _dropped = 0
+        for _doc in docs:
+            _signature = self.hasher.signature(_doc.page_content)
+            if self.index.query(_signature) is not None:
+                _dropped += 1
+                continue
+            self.index.add(identifiers.chunk_id(_doc), _signature)
+            _kept.append(_doc)
+        logger.info(
+            "Dropped %d near-duplicate chunks, kept %d.",
+            _dropped,
+            len(_kept),
+        )
+        return _kept
+
+    def save(self) -> None:
+        """Save the index to `index_path`, if there is one.
+
+        Meant to be called once the kept chunks are persisted, so chunks
+        which failed to be stored are not dropped by later runs.
+        """
+        if self.index_path is not None:
+            self.index.save(self.index_path)
@@ -4,21 +4,36 @@ All adhere to the strategy pattern as currently implemented.
 """
 
 import abc
+import functools
 import typing
 
-import langchain_anthropic
-import langchain_openai
 from langchain import hub
-from langchain_community.llms import gpt4all, llamafile
+from langchain_community.llms import gpt4all
 from langchain_core import (
     documents,
     language_models,
     output_parsers,
+    prompts,
     retrievers,
     runnables,
 )
 
-PROMPT = hub.pull("rlm/rag-prompt")
+from . import caching, clients
+
+PROMPT_NAME = "rlm/rag-prompt"
+
+
+@functools.cache
+def get_prompt() -> prompts.BasePromptTemplate:
+    """Pull the RAG prompt from the LangChain Hub.
+
+    It is pulled on first use rather than at import time, so the module
+    can be imported offline.
+
+    Returns:
+        The prompt expecting a "context" and a "question".
+    """
+    return hub.pull(PROMPT_NAME)
 
 
 def format_docs(docs: typing.Iterable[documents.Document]) -> str:
@@ -44,22 +59,26 @@ class BaseGenerator(abc.ABC):
         self,
         retriever: retrievers.BaseRetriever,
         llm: language_models.BaseLanguageModel,
+        cache: caching.LLMCache | None = None,
+        prompt: prompts.BasePromptTemplate | None = None,
     ) -> None:
         """Instantiate the class.
 
         Args:
             retriever: Object capable of retrieving document objects.
             llm: Language model to use for generation.
+            cache: Cache of the LLM's responses. Defaults to None.
+            prompt: Prompt expecting a "context" and a "question".
+                Defaults to None, which pulls "rlm/rag-prompt".
         """
-        self._runnable_sequence = (
-            {
-                "context": retriever | format_docs,
-                "question": runnables.RunnablePassthrough(),
-            }
-            | PROMPT
-            | llm
-            | output_parsers.StrOutputParser()
-        )
+        llm = caching.attach(llm, cache)
+        if prompt is None:
+            prompt = get_prompt()
+        self._answer_sequence = prompt | llm | output_parsers.StrOutputParser()
+        self._runnable_sequence = {
+            "context": retriever | format_docs,
+            "question": runnables.RunnablePassthrough(),
+        } | self._answer_sequence
 
     @abc.abstractmethod
     def generate(self, query: str) -> str:
@@ -73,6 +92,26 @@ class BaseGenerator(abc.ABC):
         """
         return self._runnable_sequence.invoke(query)
 
+    def generate_from_documents(
+        self,
+        query: str,
+        docs: typing.Iterable[documents.Document],
+    ) -> str:
+        """Generate an answer from already retrieved documents.
+
+        Unlike `generate`, the retriever is not called.
+
+        Args:
+            query: The question to be answered by the LLM.
+            docs: The context to answer the question from.
+
+        Returns:
+            A string containing the answer generated by the LLM.
+        """
+        return self._answer_sequence.invoke(
+            {"context": format_docs(docs), "question": query},
+        )
+
 
 class OpenAIGenerator(BaseGenerator):
     """OpenAPI generators."""
@@ -82,6 +121,7 @@ class OpenAIGenerator(BaseGenerator):
         self,
         retriever: retrievers.BaseRetriever,
         model_name: str = "gpt-4o-mini",
+        cache: caching.LLMCache | None = None,
         **kwargs: typing.Any,
     ) -> None:
         """Instantiate the class.
@@ -91,11 +131,13 @@ class OpenAIGenerator(BaseGenerator):
         Args:
             retriever: Object capable of retrieving document objects.
             model_name: The name of the model to use. Defaults to "gpt-4o-mini".
+            cache: Cache of the LLM's responses. Defaults to None.
             kwargs: Key-word arguments to pass to the model.
         """
         super().__init__(
             retriever,
-            langchain_openai.ChatOpenAI(model=model_name, **kwargs),
+            clients.get_openai(model_name, **kwargs),
+            cache,
         )
 
     @typing.override
@@ -111,6 +153,7 @@ class AnthropicGenerator(BaseGenerator):
         self,
         retriever: retrievers.BaseRetriever,
         model_name: str = "claude-3-5-sonnet-20240620",
+        cache: caching.LLMCache | None = None,
         **kwargs: typing.Any,
     ) -> None:
         """Instantiate the class.
@@ -121,11 +164,13 @@ class AnthropicGenerator(BaseGenerator):
             retriever: Object capable of retrieving document objects.
             model_name: The name of the model to use.
                 Defaults to "claude-3-5-sonnet-20240620".
+            cache: Cache of the LLM's responses. Defaults to None.
             kwargs: Key-word arguments to pass to the model.
         """
         super().__init__(
             retriever,
-            langchain_anthropic.ChatAnthropic(model=model_name, **kwargs),
+            clients.get_anthropic(model_name, **kwargs),
+            cache,
         )
 
     @typing.override
@@ -140,6 +185,7 @@ class LLAMAFileGenerator(BaseGenerator):
     def __init__(
         self,
         retriever: retrievers.BaseRetriever,
+        cache: caching.LLMCache | None = None,
         **kwargs: typing.Any,
     ) -> None:
         """Instantiate the class.
@@ -148,11 +194,13 @@ class LLAMAFileGenerator(BaseGenerator):
 
         Args:
             retriever: Object capable of retrieving document objects.
+            cache: Cache of the LLM's responses. Defaults to None.
             kwargs: Key-word arguments to pass to the model.
         """
         super().__init__(
             retriever,
-            llamafile.Llamafile(**kwargs),
+            clients.get_llamafile(**kwargs),
+            cache,
         )
 
     @typing.override
@@ -168,6 +216,7 @@ class GPT4AllGenerator(BaseGenerator):
         self,
         retriever: retrievers.BaseRetriever,
         model_path: str,
+        cache: caching.LLMCache | None = None,
         **kwargs: typing.Any,
     ) -> None:
         """Instantiate the class.
@@ -177,11 +226,13 @@ class GPT4AllGenerator(BaseGenerator):
         Args:
             retriever: Object capable of retrieving document objects.
             model_path: Path to the installed model.
+            cache: Cache of the LLM's responses. Defaults to None.
             kwargs: Key-word arguments to pass to the model.
         """
         super().__init__(
             retriever,
             gpt4all.GPT4All(model=model_path, **kwargs),
+            cache,
         )
 
     @typing.override
@@ -0,0 +1,42 @@
+"""Stable identifiers of prompts and chunks.
+
+The identifiers only depend on the content they are computed from, so
+they are the same between runs and processes. This module depends on
+no other part of the pipeline, so any of them may use it.
+"""
+
+import hashlib
+import json
+
+from langchain_core import documents
+
+
+def stable_hash(value: object) -> str:
+    """Return a stable hash of a value.
+
+    Args:
+        value: A string or a JSON-serializable structure.
+
+    Returns:
+        A hex digest identifying the value.
+    """
+    _text = (
+        value
+        if isinstance(value, str)
+        else json.dumps(value, sort_keys=True, ensure_ascii=False, default=str)
+    )
+    return hashlib.sha256(_text.encode("utf-8")).hexdigest()
+
+
+def chunk_id(document: documents.Document) -> str:
+    """Return an identifier of the chunk, stable between runs.
+
+    Args:
+        document: The chunk.
+
+    Returns:
+        The document's id if it has one, a hash of its content otherwise.
+    """
+    return getattr(document, "id", None) or stable_hash(
+        [document.page_content, document.metadata],
+    )
@@ -0,0 +1,513 @@
+"""Background indexing of chunks while the pipeline answers queries.
+
+Chunks are submitted to a durable queue backed by SQLite, and worker
+threads index them in batches. A batch is embedded outside of any lock,
+then added to the vectorstore under a write lock, while searches hold
+a read lock: a query sees either all of a batch or none of it, and is
+only held up while vectors are inserted, never while they are computed.
+"""
+
+import contextlib
+import json
+import logging
+import pathlib
+import sqlite3
+import threading
+import time
+import typing
+from collections.abc import Iterable, Iterator
+
+from langchain_core import callbacks, documents, pydantic_v1, vectorstores
+from langchain_core import retrievers as core_retrievers
+
+from . import persisting, retrieving
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PATH = "cache/index_queue.sqlite3"
+
+
+class IndexQueue:
+    """Durable queue of chunks to index, backed by SQLite.
+
+    A chunk is pending until a worker claims it, and indexed once it is
+    added to the vectorstore. It is only removed by `commit`, once the
+    vectorstore holding it is saved. A chunk whose indexing fails goes
+    back to pending, until it has failed `max_attempts` times. Chunks
+    claimed but not indexed when the process stopped are pending again
+    when the queue is reopened. Chunks indexed but not committed stay
+    indexed, as they may be in a vectorstore which persists by itself,
+    until `requeue_indexed` or `commit`, so indexing is at least once.
+    The queue is meant for a single process.
+    """
+
+    def __init__(
+        self,
+        path: str = DEFAULT_PATH,
+        max_attempts: int = 3,
+    ) -> None:
+        """Instantiate the class.
+
+        Args:
+            path: Path to the SQLite database. Use ":memory:" for
+                a queue that lives as long as the process.
+                Defaults to "cache/index_queue.sqlite3".
+            max_attempts: Number of times a chunk may fail before it is
+                left out. Defaults to 3.
+        """
+        if path != ":memory:":
+            pathlib.Path(path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_attempts = max_attempts
+        self._lock = threading.Lock()
+        self._connection = sqlite3.connect(path, check_same_thread=False)
+        with self._lock, self._connection:
+            self._connection.execute("PRAGMA journal_mode = WAL")
+            self._connection.execute(
+                """CREATE TABLE IF NOT EXISTS chunks (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    content TEXT NOT NULL,
+                    metadata TEXT NOT NULL,
+                    status TEXT NOT NULL DEFAULT 'pending',
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    error TEXT
+                )""",
+            )
+            self._connection.execute(
+                """CREATE INDEX IF NOT EXISTS chunks_status
+                ON chunks (status, id)""",
+            )
+            self._connection.execute(
+                "UPDATE chunks SET status = 'pending' WHERE status = 'claimed'",
+            )
+
+    def put(self, docs: Iterable[documents.Document]) -> list[int]:
+        """Add chunks to the queue.
+
+        Args:
+            docs: The chunks.
+
+        Returns:
+            The ids of the chunks in the queue.
+        """
+        with self._lock, self._connection:
+            return [
+                typing.cast(
+                    "int",
+                    self._connection.execute(
+                        "INSERT INTO chunks (content, metadata) VALUES (?, ?)",
+                        (
+                            doc.page_content,
+                            json.dumps(doc.metadata, default=str),
+                        ),
+                    ).lastrowid,
+                )
+                for doc in docs
+            ]
+
+    def claim(self, limit: int) -> list[tuple[int, documents.Document]]:
+        """Take pending chunks, oldest first.
+
+        Args:
+            limit: Maximum number of chunks to take.
+
+        Returns:
+            The ids and contents of the claimed chunks.
+        """
+        with self._lock, self._connection:
+            _rows = self._connection.execute(
+                "SELECT id, content, metadata FROM chunks "
+                "WHERE status = 'pending' ORDER BY id LIMIT ?",
+                (limit,),
+            ).fetchall()
+            self._connection.executemany(
+                "UPDATE chunks SET status = 'claimed' WHERE id = ?",
+                [(row[0],) for row in _rows],
+            )
+        return [
+            (
+                row[0],
+                documents.Document(
+                    page_content=row[1],
+                    metadata=json.loads(row[2]),
+                ),
+            )
+            for row in _rows
+        ]
+
+    def complete(self, ids: list[int]) -> None:
+        """Mark chunks as indexed, until they are committed."""
+        with self._lock, self._connection:
+            self._connection.executemany(
+                "UPDATE chunks SET status = 'indexed' WHERE id = ?",
+                [(id_,) for id_ in ids],
+            )
+
+    def commit(self) -> None:
+        """Remove the indexed chunks, once the vectorstore is saved."""
+        with self._lock, self._connection:
+            self._connection.execute(
+                "DELETE FROM chunks WHERE status = 'indexed'",
+            )
+
+    def requeue_indexed(self) -> None:
+        """Return the indexed chunks to pending, as their vectorstore is lost.
+
+        Meant for vectorstores kept in memory, when the chunks were
+        indexed but the vectorstore was not saved before it stopped.
+        """
+        with self._lock, self._connection:
+            self._connection.execute(
+                "UPDATE chunks SET status = 'pending' WHERE status = 'indexed'",
+            )
+
+    def fail(self, ids: list[int], error: str) -> None:
+        """Return chunks which failed to be indexed to the queue.
+
+        Args:
+            ids: Ids of the chunks.
+            error: Description of the failure.
+        """
+        with self._lock, self._connection:
+            self._connection.executemany(
+                """UPDATE chunks SET
+                    attempts = attempts + 1,
+                    error = ?,
+                    status = CASE WHEN attempts + 1 >= ?
+                        THEN 'failed' ELSE 'pending' END
+                WHERE id = ?""",
+                [(error, self.max_attempts, id_) for id_ in ids],
+            )
+
+    def counts(self) -> dict[str, int]:
+        """Return the number of chunks per status."""
+        with self._lock:
+            return dict(
+                self._connection.execute(
+                    "SELECT status, COUNT(*) FROM chunks GROUP BY status",
+                ).fetchall(),
+            )
+
+    def unfinished(self) -> int:
+        """Return the number of chunks pending or being indexed."""
+        _counts = self.counts()
+        return _counts.get("pending", 0) + _counts.get("claimed", 0)
+
+    def close(self) -> None:
+        """Close the database."""
+        with self._lock:
+            self._connection.close()
+
+
+class _ReadWriteLock:
+    """A lock shared by readers, or held by one writer.
+
+    Waiting writers keep new readers out, so a steady flow of queries
+    cannot starve the indexing.
+    """
+
+    def __init__(self) -> None:
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writers = 0
+        self._writing = False
+
+    @contextlib.contextmanager
+    def read(self) -> Iterator[None]:
+        with self._condition:
+            while self._writing or self._writers:
+                self._condition.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._readers -= 1
+                if not self._readers:
+                    self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def write(self) -> Iterator[None]:
+        with self._condition:
+            self._writers += 1
+            while self._writing or self._readers:
+                self._condition.wait()
+            self._writers -= 1
+            self._writing = True
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._writing = False
+                self._condition.notify_all()
+
+
+class BackgroundIndexer:
+    """Index submitted chunks in the background, in batches.
+
+    The vectorstore is created by the storage from the first batch, or
+    loaded from where it was saved, and every later batch is added to
+    it. Searches run against the chunks indexed so far and never see a
+    batch half added. Chunks leave the queue only once the vectorstore
+    is saved, or right away if it persists by itself, so a restart
+    indexes again the ones it lost.
+    """
+
+    def __init__(
+        self,
+        persister: persisting.BaseStorage,
+        queue: IndexQueue | None = None,
+        *,
+        workers: int = 1,
+        batch_size: int = 64,
+        poll_interval: float = 1.0,
+        save_path: str | pathlib.Path | None = None,
+        **kwargs: object,
+    ) -> None:
+        """Instantiate the class.
+
+        Args:
+            persister: The storage to index the chunks into. The
+                batches are embedded by its model before the write lock
+                is taken, and their vectors handed to the vectorstore.
+            queue: The queue of chunks. Defaults to an `IndexQueue` at
+                "cache/index_queue.sqlite3".
+            workers: Number of worker threads. Defaults to 1.
+            batch_size: Maximum number of chunks per batch.
+                Defaults to 64.
+            poll_interval: Number of seconds an idle worker waits before
+                checking the queue again. Defaults to 1.
+            save_path: Where `save` saves the vectorstore, with the
+                storage's `save`, and where it is loaded from if it
+                exists. Defaults to None, for vectorstores which persist
+                by themselves, such as Chroma with a persist directory,
+                or which are rebuilt from the queue on every start.
+            kwargs: Key-word arguments to pass to the wrapped vectorstore
+                when it is created.
+
+        Raises:
+            ValueError: If there is a `save_path` but the storage cannot
+                be saved.
+        """
+        if save_path is not None and not persister.savable:
+            msg = (
+                f"{type(persister).__name__} cannot be saved, "
+                "so there must be no save_path."
+            )
+            raise ValueError(msg)
+        self.persister = persister
+        self.queue = IndexQueue() if queue is None else queue
+        self.workers = workers
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.store_kwargs = kwargs
+        self.save_path = save_path
+        self._persists = persister.persists(**kwargs)
+        self._store: vectorstores.VectorStore | None = None
+        if save_path is not None and pathlib.Path(save_path).exists():
+            self._store = persister.load(save_path)
+        if self._persists:
+            # Indexed before the last stop, so already on disk.
+            self.queue.commit()
+        else:
+            self.queue.requeue_indexed()
+        self._lock = _ReadWriteLock()
+        self._wakeup = threading.Event()
+        self._stopping = threading.Event()
+        self._progress = threading.Condition()
+        self._threads: list[threading.Thread] = []
+
+    @property
+    def store(self) -> vectorstores.VectorStore | None:
+        """The vectorstore, None until the first batch is indexed."""
+        return self._store
+
+    def start(self) -> None:
+        """Start the worker threads."""
+        if self._threads:
+            return
+        self._stopping.clear()
+        self._threads = [
+            threading.Thread(
+                target=self._work,
+                name=f"indexer-{_index}",
+                daemon=True,
+            )
+            for _index in range(self.workers)
+        ]
+        for _thread in self._threads:
+            _thread.start()
+
+    def stop(self) -> None:
+        """Stop the worker threads once their current batch is indexed.
+
+        The vectorstore is then saved, see `save`. Chunks still pending
+        stay in the queue for the next start.
+        """
+        self._stopping.set()
+        self._wakeup.set()
+        for _thread in self._threads:
+            _thread.join()
+        self._threads = []
+        self.save()
+
+    def save(self) -> None:
+        """Save the vectorstore, and remove its chunks from the queue.
+
+        Without a `save_path`, the chunks are only removed if the
+        vectorstore persists by itself, such as Chroma with a persist
+        directory. Otherwise they stay in the queue, and are indexed
+        again by the next start.
+        """
+        # Readers keep batches from being added while it is saved.
+        with self._lock.read():
+            if self.save_path is not None and self._store is not None:
+                self.persister.save(self.save_path)
+            if self.save_path is not None or self._persists:
+                self.queue.commit()
+
+    def __enter__(self) -> typing.Self:
+        """Start the workers, and stop them on exit."""
+        self.start()
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        """Stop the workers."""
+        self.stop()
+
+    def submit(self, docs: Iterable[documents.Document]) -> list[int]:
+        """Queue chunks to be indexed.
+
+        Args:
+            docs: The chunks.
+
+        Returns:
+            Their ids in the queue.
+        """
+        _ids = self.queue.put(docs)
+        self._wakeup.set()
+        return _ids
+
+    def join(self, timeout: float | None = None) -> bool:
+        """Wait until no chunk is pending or being indexed.
+
+        Args:
+            timeout: Number of seconds to wait at most.
+                Defaults to None, which waits as long as needed.
+
+        Returns:
+            Whether the queue was drained in time.
+        """
+        _deadline = None if timeout is None else time.monotonic() + timeout
+        with self._progress:
+            while self.queue.unfinished():
+                _remaining = (
+                    self.poll_interval
+                    if _deadline is None
+                    else min(self.poll_interval, _deadline - time.monotonic())
+                )
+                if _remaining <= 0:
+                    return False
+                self._progress.wait(_remaining)
+        return True
+
+    def search(
+        self,
+        query: str,
+        **kwargs: object,
+    ) -> list[documents.Document]:
+        """Search the chunks indexed so far.
+
+        Args:
+            query: The query.
+            kwargs: Key-word arguments to pass to `similarity_search`.
+
+        Returns:
+            The most similar chunks, none before the first batch.
+        """
+        with self._lock.read():
+            if self._store is None:
+                return []
+            return self._store.similarity_search(query, **kwargs)
+
+    def as_retriever(self, **kwargs: object) -> "SnapshotRetriever":
+        """Return a LangChain retriever searching the indexed chunks.
+
+        Args:
+            kwargs: Key-word arguments to pass to `similarity_search`,
+                such as k.
+        """
+        return SnapshotRetriever(indexer=self, search_kwargs=kwargs)
+
+    def _index(self, docs: list[documents.Document]) -> None:
+        _vectors = self.persister.embedding.embed_documents(
+            [doc.page_content for doc in docs],
+        )
+        with self._lock.write():
+            if self._store is None:
+                self._store = self.persister.store_embedded(
+                    docs,
+                    _vectors,
+                    **self.store_kwargs,
+                )
+            else:
+                self.persister.add_embedded(docs, _vectors)
+
+    def _work(self) -> None:
+        while not self._stopping.is_set():
+            # Cleared before claiming, so a submission in between is
+            # not missed.
+            self._wakeup.clear()
+            _claimed = self.queue.claim(self.batch_size)
+            if not _claimed:
+                self._wakeup.wait(self.poll_interval)
+                continue
+            _ids = [id_ for id_, _ in _claimed]
+            try:
+                self._index([doc for _, doc in _claimed])
+            except Exception as error:
+                logger.exception("Indexing %d chunks failed.", len(_ids))
+                self.queue.fail(_ids, repr(error))
+            else:
+                self.queue.complete(_ids)
+            with self._progress:
+                self._progress.notify_all()
+
+
+class SnapshotRetriever(core_retrievers.BaseRetriever):
+    """LangChain retriever over the chunks a `BackgroundIndexer` indexed.
+
+    Attributes:
+        indexer: The indexer to search.
+        search_kwargs: Key-word arguments to pass to `similarity_search`.
+    """
+
+    indexer: BackgroundIndexer
+    search_kwargs: dict[str, typing.Any] = pydantic_v1.Field(
+        default_factory=dict,
+    )
+
+    @typing.override
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: callbacks.CallbackManagerForRetrieverRun,
+    ) -> list[documents.Document]:
+        return self.indexer.search(query, **self.search_kwargs)
+
+
+class IndexedRetriever(retrieving.BaseRetriever):
+    """Retriever over the chunks indexed in the background."""
+
+    @typing.override
+    def __init__(self, indexer: BackgroundIndexer) -> None:
+        """Instantiate the class.
+
+        Args:
+            indexer: The indexer to search.
+        """
+        self._indexer = indexer
+
+    @typing.override
+    def get_retriever(self, **kwargs: typing.Any) -> SnapshotRetriever:
+        return self._indexer.as_retriever(**kwargs)
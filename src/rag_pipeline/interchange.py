@@ -0,0 +1,271 @@
+"""Columnar files of chunks and their embeddings.
+
+Chunks are written to an Arrow IPC file with a row per chunk: its id,
+text, metadata as JSON and, optionally, its embedding as a fixed-size
+list of float32. The file is uncompressed, so it is memory-mapped when
+read and the embeddings are viewed as NumPy arrays without a copy.
+Any `BaseStorage` can then be bulk-loaded from it without embedding
+the chunks again, whatever backend they were first indexed into.
+"""
+
+import itertools
+import json
+import logging
+import pathlib
+import typing
+from collections.abc import Iterable, Iterator
+
+import numpy as np
+import pyarrow as pa
+from langchain_community import vectorstores
+from langchain_core import documents, embeddings
+
+from . import identifiers, persisting
+
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = "1"
+BATCH_SIZE = 1024
+
+
+def _model_name(embedding: embeddings.Embeddings) -> str:
+    return str(
+        getattr(embedding, "model_name", None)
+        or getattr(embedding, "model", None)
+        or type(embedding).__name__,
+    )
+
+
+def _schema(
+    dimension: int | None,
+    embedding: embeddings.Embeddings | None,
+) -> pa.Schema:
+    _fields = [
+        pa.field("id", pa.string(), nullable=False),
+        pa.field("text", pa.large_string(), nullable=False),
+        pa.field("metadata", pa.string(), nullable=False),
+    ]
+    _metadata = {"format_version": FORMAT_VERSION}
+    if dimension is not None and embedding is not None:
+        _fields.append(
+            pa.field(
+                "embedding",
+                pa.list_(pa.float32(), dimension),
+                nullable=False,
+            ),
+        )
+        _metadata["embedding_model"] = _model_name(embedding)
+    return pa.schema(_fields, metadata=_metadata)
+
+
+def write(
+    path: str | pathlib.Path,
+    docs: Iterable[documents.Document],
+    embedding: embeddings.Embeddings | None = None,
+    batch_size: int = BATCH_SIZE,
+) -> int:
+    """Write chunks, and optionally their embeddings, to a file.
+
+    Chunks are embedded and written a batch at a time, so neither all
+    the chunks nor all the vectors need to be in memory.
+
+    Args:
+        path: Path to the Arrow IPC file.
+        docs: The chunks, such as the output of
+            `RAGPipeline.chunk_documents` or a `ChunkBatch`.
+        embedding: Model to embed the chunks with. Defaults to None,
+            which writes the chunks only.
+        batch_size: Number of chunks per record batch.
+            Defaults to 1024.
+
+    Returns:
+        The number of written chunks.
+    """
+    _path = pathlib.Path(path)
+    _path.parent.mkdir(parents=True, exist_ok=True)
+    _rows = 0
+    _writer = None
+    _file_schema = None
+    with pa.OSFile(str(_path), "wb") as sink:
+        try:
+            for _batch in itertools.batched(docs, batch_size):
+                _texts = [doc.page_content for doc in _batch]
+                _arrays = [
+                    pa.array(
+                        [identifiers.chunk_id(doc) for doc in _batch],
+                        pa.string(),
+                    ),
+                    pa.array(_texts, pa.large_string()),
+                    pa.array(
+                        [
+                            json.dumps(
+                                doc.metadata,
+                                ensure_ascii=False,
+                                default=str,
+                            )
+                            for doc in _batch
+                        ],
+                        pa.string(),
+                    ),
+                ]
+                _dimension = None
+                if embedding is not None:
+                    _vectors = np.asarray(
+                        embedding.embed_documents(_texts),
+                        dtype=np.float32,
+                    )
+                    _dimension = _vectors.shape[1]
+                    _arrays.append(
+                        pa.FixedSizeListArray.from_arrays(
+                            pa.array(_vectors.ravel(), pa.float32()),
+                            _dimension,
+                        ),
+                    )
+                if _file_schema is None:
+                    _file_schema = _schema(_dimension, embedding)
+                    _writer = pa.ipc.new_file(sink, _file_schema)
+                _writer.write_batch(
+                    pa.RecordBatch.from_arrays(_arrays, schema=_file_schema),
+                )
+                _rows += len(_batch)
+            if _writer is None:
+                _writer = pa.ipc.new_file(sink, _schema(None, None))
+        finally:
+            if _writer is not None:
+                _writer.close()
+    return _rows
+
+
+def open_file(path: str | pathlib.Path) -> pa.ipc.RecordBatchFileReader:
+    """Open a file written by `write`, memory-mapped.
+
+    Args:
+        path: Path to the Arrow IPC file.
+
+    Returns:
+        A reader of its record batches. Their buffers point into the
+        mapped file, so reading them does not copy the data.
+
+    Raises:
+        ValueError: If the file is of another version of the format.
+    """
+    _reader = pa.ipc.open_file(pa.memory_map(str(path), "r"))
+    _metadata = _reader.schema.metadata or {}
+    _version = _metadata.get(b"format_version", b"").decode()
+    if _version != FORMAT_VERSION:
+        msg = (
+            f"{path} is of format version {_version or 'unknown'}, "
+            f"not {FORMAT_VERSION}."
+        )
+        raise ValueError(msg)
+    return _reader
+
+
+def embedding_model(path: str | pathlib.Path) -> str | None:
+    """Return the model a file was embedded with, None if it was not."""
+    _metadata = open_file(path).schema.metadata or {}
+    _name = _metadata.get(b"embedding_model")
+    return None if _name is None else _name.decode()
+
+
+def to_documents(batch: pa.RecordBatch) -> list[documents.Document]:
+    """Return the chunks of a record batch as documents."""
+    return [
+        documents.Document(page_content=text, metadata=json.loads(metadata))
+        for text, metadata in zip(
+            batch.column("text").to_pylist(),
+            batch.column("metadata").to_pylist(),
+            strict=True,
+        )
+    ]
+
+
+def to_vectors(batch: pa.RecordBatch) -> np.ndarray | None:
+    """Return the embeddings of a record batch, without a copy.
+
+    Returns:
+        A read-only array with a row per chunk, viewing the mapped file,
+        or None if the file has no embeddings.
+    """
+    if "embedding" not in batch.schema.names:
+        return None
+    _column = batch.column("embedding")
+    return (
+        _column.flatten()
+        .to_numpy(zero_copy_only=True)
+        .reshape(
+            len(_column),
+            _column.type.list_size,
+        )
+    )
+
+
+def read(
+    path: str | pathlib.Path,
+) -> Iterator[tuple[list[documents.Document], np.ndarray | None]]:
+    """Yield the chunks of a file and their embeddings, batch by batch.
+
+    Args:
+        path: Path to the Arrow IPC file.
+
+    Yields:
+        The chunks of a record batch, and their embeddings if any.
+    """
+    _reader = open_file(path)
+    for _index in range(_reader.num_record_batches):
+        _batch = _reader.get_batch(_index)
+        yield to_documents(_batch), to_vectors(_batch)
+
+
+def load_into(
+    path: str | pathlib.Path,
+    storage: persisting.BaseStorage,
+    **kwargs: object,
+) -> vectorstores.VectorStore | None:
+    """Bulk-load a storage from a file, without embedding the chunks.
+
+    The chunks are stored a record batch at a time: the first creates
+    the vectorstore and the others are added to it, so only one batch
+    is ever converted to documents and lists of floats.
+
+    Args:
+        path: Path to an Arrow IPC file with embeddings.
+        storage: The storage to load the chunks into. Its model only
+            embeds the queries, so it should be the model the file was
+            written with.
+        kwargs: Key-word arguments to pass to the wrapped vectorstore.
+
+    Returns:
+        The storage's vectorstore. If the file has no chunks, nothing
+        is stored and it is the one the storage already had, if any.
+
+    Raises:
+        ValueError: If the file has chunks but no embeddings.
+    """
+    _reader = open_file(path)
+    if not any(
+        _reader.get_batch(_index).num_rows
+        for _index in range(_reader.num_record_batches)
+    ):
+        logger.info("%s has no chunks to load.", path)
+        return storage.vectorstore
+    _model = embedding_model(path)
+    if _model is None:
+        msg = f"{path} has no embeddings to load."
+        raise ValueError(msg)
+    if _model != _model_name(storage.embedding):
+        logger.warning(
+            "%s was embedded with %s, but queries will be embedded with %s.",
+            path,
+            _model,
+            _model_name(storage.embedding),
+        )
+    _vectorstore = None
+    for _docs, _vectors in read(path):
+        # Rows are views of the mapped file, not copies.
+        _rows = list(typing.cast("np.ndarray", _vectors))
+        if _vectorstore is None:
+            _vectorstore = storage.store_embedded(_docs, _rows, **kwargs)
+        else:
+            _vectorstore = storage.add_embedded(_docs, _rows)
+    return _vectorstore
@@ -0,0 +1,262 @@
+"""Incremental extraction of values from large JSON files.
+
+Only the values matching a path are ever decoded. The containers
+leading to them are walked token by token over a buffer refilled in
+chunks, and siblings which do not match are skipped without being
+built, so memory depends on the size of a matched value rather than
+on the size of the file.
+
+Paths use a subset of the jq syntax: ".messages[].content" yields the
+content of every message, "." the whole document. Only the first "[]"
+is streamed; whatever follows it is applied to each decoded element.
+"""
+
+import json
+import re
+import typing
+from collections.abc import Iterator
+
+Step = str | None
+"""A key to enter, or None to iterate over an array."""
+
+CHUNK_SIZE = 1 << 20
+_PATH_TOKEN = re.compile(
+    r'\.([A-Za-z_][\w-]*)|\.?\["((?:[^"\\]|\\.)*)"\]|\.?\[\]',
+)
+_WHITESPACE = re.compile(r"[ \t\n\r]*")
+_NUMBER = re.compile(r"[-+0-9.eE]*")
+_STRUCTURE = re.compile(r'["\[\]{}]')
+_STRING_END = re.compile(r'[^"\\]*(?:\\.[^"\\]*)*"', re.DOTALL)
+_DECODER = json.JSONDecoder()
+
+
+def parse_path(path: str) -> list[Step]:
+    """Split a path into the steps leading to the values.
+
+    Args:
+        path: A path such as ".messages[].content" or '.["a key"][]'.
+
+    Returns:
+        The keys to enter, with None for every "[]".
+
+    Raises:
+        ValueError: If the path is not supported.
+    """
+    _steps: list[Step] = []
+    _position = 1 if path.startswith(".") and path[1:2] in ("", ".") else 0
+    while _position < len(path):
+        _match = _PATH_TOKEN.match(path, _position)
+        if _match is None:
+            msg = f"Unsupported path {path!r}."
+            raise ValueError(msg)
+        if _match.group(1) is not None:
+            _steps.append(_match.group(1))
+        elif _match.group(2) is not None:
+            _steps.append(json.loads(f'"{_match.group(2)}"'))
+        else:
+            _steps.append(None)
+        _position = _match.end()
+    return _steps
+
+
+def apply_path(value: object, steps: list[Step]) -> Iterator[object]:
+    """Yield the values matching the steps in a decoded value.
+
+    Keys missing from an object and steps into values of the wrong
+    type yield nothing, like jq's "?" operator.
+
+    Args:
+        value: The decoded JSON value.
+        steps: Steps returned by `parse_path`.
+
+    Yields:
+        The matching values.
+    """
+    if not steps:
+        yield value
+        return
+    _step, _rest = steps[0], steps[1:]
+    if _step is None:
+        if isinstance(value, list):
+            for _element in value:
+                yield from apply_path(_element, _rest)
+    elif isinstance(value, dict) and _step in value:
+        yield from apply_path(value[_step], _rest)
+
+
+class _Stream:
+    """A JSON text read in chunks and consumed from the front."""
+
+    def __init__(self, file: typing.TextIO, chunk_size: int) -> None:
+        self.file = file
+        self.chunk_size = chunk_size
+        self.buffer = ""
+        self.position = 0
+        self.eof = False
+
+    def fill(self) -> bool:
+        if self.eof:
+            return False
+        _chunk = self.file.read(self.chunk_size)
+        if not _chunk:
+            self.eof = True
+            return False
+        # Drop what was consumed, so the buffer stays small.
+        self.buffer = self.buffer[self.position :] + _chunk
+        self.position = 0
+        return True
+
+    def peek(self) -> str:
+        while True:
+            self.position = _WHITESPACE.match(
+                self.buffer,
+                self.position,
+            ).end()
+            if self.position < len(self.buffer):
+                return self.buffer[self.position]
+            if not self.fill():
+                msg = "Unexpected end of JSON."
+                raise ValueError(msg)
+
+    def expect(self, characters: str) -> str:
+        _character = self.peek()
+        if _character not in characters:
+            msg = f"Expected one of {characters!r}, got {_character!r}."
+            raise ValueError(msg)
+        self.position += 1
+        return _character
+
+    def decode(self) -> object:
+        if self.peek() in "-0123456789":
+            # A number cut by the end of the buffer would decode early.
+            while (
+                _NUMBER.match(self.buffer, self.position).end()
+                == len(self.buffer)
+                and self.fill()
+            ):
+                pass
+        while True:
+            try:
+                _value, _end = _DECODER.raw_decode(self.buffer, self.position)
+            except json.JSONDecodeError:
+                if not self.fill():
+                    raise
+                continue
+            self.position = _end
+            return _value
+
+    def skip(self) -> None:
+        if self.peek() not in "[{":
+            self.decode()
+            return
+        _depth = 0
+        while True:
+            _match = _STRUCTURE.search(self.buffer, self.position)
+            if _match is None:
+                self.position = len(self.buffer)
+                if not self.fill():
+                    msg = "Unexpected end of JSON."
+                    raise ValueError(msg)
+                continue
+            self.position = _match.end()
+            _character = _match.group()
+            if _character == '"':
+                self._skip_string()
+            elif _character in "[{":
+                _depth += 1
+            else:
+                _depth -= 1
+                if _depth == 0:
+                    return
+
+    def _skip_string(self) -> None:
+        while True:
+            _match = _STRING_END.match(self.buffer, self.position)
+            if _match is not None:
+                self.position = _match.end()
+                return
+            # The string, or an escape in it, goes past the buffer.
+            if not self.fill():
+                msg = "Unterminated string."
+                raise ValueError(msg)
+
+
+def _stream(stream: _Stream, steps: list[Step]) -> Iterator[object]:
+    if not steps:
+        yield stream.decode()
+    elif steps[0] is None:
+        yield from _stream_array(stream, steps[1:])
+    else:
+        yield from _stream_object(stream, steps[0], steps[1:])
+
+
+def _stream_array(stream: _Stream, rest: list[Step]) -> Iterator[object]:
+    if stream.peek() != "[":
+        stream.skip()
+        return
+    stream.expect("[")
+    if stream.peek() == "]":
+        stream.expect("]")
+        return
+    while True:
+        yield from apply_path(stream.decode(), rest)
+        if stream.expect(",]") == "]":
+            return
+
+
+def _stream_object(
+    stream: _Stream,
+    key: str,
+    rest: list[Step],
+) -> Iterator[object]:
+    if stream.peek() != "{":
+        stream.skip()
+        return
+    stream.expect("{")
+    if stream.peek() == "}":
+        stream.expect("}")
+        return
+    while True:
+        _key = stream.decode()
+        stream.expect(":")
+        if _key == key:
+            yield from _stream(stream, rest)
+        else:
+            stream.skip()
+        if stream.expect(",}") == "}":
+            return
+
+
+def iter_path(
+    file: typing.TextIO,
+    path: str,
+    chunk_size: int = CHUNK_SIZE,
+) -> Iterator[typing.Any]:
+    """Yield the values matching a path in a JSON file.
+
+    Args:
+        file: The file, opened in text mode.
+        path: Path of the values, see `parse_path`.
+        chunk_size: Number of characters read at once.
+            Defaults to 1 MiB.
+
+    Yields:
+        The matching values, in the order of the file.
+    """
+    yield from _stream(_Stream(file, chunk_size), parse_path(path))
+
+
+def iter_lines(file: typing.TextIO, path: str) -> Iterator[typing.Any]:
+    """Yield the values matching a path in every line of a JSONL file.
+
+    Args:
+        file: The file, opened in text mode.
+        path: Path of the values within a line, see `parse_path`.
+
+    Yields:
+        The matching values, in the order of the file.
+    """
+    _steps = parse_path(path)
+    for _line in file:
+        if _line.strip():
+            yield from apply_path(json.loads(_line), _steps)
@@ -4,11 +4,26 @@ All adhere to the strategy pattern as currently implemented.
 """
 
 import abc
+import concurrent.futures
+import csv
+import itertools
+import json
+import logging
+import multiprocessing
+import pathlib
 import typing
+from collections.abc import Callable, Iterator, Sequence
 
 from langchain_community import document_loaders
 from langchain_core import documents
 
+from . import json_stream, markup, pdf_pages
+
+logger = logging.getLogger(__name__)
+
+HTML_STRATEGIES = ("unstructured", "lxml")
+MARKDOWN_STRATEGIES = ("unstructured", "stream")
+
 
 class BaseLoading(abc.ABC):
     """Abstract base class defining common loading operations."""
@@ -30,6 +45,17 @@ class BaseLoading(abc.ABC):
             A list of Document objects representing the loaded data.
         """
 
+    def lazy_load(self) -> Iterator[documents.Document]:
+        """Load the data one document at a time.
+
+        Loaders able to stream override it; the others load everything
+        first.
+
+        Yields:
+            Document objects representing the loaded data.
+        """
+        yield from self.load()
+
 
 class FileSystemLoader(BaseLoading):
     """Load documents from the file system.
@@ -67,6 +93,134 @@ class CSVLoader(BaseLoading):
         return self._loader.load()
 
 
+class StreamingCSVLoader(BaseLoading):
+    """Stream documents out of a large CSV file.
+
+    Rows are parsed by the `csv` module in batches of `batch_rows` and
+    rendered as "column: value" lines, like LangChain's `CSVLoader`
+    does. Consecutive rows are grouped into one document for as long as
+    it stays under `max_document_size` characters, and documents are
+    yielded as soon as they are complete, so memory does not grow with
+    the size of the file.
+    """
+
+    @typing.override
+    def __init__(
+        self,
+        file_path: str | pathlib.Path,
+        columns: Sequence[str] | None = None,
+        column_types: dict[str, Callable[[str], object]] | None = None,
+        fieldnames: Sequence[str] | None = None,
+        batch_rows: int = 10_000,
+        max_document_size: int | None = 4_000,
+        encoding: str = "utf-8",
+        **kwargs: typing.Any,
+    ) -> None:
+        """Instantiate the class.
+
+        Args:
+            file_path: Path to the file to load.
+            columns: Columns to keep, in this order.
+                Defaults to None, which keeps them all.
+            column_types: Functions converting the values of some
+                columns, such as `int` or `str.strip`. Values they
+                cannot convert are kept as they are. Defaults to None.
+            fieldnames: Names of the columns. Defaults to None, which
+                reads them from the first row.
+            batch_rows: Number of rows parsed at once. Defaults to 10000.
+            max_document_size: Number of characters rows are grouped
+                under. A row longer than that gets a document of its
+                own. Defaults to 4000; None gives one document per row.
+            encoding: Encoding of the file. Defaults to "utf-8".
+            kwargs: Any arguments to pass to `csv.reader`, such as
+                the delimiter.
+        """
+        self.file_path = pathlib.Path(file_path)
+        self.columns = columns
+        self.column_types = column_types or {}
+        self.fieldnames = fieldnames
+        self.batch_rows = batch_rows
+        self.max_document_size = max_document_size
+        self.encoding = encoding
+        self._csv_kwargs = kwargs
+
+    @typing.override
+    def load(self) -> list[documents.Document]:
+        return list(self.lazy_load())
+
+    @typing.override
+    def lazy_load(self) -> Iterator[documents.Document]:
+        with self.file_path.open(encoding=self.encoding, newline="") as file:
+            _reader = csv.reader(file, **self._csv_kwargs)
+            _fieldnames = (
+                list(self.fieldnames)
+                if self.fieldnames is not None
+                else next(_reader, [])
+            )
+            _names = list(self.columns or _fieldnames)
+            _indices = [_fieldnames.index(name) for name in _names]
+            _converters = [self.column_types.get(name) for name in _names]
+
+            _lines: list[str] = []
+            _size = 0
+            _first_row = 0
+            _row_number = 0
+            while _batch := list(itertools.islice(_reader, self.batch_rows)):
+                for _row in _batch:
+                    _line = "\n".join(
+                        f"{name}: {self._convert(converter, _row, index)}"
+                        for name, index, converter in zip(
+                            _names,
+                            _indices,
+                            _converters,
+                            strict=True,
+                        )
+                    )
+                    if _lines and (
+                        self.max_document_size is None
+                        or _size + len(_line) + 2 > self.max_document_size
+                    ):
+                        yield self._document(_lines, _first_row, _row_number)
+                        _lines = []
+                        _size = 0
+                        _first_row = _row_number
+                    _lines.append(_line)
+                    _size += len(_line) + 2
+                    _row_number += 1
+            if _lines:
+                yield self._document(_lines, _first_row, _row_number)
+
+    @staticmethod
+    def _convert(
+        converter: Callable[[str], object] | None,
+        row: list[str],
+        index: int,
+    ) -> object:
+        # Short rows are padded, like `csv.DictReader` does.
+        _value = row[index] if index < len(row) else ""
+        if converter is None:
+            return _value
+        try:
+            return converter(_value)
+        except ValueError:
+            return _value
+
+    def _document(
+        self,
+        lines: list[str],
+        first_row: int,
+        end_row: int,
+    ) -> documents.Document:
+        return documents.Document(
+            page_content="\n\n".join(lines),
+            metadata={
+                "source": str(self.file_path),
+                "first_row": first_row,
+                "last_row": end_row - 1,
+            },
+        )
+
+
 class JSONLoader(BaseLoading):
     """Load documents from a JSON file.
 
@@ -95,40 +249,196 @@ class JSONLoader(BaseLoading):
         return self._loader.load()
 
 
+class StreamingJSONLoader(BaseLoading):
+    """Stream documents out of a large JSON or JSON Lines file.
+
+    Unlike `JSONLoader`, the file is never parsed as a whole: only the
+    values matching the path are decoded, one at a time, so memory
+    stays flat whatever the size of the file. See `json_stream` for
+    the supported paths.
+    """
+
+    @typing.override
+    def __init__(
+        self,
+        file_path: str | pathlib.Path,
+        path: str = ".",
+        json_lines: bool | None = None,
+        encoding: str = "utf-8",
+        chunk_size: int = json_stream.CHUNK_SIZE,
+    ) -> None:
+        """Instantiate the class.
+
+        Args:
+            file_path: Path to the file to load.
+            path: Path of the values to turn into documents, such as
+                ".messages[].content". For JSON Lines files, the path
+                is applied to every line. Defaults to ".".
+            json_lines: Whether the file holds one JSON value per line.
+                Defaults to None, which checks for a ".jsonl" suffix.
+            encoding: Encoding of the file. Defaults to "utf-8".
+            chunk_size: Number of characters read at once.
+                Defaults to 1 MiB.
+        """
+        self.file_path = pathlib.Path(file_path)
+        self.path = path
+        self.json_lines = (
+            self.file_path.suffix == ".jsonl"
+            if json_lines is None
+            else json_lines
+        )
+        self.encoding = encoding
+        self.chunk_size = chunk_size
+
+    @typing.override
+    def load(self) -> list[documents.Document]:
+        return list(self.lazy_load())
+
+    @typing.override
+    def lazy_load(self) -> Iterator[documents.Document]:
+        with self.file_path.open(encoding=self.encoding) as file:
+            _values = (
+                json_stream.iter_lines(file, self.path)
+                if self.json_lines
+                else json_stream.iter_path(file, self.path, self.chunk_size)
+            )
+            # Numbered from 1, like LangChain's `JSONLoader` does.
+            for _number, _value in enumerate(_values, 1):
+                yield documents.Document(
+                    page_content=_value
+                    if isinstance(_value, str)
+                    else json.dumps(_value, ensure_ascii=False),
+                    metadata={
+                        "source": str(self.file_path),
+                        "seq_num": _number,
+                    },
+                )
+
+
 class MarkdownLoader(BaseLoading):
     """Load documents from a Markdown file.
 
-    It is a thin wrapper over `UnstructuredMarkdownLoader`.
+    By default, it is a thin wrapper over `UnstructuredMarkdownLoader`.
+    The "stream" strategy instead reads the file line by line and yields
+    a document per section, with its headers as metadata.
     """
 
     @typing.override
-    def __init__(self, file_path: str, **kwargs: typing.Any) -> None:
-        self._loader = document_loaders.UnstructuredMarkdownLoader(
-            file_path,
-            **kwargs,
-        )
+    def __init__(
+        self,
+        file_path: str,
+        strategy: str = "unstructured",
+        headers_to_split_on: Sequence[tuple[str, str]] = (
+            markup.MARKDOWN_HEADERS
+        ),
+        **kwargs: typing.Any,
+    ) -> None:
+        """Instantiate the class.
+
+        Args:
+            file_path: Path to the file to load.
+            strategy: "unstructured" or "stream".
+                Defaults to "unstructured".
+            headers_to_split_on: Markers of the headers the "stream"
+                strategy splits on, and their metadata names.
+                Defaults to "#" to "###".
+            kwargs: Any arguments to pass to the wrapped object.
+        """
+        if strategy not in MARKDOWN_STRATEGIES:
+            msg = f"strategy must be one of {', '.join(MARKDOWN_STRATEGIES)}."
+            raise ValueError(msg)
+        self.file_path = file_path
+        self.strategy = strategy
+        self.headers_to_split_on = headers_to_split_on
+        if strategy == "unstructured":
+            self._loader = document_loaders.UnstructuredMarkdownLoader(
+                file_path,
+                **kwargs,
+            )
 
     @typing.override
     def load(self) -> list[documents.Document]:
-        return self._loader.load()
+        if self.strategy == "unstructured":
+            return self._loader.load()
+        return list(self.lazy_load())
+
+    @typing.override
+    def lazy_load(self) -> Iterator[documents.Document]:
+        if self.strategy == "unstructured":
+            yield from self._loader.lazy_load()
+            return
+        with pathlib.Path(self.file_path).open(encoding="utf-8") as file:
+            yield from _section_documents(
+                markup.iter_markdown_blocks(file, self.headers_to_split_on),
+                self.file_path,
+            )
 
 
 class HTMLLoader(BaseLoading):
     """Load documents from an HTML file.
 
-    It is a thin wrapper over `UnstructuredHTMLLoader`.
+    By default, it is a thin wrapper over `UnstructuredHTMLLoader`.
+    The "lxml" strategy instead parses the file incrementally with lxml
+    and yields a document per section, with its headers as metadata.
     """
 
     @typing.override
-    def __init__(self, file_path: str, **kwargs: typing.Any) -> None:
-        self._loader = document_loaders.UnstructuredHTMLLoader(
-            file_path,
-            **kwargs,
-        )
+    def __init__(
+        self,
+        file_path: str,
+        strategy: str = "unstructured",
+        headers_to_split_on: Sequence[tuple[str, str]] = markup.HTML_HEADERS,
+        **kwargs: typing.Any,
+    ) -> None:
+        """Instantiate the class.
+
+        Args:
+            file_path: Path to the file to load.
+            strategy: "unstructured" or "lxml".
+                Defaults to "unstructured".
+            headers_to_split_on: Tags of the headers the "lxml" strategy
+                splits on, and their metadata names.
+                Defaults to h1 to h3.
+            kwargs: Any arguments to pass to the wrapped object.
+        """
+        if strategy not in HTML_STRATEGIES:
+            msg = f"strategy must be one of {', '.join(HTML_STRATEGIES)}."
+            raise ValueError(msg)
+        self.file_path = file_path
+        self.strategy = strategy
+        self.headers_to_split_on = headers_to_split_on
+        if strategy == "unstructured":
+            self._loader = document_loaders.UnstructuredHTMLLoader(
+                file_path,
+                **kwargs,
+            )
 
     @typing.override
     def load(self) -> list[documents.Document]:
-        return self._loader.load()
+        if self.strategy == "unstructured":
+            return self._loader.load()
+        return list(self.lazy_load())
+
+    @typing.override
+    def lazy_load(self) -> Iterator[documents.Document]:
+        if self.strategy == "unstructured":
+            yield from self._loader.lazy_load()
+            return
+        yield from _section_documents(
+            markup.iter_html_blocks(self.file_path, self.headers_to_split_on),
+            self.file_path,
+        )
+
+
+def _section_documents(
+    blocks: Iterator[markup.Block],
+    source: str,
+) -> Iterator[documents.Document]:
+    for _section in markup.iter_sections(blocks):
+        yield documents.Document(
+            page_content=_section.text,
+            metadata={"source": source, **_section.headers},
+        )
 
 
 class PDFLoader(BaseLoading):
@@ -147,3 +457,123 @@ class PDFLoader(BaseLoading):
     @typing.override
     def load(self) -> list[documents.Document]:
         return self._loader.load()
+
+
+class ParallelPDFLoader(BaseLoading):
+    """Load a PDF page by page across a pool of processes.
+
+    Page ranges are extracted by worker processes and every page is
+    cached on disk by the hash of the file and its number. Loading the
+    same file again, or after a failure, only extracts the pages which
+    are not cached yet. Yields one document per page.
+    """
+
+    @typing.override
+    def __init__(
+        self,
+        file_path: str | pathlib.Path,
+        strategy: str = "auto",
+        max_workers: int | None = None,
+        pages_per_task: int = 8,
+        cache_dir: str | pathlib.Path = pdf_pages.DEFAULT_CACHE_DIR,
+    ) -> None:
+        """Instantiate the class.
+
+        Args:
+            file_path: Path to the file to load.
+            strategy: "text" only reads the embedded text layer, which
+                is fast and skips the layout models. "auto" does the
+                same but falls back to unstructured's "hi_res" for
+                pages without text, such as scans. "fast" and "hi_res"
+                partition every page with unstructured.
+                Defaults to "auto".
+            max_workers: Number of worker processes.
+                Defaults to None, which uses every core.
+            pages_per_task: Number of pages a worker extracts at once.
+                Defaults to 8.
+            cache_dir: Directory caching the extracted pages.
+                Defaults to "cache/pdf_pages".
+        """
+        if strategy not in pdf_pages.STRATEGIES:
+            msg = f"strategy must be one of {', '.join(pdf_pages.STRATEGIES)}."
+            raise ValueError(msg)
+        self.file_path = pathlib.Path(file_path)
+        self.strategy = strategy
+        self.max_workers = max_workers
+        self.pages_per_task = pages_per_task
+        self.cache = pdf_pages.PageCache(cache_dir)
+
+    @typing.override
+    def load(self) -> list[documents.Document]:
+        return list(self.lazy_load())
+
+    @typing.override
+    def lazy_load(self) -> Iterator[documents.Document]:
+        _digest = pdf_pages.file_hash(self.file_path)
+        _pages = range(1, pdf_pages.page_count(self.file_path) + 1)
+        self.extract(
+            _digest,
+            self.cache.missing(_digest, self.strategy, _pages),
+        )
+        for _page in _pages:
+            _elements = self.cache.get(_digest, self.strategy, _page)
+            if _elements is None:
+                msg = (
+                    f"Page {_page} of {self.file_path} could not be "
+                    "extracted. Load it again to retry the missing pages."
+                )
+                raise RuntimeError(msg)
+            yield documents.Document(
+                page_content="\n\n".join(
+                    element["text"] for element in _elements
+                ),
+                metadata={
+                    "source": str(self.file_path),
+                    "page_number": _page,
+                    "categories": sorted(
+                        {element["category"] for element in _elements},
+                    ),
+                },
+            )
+
+    def extract(self, digest: str, pages: list[int]) -> None:
+        """Extract pages into the cache across the process pool.
+
+        A failed range is logged rather than raised, so the other
+        ranges still get cached.
+
+        Args:
+            digest: Hash of the file.
+            pages: Numbers of the pages to extract, from 1.
+        """
+        if not pages:
+            return
+        _ranges = [
+            pages[start : start + self.pages_per_task]
+            for start in range(0, len(pages), self.pages_per_task)
+        ]
+        with concurrent.futures.ProcessPoolExecutor(
+            self.max_workers,
+            multiprocessing.get_context("spawn"),
+        ) as executor:
+            _futures = {
+                executor.submit(
+                    pdf_pages.extract_range,
+                    str(self.file_path),
+                    digest,
+                    _range,
+                    self.strategy,
+                    str(self.cache.directory),
+                ): _range
+                for _range in _ranges
+            }
+            for _future in concurrent.futures.as_completed(_futures):
+                try:
+                    _future.result()
+                except Exception:
+                    logger.exception(
+                        "Pages %d to %d of %s failed.",
+                        _futures[_future][0],
+                        _futures[_future][-1],
+                        self.file_path,
+                    )
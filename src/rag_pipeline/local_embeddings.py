@@ -0,0 +1,455 @@
+"""Embedding models running locally on the CPU.
+
+`ONNXEmbeddings` runs sentence-transformers models through ONNX Runtime
+with int8 weights. Texts are tokenized once, sorted by length and batched,
+so a batch is padded to the length of similar texts instead of
+the longest one.
+`EmbeddingPool` spreads the work of either backend over several
+processes. Every class implements LangChain's `Embeddings`, so they can
+be used by the chunkers and the persisters alike.
+"""
+
+import concurrent.futures
+import dataclasses
+import logging
+import multiprocessing
+import multiprocessing.sharedctypes
+import os
+import pathlib
+import typing
+from collections.abc import Callable
+from multiprocessing import shared_memory
+
+import langchain_huggingface
+import numpy as np
+import threadpoolctl
+from langchain_core import embeddings
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MODEL = "sentence-transformers/all-MiniLM-L6-v2"
+DEFAULT_CACHE_DIR = "cache/onnx"
+BACKENDS = ("huggingface", "onnx")
+THREAD_VARIABLES = (
+    "OMP_NUM_THREADS",
+    "MKL_NUM_THREADS",
+    "OPENBLAS_NUM_THREADS",
+)
+
+
+class ONNXEmbeddings(embeddings.Embeddings):
+    """Sentence-transformers embeddings computed by ONNX Runtime.
+
+    The model is exported to ONNX and quantized to int8 on first use,
+    and the result is cached on disk. Requires `optimum` for the export
+    and `onnxruntime` for the inference.
+    """
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_MODEL,
+        cache_dir: str | pathlib.Path = DEFAULT_CACHE_DIR,
+        *,
+        quantize: bool = True,
+        batch_size: int = 32,
+        num_threads: int | None = None,
+        max_length: int = 256,
+        pooling: typing.Literal["mean", "cls"] = "mean",
+        normalize: bool = True,
+    ) -> None:
+        """Instantiate the class.
+
+        Args:
+            model_name: Name of the model on the Hugging Face Hub.
+                Defaults to "sentence-transformers/all-MiniLM-L6-v2".
+            cache_dir: Directory to keep the exported models in.
+                Defaults to "cache/onnx".
+            quantize: Whether to quantize the weights to int8.
+                Defaults to True.
+            batch_size: Number of texts per inference. Defaults to 32.
+            num_threads: Number of threads of an inference. Defaults to
+                None, which lets ONNX Runtime use every core.
+            max_length: Number of tokens texts are truncated to.
+                Defaults to 256.
+            pooling: How token embeddings are combined. Use the pooling
+                the model was trained with. Defaults to "mean".
+            normalize: Whether to scale the embeddings to unit length.
+                Defaults to True.
+        """
+        # Imported here, as only this class needs them.
+        import onnxruntime
+        import transformers
+
+        self.model_name = model_name
+        self.batch_size = batch_size
+        self.max_length = max_length
+        self.pooling = pooling
+        self.normalize = normalize
+
+        _path = export(model_name, cache_dir, quantize=quantize)
+        _options = onnxruntime.SessionOptions()
+        _options.graph_optimization_level = (
+            onnxruntime.GraphOptimizationLevel.ORT_ENABLE_ALL
+        )
+        if num_threads is not None:
+            _options.intra_op_num_threads = num_threads
+            _options.inter_op_num_threads = 1
+        self._session = onnxruntime.InferenceSession(
+            str(_path),
+            _options,
+            providers=["CPUExecutionProvider"],
+        )
+        self._input_names = {
+            model_input.name for model_input in self._session.get_inputs()
+        }
+        self._tokenizer = transformers.AutoTokenizer.from_pretrained(
+            _path.parent,
+        )
+
+    @typing.override
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+        _encodings = self._tokenizer(
+            texts,
+            truncation=True,
+            max_length=self.max_length,
+        )
+        _order = sorted(
+            range(len(texts)),
+            key=lambda i: len(_encodings["input_ids"][i]),
+        )
+        _vectors: list[list[float]] = [[] for _ in texts]
+        for _start in range(0, len(_order), self.batch_size):
+            _batch = _order[_start : _start + self.batch_size]
+            _inputs = self._tokenizer.pad(
+                [
+                    {name: values[i] for name, values in _encodings.items()}
+                    for i in _batch
+                ],
+                return_tensors="np",
+            )
+            for _index, _vector in zip(
+                _batch,
+                self._embed_batch(_inputs),
+                strict=True,
+            ):
+                _vectors[_index] = _vector
+        return _vectors
+
+    @typing.override
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+    def _embed_batch(
+        self,
+        inputs: typing.Mapping[str, np.ndarray],
+    ) -> list[list[float]]:
+        _hidden = self._session.run(
+            None,
+            {
+                name: value.astype(np.int64)
+                for name, value in inputs.items()
+                if name in self._input_names
+            },
+        )[0]
+        if self.pooling == "cls":
+            _pooled = _hidden[:, 0]
+        else:
+            _mask = inputs["attention_mask"][..., np.newaxis]
+            _pooled = (_hidden * _mask).sum(axis=1) / np.maximum(
+                _mask.sum(axis=1),
+                1,
+            )
+        if self.normalize:
+            _pooled /= np.maximum(
+                np.linalg.norm(_pooled, axis=1, keepdims=True),
+                1e-12,
+            )
+        return _pooled.tolist()
+
+
+def export(
+    model_name: str = DEFAULT_MODEL,
+    cache_dir: str | pathlib.Path = DEFAULT_CACHE_DIR,
+    *,
+    quantize: bool = True,
+) -> pathlib.Path:
+    """Export a model to ONNX, unless it already was.
+
+    Args:
+        model_name: Name of the model on the Hugging Face Hub.
+            Defaults to "sentence-transformers/all-MiniLM-L6-v2".
+        cache_dir: Directory to keep the exported models in.
+            Defaults to "cache/onnx".
+        quantize: Whether to also quantize the weights to int8 with
+            dynamic quantization. Defaults to True.
+
+    Returns:
+        Path to the ONNX model, next to which the tokenizer is saved.
+    """
+    _directory = pathlib.Path(cache_dir) / model_name.replace("/", "--")
+    _model = _directory / "model.onnx"
+    if not _model.exists():
+        from optimum.exporters import onnx
+
+        logger.info("Exporting %s to ONNX.", model_name)
+        onnx.main_export(
+            model_name,
+            _directory,
+            task="feature-extraction",
+        )
+    if not quantize:
+        return _model
+
+    _quantized = _directory / "model_int8.onnx"
+    if not _quantized.exists():
+        from onnxruntime import quantization
+
+        logger.info("Quantizing %s to int8.", model_name)
+        quantization.quantize_dynamic(
+            _model,
+            _quantized,
+            weight_type=quantization.QuantType.QInt8,
+        )
+    return _quantized
+
+
+def get_embeddings(
+    model_name: str = DEFAULT_MODEL,
+    backend: str = "huggingface",
+    **kwargs: object,
+) -> embeddings.Embeddings:
+    """Return a local embedding model.
+
+    Args:
+        model_name: Name of the model on the Hugging Face Hub.
+            Defaults to "sentence-transformers/all-MiniLM-L6-v2".
+        backend: "huggingface" for PyTorch through sentence-transformers
+            or "onnx" for `ONNXEmbeddings`. Defaults to "huggingface".
+        kwargs: Key-word arguments to pass to the model.
+
+    Returns:
+        The embedding model.
+    """
+    if backend == "onnx":
+        return ONNXEmbeddings(model_name, **kwargs)
+    if backend == "huggingface":
+        return langchain_huggingface.HuggingFaceEmbeddings(
+            model_name=model_name,
+            **kwargs,
+        )
+    msg = f"backend must be one of {', '.join(BACKENDS)}."
+    raise ValueError(msg)
+
+
+@dataclasses.dataclass
+class _Worker:
+    """State of a worker process of an `EmbeddingPool`.
+
+    Attributes:
+        model: The model loaded by the worker's initializer.
+    """
+
+    model: embeddings.Embeddings | None = None
+
+
+_worker = _Worker()
+
+
+@dataclasses.dataclass(frozen=True)
+class _WorkerSettings:
+    """How the workers of an `EmbeddingPool` load their model.
+
+    Attributes:
+        model_name: Name of the model on the Hugging Face Hub.
+        backend: Backend the model runs with.
+        threads: Number of threads of every worker.
+        pin_cpus: Whether to pin every worker to its own cores.
+        factory: Function building the model.
+        kwargs: Key-word arguments to pass to the model.
+    """
+
+    model_name: str
+    backend: str
+    threads: int
+    pin_cpus: bool
+    factory: Callable[..., embeddings.Embeddings]
+    kwargs: dict[str, object]
+
+
+def _start_worker(
+    settings: _WorkerSettings,
+    counter: "multiprocessing.sharedctypes.Synchronized[int]",
+) -> None:
+    # Unpickling this initializer imported numpy, which has already
+    # started its BLAS thread pool: the variables only reach libraries
+    # loaded from now on, so the loaded pools are limited directly.
+    for _variable in THREAD_VARIABLES:
+        os.environ[_variable] = str(settings.threads)
+    threadpoolctl.threadpool_limits(settings.threads)
+    with counter.get_lock():
+        _index = counter.value
+        counter.value += 1
+    if settings.pin_cpus and hasattr(os, "sched_setaffinity"):
+        _cpus = sorted(os.sched_getaffinity(0))
+        _start = _index * settings.threads % len(_cpus)
+        os.sched_setaffinity(
+            0,
+            _cpus[_start : _start + settings.threads] or _cpus,
+        )
+    _kwargs = settings.kwargs
+    if settings.backend == "onnx":
+        _kwargs = {"num_threads": settings.threads, **_kwargs}
+    else:
+        import torch
+
+        torch.set_num_threads(settings.threads)
+    _worker.model = settings.factory(
+        settings.model_name,
+        settings.backend,
+        **_kwargs,
+    )
+
+
+def _embed_into(
+    shared_name: str,
+    rows: int,
+    dimension: int,
+    offset: int,
+    texts: list[str],
+) -> None:
+    # Spawned workers share the parent's resource tracker, so the block
+    # is unlinked once, by the parent.
+    _memory = shared_memory.SharedMemory(shared_name)
+    try:
+        _vectors = np.ndarray(
+            (rows, dimension),
+            dtype=np.float32,
+            buffer=_memory.buf,
+        )
+        _vectors[offset : offset + len(texts)] = _worker.model.embed_documents(
+            texts,
+        )
+        del _vectors
+    finally:
+        _memory.close()
+
+
+def _dimension() -> int:
+    return len(_worker.model.embed_query("dimension"))
+
+
+class EmbeddingPool(embeddings.Embeddings):
+    """Embeddings computed by a pool of worker processes.
+
+    Every worker loads the model once and runs it with a fixed number
+    of threads. Texts are sharded into batches across the workers, and
+    the vectors are written straight into a shared memory block instead
+    of being pickled back. The pool is itself an `Embeddings`, so it can
+    be handed to any `BaseStorage`.
+    """
+
+    def __init__(
+        self,
+        model_name: str = DEFAULT_MODEL,
+        backend: str = "huggingface",
+        *,
+        processes: int | None = None,
+        threads_per_process: int = 1,
+        batch_size: int = 256,
+        pin_cpus: bool = False,
+        factory: Callable[..., embeddings.Embeddings] = get_embeddings,
+        **kwargs: object,
+    ) -> None:
+        """Instantiate the class.
+
+        Args:
+            model_name: Name of the model on the Hugging Face Hub.
+                Defaults to "sentence-transformers/all-MiniLM-L6-v2".
+            backend: Backend every worker runs the model with, see
+                `get_embeddings`. Defaults to "huggingface".
+            processes: Number of workers. Defaults to None, which
+                uses one per `threads_per_process` cores.
+            threads_per_process: Number of threads of every worker.
+                Defaults to 1.
+            batch_size: Number of texts sent to a worker at once.
+                Defaults to 256.
+            pin_cpus: Whether to pin every worker to its own cores.
+                Only supported on Linux. Defaults to False.
+            factory: Function every worker builds its model with, given
+                the model name, the backend and `kwargs`. It must be
+                importable by the workers. Defaults to `get_embeddings`.
+            kwargs: Key-word arguments to pass to the model.
+        """
+        if processes is None:
+            processes = max(1, (os.cpu_count() or 1) // threads_per_process)
+        self.batch_size = batch_size
+        _context = multiprocessing.get_context("spawn")
+        self._executor = concurrent.futures.ProcessPoolExecutor(
+            processes,
+            _context,
+            initializer=_start_worker,
+            initargs=(
+                _WorkerSettings(
+                    model_name,
+                    backend,
+                    threads_per_process,
+                    pin_cpus,
+                    factory,
+                    kwargs,
+                ),
+                _context.Value("i", 0),
+            ),
+        )
+        self.dimension = self._executor.submit(_dimension).result()
+
+    @typing.override
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        if not texts:
+            return []
+        _memory = shared_memory.SharedMemory(
+            create=True,
+            size=len(texts) * self.dimension * np.dtype(np.float32).itemsize,
+        )
+        try:
+            _futures = [
+                self._executor.submit(
+                    _embed_into,
+                    _memory.name,
+                    len(texts),
+                    self.dimension,
+                    _offset,
+                    texts[_offset : _offset + self.batch_size],
+                )
+                for _offset in range(0, len(texts), self.batch_size)
+            ]
+            for _future in _futures:
+                _future.result()
+            _vectors = np.ndarray(
+                (len(texts), self.dimension),
+                dtype=np.float32,
+                buffer=_memory.buf,
+            )
+            _result = _vectors.tolist()
+            del _vectors
+        finally:
+            _memory.close()
+            _memory.unlink()
+        return _result
+
+    @typing.override
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+    def close(self) -> None:
+        """Stop the workers."""
+        self._executor.shutdown()
+
+    def __enter__(self) -> typing.Self:
+        """Use the pool as a context manager closing it on exit."""
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        """Stop the workers."""
+        self.close()
@@ -2,4 +2,8 @@
 
 from . import context_ranking_listwise, lm_vs_lm, self_check
 
-__all__ = ["self_check", "lm_vs_lm", "context_ranking_listwise"]
+__all__ = [
+    "context_ranking_listwise",
+    "lm_vs_lm",
+    "self_check",
+]
@@ -5,11 +5,120 @@ with a local LLM and several other thigns that make it work
 with the rest of the codebase better.
 """
 
+import re
 from collections.abc import Callable
 
-from parea.evals.utils import call_openai, ndcg
+from parea.evals.utils import ndcg
 from parea.schemas.log import Log
 
+from .. import caching, concurrency
+
+
+def _parse_ranking(answer: str, length: int) -> list[int]:
+    """Turn the LLM's ranking into a permutation of range(length).
+
+    The passages are numbered from 1. Invalid and repeated numbers are
+    dropped and the missing passages are appended in their original
+    order.
+    """
+    # The answer may echo the prompt's "Sorted Passages = [".
+    numbers = re.findall(r"\d+", answer.rsplit("=", 1)[-1])
+    seen = set()
+    permutation = []
+    for i in (int(number) - 1 for number in numbers):
+        if 0 <= i < length and i not in seen:
+            seen.add(i)
+            permutation.append(i)
+    return permutation + [i for i in range(length) if i not in seen]
+
+
+def _progressive(
+    rank: Callable[[list[str]], list[int]],
+    contexts: list[str],
+    window_size: int,
+) -> list[int]:
+    """Rank the contexts by sliding a window from the tail to the head.
+
+    Contexts fitting in one window are ranked in a single call.
+    """
+    window_step = window_size // 2
+    offset = len(contexts) - window_size
+
+    indices = list(range(len(contexts)))
+
+    while offset > 0:
+        window_contexts = contexts[offset : offset + window_size]
+        window_indices = indices[offset : offset + window_size]
+        reranked_indices = rank(window_contexts)
+        contexts[offset : offset + window_size] = [
+            window_contexts[i] for i in reranked_indices
+        ]
+        indices[offset : offset + window_size] = [
+            window_indices[i] for i in reranked_indices
+        ]
+
+        offset -= window_step
+
+    window_contexts = contexts[:window_size]
+    window_indices = indices[:window_size]
+    reranked_indices = rank(window_contexts)
+    contexts[:window_size] = [window_contexts[i] for i in reranked_indices]
+    indices[:window_size] = [window_indices[i] for i in reranked_indices]
+
+    return indices
+
+
+def _tournament(
+    rank: Callable[[list[str]], list[int]],
+    contexts: list[str],
+    window_size: int,
+    max_workers: int,
+    limiter: concurrency.RateLimiter,
+) -> list[int]:
+    """Rank the contexts by knocking out the bottom half of each window.
+
+    Non-overlapping windows are ranked concurrently, then the top halves
+    of adjacent windows are merged and ranked again until one is left.
+    Only the top half of the final window is compared against every
+    other context, so only it is reordered; the contexts knocked out
+    on the way keep their retrieved order below it. Contexts fitting
+    in one window are all ranked in a single call.
+    """
+    if len(contexts) <= window_size:
+        return rank(contexts)
+
+    def _rank(window: list[int]) -> list[int]:
+        return [window[i] for i in rank([contexts[i] for i in window])]
+
+    indices = list(range(len(contexts)))
+    windows = [
+        indices[offset : offset + window_size]
+        for offset in range(0, len(contexts), window_size)
+    ]
+    windows = concurrency.map_concurrently(
+        _rank,
+        windows,
+        max_workers,
+        limiter,
+    )
+
+    half = max(1, window_size // 2)
+    while len(windows) > 1:
+        pairs = [windows[i : i + 2] for i in range(0, len(windows), 2)]
+        windows = concurrency.map_concurrently(
+            lambda pair: (
+                _rank([i for window in pair for i in window[:half]])
+                if len(pair) > 1
+                else pair[0][:half]
+            ),
+            pairs,
+            max_workers,
+            limiter,
+        )
+
+    winners = windows[0][:half]
+    return winners + [i for i in indices if i not in winners]
+
 
 def context_ranking_listwise_factory(
     question_field: str = "question",
@@ -18,31 +127,53 @@ def context_ranking_listwise_factory(
     n_contexts_to_rank: int = 10,
     model: str | None = "gpt-3.5-turbo-16k",
     is_azure: bool | None = False,
+    cache: caching.LLMCache | None = None,
+    mode: str = "progressive",
+    max_workers: int = 8,
+    calls_per_second: float = 10.0,
 ) -> Callable[[Log], float]:
-    """Copy of context_ranking_listwise_factory from Parea."""
+    """Copy of context_ranking_listwise_factory from Parea.
+
+    The "progressive" mode slides a window from the tail to the head,
+    one call after another. The "tournament" mode ranks non-overlapping
+    windows concurrently, then repeatedly merges the top halves of
+    adjacent windows and ranks the merged windows concurrently. It needs
+    1 + ceil(log2(W)) rounds of calls for W windows instead of about 2W
+    sequential calls, and ranks the n_contexts_to_rank // 2 most
+    relevant contexts, as the progressive mode does. With a `cache`,
+    re-evaluating the same retrieval costs no calls.
+    """
     if n_contexts_to_rank < 1:
-        raise ValueError("n_contexts_to_rank must be at least 1.")
+        msg = "n_contexts_to_rank must be at least 1."
+        raise ValueError(msg)
+    if mode not in ("progressive", "tournament"):
+        msg = "mode must be 'progressive' or 'tournament'."
+        raise ValueError(msg)
+
+    limiter = concurrency.RateLimiter(calls_per_second, burst=max_workers)
 
     def listwise_reranking(query: str, contexts: list[str]) -> list[int]:
         """Uses a LLM to listwise rerank the contexts.
 
         Returns the indices of the contexts in the order of their
-        relevance (most relevant to least relevant).
+        relevance (most relevant to least relevant). The passages are
+        numbered from 1 in the prompt, and contexts missing from the
+        answer are appended in their original order.
         """
         contexts_length = len(contexts)
         if contexts_length in (0, 1):
             return list(range(contexts_length))
 
-        prompt = ""
-        for i in range(len(contexts)):
-            prompt += f"{i + 1} = {contexts[i]}\n"
-
-        prompt += f"""Query = {query}
+        passages = "".join(
+            f"{i + 1} = {context}\n" for i, context in enumerate(contexts)
+        )
+        prompt = f"""{passages}Query = {query}
         Passages = [1, ..., {len(contexts)}]
         Sort the Passages by their relevance to the Query.
         Sorted Passages = ["""
 
-        sorted_list = call_openai(
+        sorted_list = caching.cached_call_openai(
+            cache,
             messages=[
                 {
                     "role": "user",
@@ -54,52 +185,38 @@ def context_ranking_listwise_factory(
             is_azure=is_azure,
         )
 
-        s = sorted_list.strip("[] ").replace(" ", "")[16:]
-        number_strings = s.split(",")
-        return [int(num) for num in number_strings if num.isdigit()]
+        return _parse_ranking(sorted_list, contexts_length)
 
-    def progressive_reranking(query: str, contexts: list[str]) -> list[int]:
+    def rerank(query: str, contexts: list[str]) -> list[int]:
         """Returns the indices of the contexts in the order of their relevance."""
-        if len(contexts) <= n_contexts_to_rank:
-            return listwise_reranking(query, contexts)
-
-        window_size = n_contexts_to_rank
-        window_step = n_contexts_to_rank // 2
-        offset = len(contexts) - window_size
-
-        indices = list(range(len(contexts)))
-
-        while offset > 0:
-            window_contexts = contexts[offset : offset + window_size]
-            window_indices = indices[offset : offset + window_size]
-            reranked_indices = listwise_reranking(query, window_contexts)
-            contexts[offset : offset + window_size] = [
-                window_contexts[i] for i in reranked_indices
-            ]
-            indices[offset : offset + window_size] = [
-                window_indices[i] for i in reranked_indices
-            ]
-
-            offset -= window_step
-
-        window_contexts = contexts[:window_size]
-        window_indices = indices[:window_size]
-        reranked_indices = listwise_reranking(query, window_contexts)
-        contexts[:window_size] = [window_contexts[i] for i in reranked_indices]
-        indices[:window_size] = [window_indices[i] for i in reranked_indices]
-
-        return indices
+        if mode == "tournament":
+            return _tournament(
+                lambda window: listwise_reranking(query, window),
+                contexts,
+                n_contexts_to_rank,
+                max_workers,
+                limiter,
+            )
+        return _progressive(
+            lambda window: listwise_reranking(query, window),
+            contexts,
+            n_contexts_to_rank,
+        )
 
     def context_ranking(log: Log) -> float:
         """Quantifies if the retrieved context is ranked by their relevancy."""
         question = log.inputs[question_field]
         contexts = log.inputs["context"]
 
-        reranked_indices = progressive_reranking(question, contexts)
-        print(reranked_indices)
+        reranked_indices = rerank(question, list(contexts))
 
         if ranking_measurement == "ndcg":
-            return ndcg(reranked_indices, list(range(len(contexts))))
+            # The LLM's ranking grades the contexts, the retrieval order
+            # is the ranking being judged.
+            relevance = [0] * len(contexts)
+            for position, i in enumerate(reranked_indices):
+                relevance[i] = len(contexts) - position
+            return ndcg(relevance, list(range(len(contexts))))
         else:
             raise NotImplementedError
 
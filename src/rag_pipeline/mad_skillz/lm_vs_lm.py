@@ -5,16 +5,129 @@ with a local LLM and several other thigns that make it work
 with the rest of the codebase better.
 """
 
+import re
+import time
+import typing
 from collections.abc import Callable
 
-from langchain_community.llms import llamafile
-from parea.evals.utils import call_openai
+from parea.evals.utils import sent_tokenize
 from parea.schemas.log import Log
 
+from .. import caching, clients, concurrency
+
+Messages = list[dict[str, str]]
+
+VERDICT_INSTRUCTION = (
+    " As soon as you are sure, stop asking questions and reply with"
+    ' "Verdict: correct" or "Verdict: incorrect" instead.'
+)
+VERDICT_PATTERN = re.compile(r"verdict:\W*(correct|incorrect)", re.IGNORECASE)
+CLAIM_SETUP_PROMPT = (
+    "Your goal is to try to verify the correctness of the following claim:"
+    ' "{claim}", based on the background information you will gather.'
+    " To gather this, You will provide short questions whose purpose will"
+    " be to verify the correctness of the claim, and I will reply to you"
+    " with the answers to these. Hopefully, with the help of the background"
+    " questions and their answers, you will be able to reach a conclusion as"
+    " to whether the claim is correct or possibly incorrect. Please keep"
+    " asking questions as long as you're yet to be sure regarding the true"
+    f" veracity of the claim.{VERDICT_INSTRUCTION} Please start with the"
+    " first questions."
+)
+CLAIM_FOLLOW_UP_PROMPT = (
+    "Do you have any follow-up questions? If so, ask them."
+    f"{VERDICT_INSTRUCTION}"
+)
+CLAIM_DECISION_PROMPT = (
+    "Based on the interviewee's answers to your questions, what is your"
+    " conclusion regarding the correctness of the claim? Do you think it is"
+    " correct or incorrect?"
+)
+SUMMARY_PROMPT = (
+    "Summarize the following interview, keeping every fact that matters"
+    " for verifying the claim:\n{interview}"
+)
+
+
+class ClaimsOptions(typing.TypedDict, total=False):
+    """Key-word arguments of `lm_vs_lm_claims_factory`."""
+
+    is_azure: bool | None
+    cache: caching.LLMCache | None
+    max_rounds: int
+    max_history_messages: int
+    max_workers: int
+    calls_per_second: float
+
+
+def _render(messages: Messages) -> str:
+    return "\n".join(message["content"] for message in messages)
+
+
+def _ask_examiner(
+    messages: Messages,
+    examiner_model: str,
+    cache: caching.LLMCache | None,
+    stats: concurrency.CallStats | None,
+    *,
+    is_azure: bool | None,
+) -> str:
+    return concurrency.track(
+        stats,
+        _render(messages),
+        lambda: caching.cached_call_openai(
+            cache,
+            model=examiner_model,
+            messages=messages,
+            temperature=0.0,
+            is_azure=is_azure,
+        ),
+    )
+
+
+def _ask_examinee(
+    questions: str,
+    cache: caching.LLMCache | None,
+    stats: concurrency.CallStats | None,
+) -> str:
+    return concurrency.track(
+        stats,
+        questions,
+        lambda: caching.attach(clients.get_llamafile(), cache).invoke(
+            questions,
+        ),
+    )
+
+
+def _verdict(response: str) -> float | None:
+    verdict = VERDICT_PATTERN.search(response)
+    if verdict is None:
+        return None
+    return float(verdict.group(1).lower() == "correct")
+
+
+def _compact(
+    messages: Messages,
+    max_messages: int,
+    ask: Callable[[Messages], str],
+) -> Messages:
+    """Replace the middle of a long interview by the examiner's summary."""
+    if len(messages) <= max_messages:
+        return messages
+    _prompt = SUMMARY_PROMPT.format(interview=_render(messages[1:-1]))
+    _summary = ask([{"role": "user", "content": _prompt}])
+    return [
+        messages[0],
+        {"role": "assistant", "content": f"Notes so far: {_summary}"},
+        messages[-1],
+    ]
+
 
 def lm_vs_lm_factuality_factory(
     examiner_model: str = "gpt-4",
     is_azure: bool | None = False,
+    cache: caching.LLMCache | None = None,
+    stats: concurrency.CallStats | None = None,
 ) -> Callable[[Log], float]:
     """Copy of lm_vs_lm."""
 
@@ -25,10 +138,11 @@ def lm_vs_lm_factuality_factory(
         # ask examiner for follow-up questions
         setup_prompt = f"""Your goal is to try to verify the correctness of the following claim: "{output}", based on the background information you will gather. To gather this, You will provide short questions whose purpose will be to verify the correctness of the claim, and I will reply to you with the answers to these. Hopefully, with the help of the background questions and their answers, you will be able to reach a conclusion as to whether the claim is correct or possibly incorrect. Please keep asking questions as long as you’re yet to be sure regarding the true veracity of the claim. Please start with the first questions."""
         messages_examiner = [{"role": "user", "content": setup_prompt}]
-        follow_up_questions = call_openai(
-            model=examiner_model,
-            messages=messages_examiner,
-            temperature=0.0,
+        follow_up_questions = _ask_examiner(
+            messages_examiner,
+            examiner_model,
+            cache,
+            stats,
             is_azure=is_azure,
         )
         messages_examiner += [
@@ -43,8 +157,10 @@ def lm_vs_lm_factuality_factory(
             messages_examinee += [
                 {"role": "user", "content": follow_up_questions}
             ]
-            follow_up_answers = llamafile.Llamafile().invoke(
+            follow_up_answers = _ask_examinee(
                 follow_up_questions,
+                cache,
+                stats,
             )
 
             messages_examiner.append(
@@ -59,10 +175,11 @@ def lm_vs_lm_factuality_factory(
                 )
                 n_rounds_follow_up_questions += 1
 
-            examiner_response = call_openai(
-                model=examiner_model,
-                messages=messages_examiner,
-                temperature=0.0,
+            examiner_response = _ask_examiner(
+                messages_examiner,
+                examiner_model,
+                cache,
+                stats,
                 is_azure=is_azure,
             )
             messages_examiner += [
@@ -83,12 +200,147 @@ def lm_vs_lm_factuality_factory(
         messages_examiner += [
             {"role": "user", "content": factuality_decision_prompt},
         ]
-        examiner_response = call_openai(
-            model=examiner_model,
-            messages=messages_examiner,
-            temperature=0.0,
+        examiner_response = _ask_examiner(
+            messages_examiner,
+            examiner_model,
+            cache,
+            stats,
             is_azure=is_azure,
         )
         return float("incorrect" not in examiner_response.lower())
 
     return lm_vs_lm_factuality
+
+
+def lm_vs_lm_claims_factory(
+    examiner_model: str = "gpt-4",
+    *,
+    is_azure: bool | None = False,
+    cache: caching.LLMCache | None = None,
+    stats: concurrency.CallStats | None = None,
+    max_rounds: int = 4,
+    max_history_messages: int = 6,
+    max_workers: int = 8,
+    calls_per_second: float = 10.0,
+) -> Callable[[Log], float]:
+    """Bounded, claim-level version of lm_vs_lm.
+
+    The output is split into sentences, which are verified as separate
+    claims concurrently. The examiner is asked to give a verdict as soon
+    as it is sure, which ends the interview early. Once the examiner's
+    history grows past `max_history_messages`, the middle of the
+    interview is replaced by the examiner's own summary, so every round
+    re-sends a bounded amount of text instead of the whole history.
+    Use `compare_lm_vs_lm` to measure the wall time and tokens of both
+    versions on real data.
+
+    Args:
+        examiner_model: The model verifying the claims.
+            Defaults to "gpt-4".
+        is_azure: Whether the model is hosted on Azure.
+            Defaults to False.
+        cache: Cache of the LLM's responses. Defaults to None.
+        stats: Collects the cost of the calls. Defaults to None.
+        max_rounds: Maximum number of question rounds per claim.
+            Defaults to 4, like the original.
+        max_history_messages: Number of examiner messages above which
+            the history is summarized. Defaults to 6.
+        max_workers: Maximum number of claims verified at once.
+            Defaults to 8.
+        calls_per_second: Rate limit of the examiner's calls, shared by
+            all claims. Defaults to 10.
+
+    Returns:
+        A function grading a log with the share of correct claims.
+    """
+    limiter = concurrency.RateLimiter(calls_per_second, burst=max_workers)
+
+    def ask(messages: Messages) -> str:
+        limiter.acquire()
+        return _ask_examiner(
+            messages,
+            examiner_model,
+            cache,
+            stats,
+            is_azure=is_azure,
+        )
+
+    def verify_claim(claim: str) -> float:
+        setup_prompt = CLAIM_SETUP_PROMPT.format(claim=claim)
+        messages = [{"role": "user", "content": setup_prompt}]
+        response = ask(messages)
+        for _ in range(max_rounds):
+            verdict = _verdict(response)
+            if verdict is not None:
+                return verdict
+            answers = _ask_examinee(response, cache, stats)
+            messages = _compact(
+                [
+                    *messages,
+                    {"role": "assistant", "content": response},
+                    {
+                        "role": "user",
+                        "content": f"{answers}\n{CLAIM_FOLLOW_UP_PROMPT}",
+                    },
+                ],
+                max_history_messages,
+                ask,
+            )
+            response = ask(messages)
+
+        verdict = _verdict(response)
+        if verdict is not None:
+            return verdict
+        response = ask(
+            [
+                *messages,
+                {"role": "assistant", "content": response},
+                {"role": "user", "content": CLAIM_DECISION_PROMPT},
+            ],
+        )
+        return float("incorrect" not in response.lower())
+
+    def lm_vs_lm_claims(log: Log) -> float:
+        claims = sent_tokenize(log.output)
+        if not claims:
+            return 0.0
+        verdicts = concurrency.map_concurrently(
+            verify_claim,
+            claims,
+            max_workers,
+        )
+        return sum(verdicts) / len(verdicts)
+
+    return lm_vs_lm_claims
+
+
+def compare_lm_vs_lm(
+    log: Log,
+    examiner_model: str = "gpt-4",
+    **kwargs: typing.Unpack[ClaimsOptions],
+) -> dict[str, concurrency.CallStats]:
+    """Measure the cost and latency of both versions on the same log.
+
+    Both versions call the models for real, so run it without a cache
+    to get meaningful numbers.
+
+    Args:
+        log: The log to evaluate.
+        examiner_model: The model verifying the claims.
+            Defaults to "gpt-4".
+        kwargs: Key-word arguments to pass to `lm_vs_lm_claims_factory`.
+
+    Returns:
+        The statistics of the "original" and the "claims" runs.
+    """
+    original = concurrency.CallStats()
+    start = time.perf_counter()
+    lm_vs_lm_factuality_factory(examiner_model, stats=original)(log)
+    original.seconds = time.perf_counter() - start
+
+    claims = concurrency.CallStats()
+    start = time.perf_counter()
+    lm_vs_lm_claims_factory(examiner_model, stats=claims, **kwargs)(log)
+    claims.seconds = time.perf_counter() - start
+
+    return {"original": original, "claims": claims}
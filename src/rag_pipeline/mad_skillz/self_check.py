@@ -5,33 +5,139 @@ with a local LLM and several other thigns that make it work
 with the rest of the codebase better.
 """
 
-from langchain_community.llms import llamafile
-from parea.evals.utils import call_openai, sent_tokenize
+import json
+import re
+import time
+import typing
+
+from parea.evals.utils import sent_tokenize
 from parea.schemas.log import Log
 
+from .. import caching, clients, concurrency
+
+N_SAMPLED_OUTPUTS = 5
+MODEL = "gpt-4o-mini"
+
+
+class ConcurrencyOptions(typing.TypedDict, total=False):
+    """Key-word arguments of `self_check_concurrent` tuning its calls."""
+
+    max_workers: int
+    calls_per_second: float
+    batch_sentences: bool
+
+
+def _sample(
+    question: str,
+    cache: caching.LLMCache | None,
+    stats: concurrency.CallStats | None,
+    *,
+    use_llamafile: bool,
+) -> str:
+    prompt = f"Question: {question}"
+    if use_llamafile:
+        return concurrency.track(
+            stats,
+            prompt,
+            lambda: caching.attach(clients.get_llamafile(), cache).invoke(
+                prompt,
+            ),
+        )
+    return concurrency.track(
+        stats,
+        prompt,
+        lambda: caching.cached_call_openai(
+            cache,
+            messages=[
+                {
+                    "role": "user",
+                    "content": f"""
+{prompt}""",
+                },
+            ],
+            model=MODEL,
+            temperature=1.0,
+        ),
+    )
+
+
+def _verify(
+    sentence: str,
+    sampled_output: str,
+    cache: caching.LLMCache | None,
+    stats: concurrency.CallStats | None,
+) -> float:
+    prompt = f"""Context: {sampled_output}
+Sentence: {sentence}
+Is the sentence supported by the context above?
+Answer Yes or No:"""
+    response = concurrency.track(
+        stats,
+        prompt,
+        lambda: caching.cached_call_openai(
+            cache,
+            messages=[{"role": "user", "content": prompt}],
+            model=MODEL,
+            temperature=0.0,
+        ),
+    )
+    return float("yes" in response.lower())
 
-def self_check(log: Log, use_llamafile: bool) -> float | None:
+
+def _verify_batch(
+    sentences: list[str],
+    sampled_output: str,
+    cache: caching.LLMCache | None,
+    stats: concurrency.CallStats | None,
+) -> list[float] | None:
+    """Verify all sentences against one sample in a single call.
+
+    Returns:
+        One score per sentence or None if the answer could not be parsed.
+    """
+    numbered = "\n".join(
+        f"{i + 1}. {sentence}" for i, sentence in enumerate(sentences)
+    )
+    prompt = f"""Context: {sampled_output}
+Sentences:
+{numbered}
+For each sentence, is it supported by the context above?
+Answer with a JSON list containing "Yes" or "No" for each sentence, in order:"""
+    response = concurrency.track(
+        stats,
+        prompt,
+        lambda: caching.cached_call_openai(
+            cache,
+            messages=[{"role": "user", "content": prompt}],
+            model=MODEL,
+            temperature=0.0,
+        ),
+    )
+    match = re.search(r"\[.*\]", response, re.DOTALL)
+    if match is None:
+        return None
+    try:
+        answers = json.loads(match.group())
+    except json.JSONDecodeError:
+        return None
+    if not isinstance(answers, list) or len(answers) != len(sentences):
+        return None
+    return [float("yes" in str(answer).lower()) for answer in answers]
+
+
+def self_check(
+    log: Log,
+    use_llamafile: bool,
+    cache: caching.LLMCache | None = None,
+    stats: concurrency.CallStats | None = None,
+) -> float | None:
     """Copy of self_check."""
     question = log.inputs["question"]
 
-    n_sampled_outputs = 5
-    sampled_outputs = []
-    for _ in range(n_sampled_outputs):
-        if use_llamafile:
-            response = llamafile.Llamafile().invoke(f"Question: {question}")
-        else:
-            response = call_openai(
-                messages=[
-                    {
-                        "role": "user",
-                        "content": f"""
-Question: {question}""",
-                    },
-                ],
-                model="gpt-4o-mini",
-                temperature=1.0,
-            )
-        sampled_outputs.append(response)
+    sampled_outputs = [
+        _sample(question, cache, stats, use_llamafile=use_llamafile)
+        for _ in range(N_SAMPLED_OUTPUTS)
+    ]
 
     sentences = sent_tokenize(log.output)
 
@@ -40,22 +146,142 @@ Question: {question}""",
 
     sentences_scores = []
     for sentence in sentences:
-        scores = []
-        for sampled_output in sampled_outputs:
-            response = call_openai(
-                messages=[
-                    {
-                        "role": "user",
-                        "content": f"""Context: {sampled_output}
-Sentence: {sentence}
-Is the sentence supported by the context above?
-Answer Yes or No:""",
-                    },
-                ],
-                model="gpt-4o-mini",
-                temperature=0.0,
-            )
-            scores.append(float("yes" in response.lower()))
+        scores = [
+            _verify(sentence, sampled_output, cache, stats)
+            for sampled_output in sampled_outputs
+        ]
         sentences_scores.append(sum(scores) / len(scores))
 
     return sum(sentences_scores) / len(sentences_scores)
+
+
+def self_check_concurrent(
+    log: Log,
+    *,
+    use_llamafile: bool,
+    cache: caching.LLMCache | None = None,
+    stats: concurrency.CallStats | None = None,
+    max_workers: int = 8,
+    calls_per_second: float = 10.0,
+    batch_sentences: bool = True,
+) -> float | None:
+    """Concurrent version of self_check.
+
+    The samples are drawn in parallel, then every sample is checked
+    against the sentences in parallel. With `batch_sentences`, all
+    sentences are verified against one sample in a single structured
+    prompt; samples whose answer cannot be parsed fall back to one call
+    per sentence.
+
+    For an output of S sentences, the serial version issues 5 + 5S calls
+    one after another, so it takes about (5 + 5S) round trips. This one
+    issues 10 calls (5 + 5S without batching) in two waves, so it takes
+    about two round trips as long as the rate limit allows it. Batching
+    also sends every sample once instead of S times, which cuts the
+    prompt tokens roughly by a factor of S. Use `compare_self_check`
+    to measure both on real data.
+
+    Args:
+        log: The log to evaluate.
+        use_llamafile: Whether to draw the samples from the local LLM.
+        cache: Cache of the LLM's responses. Defaults to None.
+        stats: Collects the cost of the calls. Defaults to None.
+        max_workers: Maximum number of calls in flight. Defaults to 8.
+        calls_per_second: Rate limit of the calls. Defaults to 10.
+        batch_sentences: Whether to verify all sentences against a sample
+            in one call. Defaults to True.
+
+    Returns:
+        The share of sentences supported by the samples.
+    """
+    question = log.inputs["question"]
+    limiter = concurrency.RateLimiter(calls_per_second, burst=max_workers)
+
+    sampled_outputs = concurrency.map_concurrently(
+        lambda _: _sample(question, cache, stats, use_llamafile=use_llamafile),
+        range(N_SAMPLED_OUTPUTS),
+        max_workers,
+        limiter,
+    )
+
+    sentences = sent_tokenize(log.output)
+
+    if len(sentences) == 0:
+        return 0.0
+
+    if batch_sentences:
+        batches = concurrency.map_concurrently(
+            lambda sampled_output: _verify_batch(
+                sentences,
+                sampled_output,
+                cache,
+                stats,
+            ),
+            sampled_outputs,
+            max_workers,
+            limiter,
+        )
+    else:
+        batches = [None] * len(sampled_outputs)
+
+    pairs = [
+        (sentence, sampled_output)
+        for sampled_output, batch in zip(sampled_outputs, batches, strict=True)
+        if batch is None
+        for sentence in sentences
+    ]
+    fallback = iter(
+        concurrency.map_concurrently(
+            lambda pair: _verify(*pair, cache, stats),
+            pairs,
+            max_workers,
+            limiter,
+        ),
+    )
+    scores = [
+        batch if batch is not None else [next(fallback) for _ in sentences]
+        for batch in batches
+    ]
+
+    sentences_scores = [
+        sum(sample_scores[i] for sample_scores in scores) / len(scores)
+        for i in range(len(sentences))
+    ]
+    return sum(sentences_scores) / len(sentences_scores)
+
+
+def compare_self_check(
+    log: Log,
+    *,
+    use_llamafile: bool,
+    **kwargs: typing.Unpack[ConcurrencyOptions],
+) -> dict[str, concurrency.CallStats]:
+    """Measure the cost and latency of both versions on the same log.
+
+    Both versions call the models for real, so run it without a cache
+    to get meaningful numbers.
+
+    Args:
+        log: The log to evaluate.
+        use_llamafile: Whether to draw the samples from the local LLM.
+        kwargs: Key-word arguments to pass to `self_check_concurrent`.
+
+    Returns:
+        The statistics of the "serial" and the "concurrent" runs.
+    """
+    serial = concurrency.CallStats()
+    start = time.perf_counter()
+    self_check(log, use_llamafile, stats=serial)
+    serial.seconds = time.perf_counter() - start
+
+    concurrent = concurrency.CallStats()
+    start = time.perf_counter()
+    self_check_concurrent(
+        log,
+        use_llamafile=use_llamafile,
+        stats=concurrent,
+        **kwargs,
+    )
+    concurrent.seconds = time.perf_counter() - start
+
+    return {"serial": serial, "concurrent": concurrent}
@@ -0,0 +1,528 @@
+"""Single-pass extraction of text blocks from HTML and Markdown.
+
+Both parsers walk a document once and yield its blocks of text in
+order: paragraphs, list items, code and tables. Every block carries the
+headers it is nested under, so the structure of the document survives
+as metadata without a partitioning model. HTML is parsed incrementally
+by lxml, and Markdown line by line, so neither is held in memory whole.
+"""
+
+import dataclasses
+import pathlib
+import re
+import typing
+from collections.abc import Iterable, Iterator, Sequence
+
+from lxml import etree
+
+HTML_HEADERS = (
+    ("h1", "Header 1"),
+    ("h2", "Header 2"),
+    ("h3", "Header 3"),
+)
+MARKDOWN_HEADERS = (
+    ("#", "Header 1"),
+    ("##", "Header 2"),
+    ("###", "Header 3"),
+)
+_HTML_BLOCKS = frozenset(
+    {
+        "address",
+        "article",
+        "aside",
+        "blockquote",
+        "body",
+        "dd",
+        "details",
+        "div",
+        "dl",
+        "dt",
+        "fieldset",
+        "figcaption",
+        "figure",
+        "footer",
+        "form",
+        "h1",
+        "h2",
+        "h3",
+        "h4",
+        "h5",
+        "h6",
+        "header",
+        "html",
+        "li",
+        "main",
+        "nav",
+        "ol",
+        "p",
+        "pre",
+        "section",
+        "summary",
+        "table",
+        "ul",
+    },
+)
+_HTML_SKIPPED = frozenset(
+    {"head", "noscript", "script", "style", "template"},
+)
+_ATX = re.compile(r" {0,3}(#{1,6})(?:[ \t]+(.*?))?(?:[ \t]+#+)?[ \t]*$")
+_SETEXT = re.compile(r" {0,3}(=+|-+)[ \t]*$")
+_FENCE = re.compile(r" {0,3}(`{3,}|~{3,})")
+_TABLE_DELIMITER = re.compile(
+    r" {0,3}\|?[ \t]*:?-+:?[ \t]*(?:\|[ \t]*:?-+:?[ \t]*)*\|?[ \t]*$",
+)
+# Boundaries oversized text is split at, from the most to the least
+# preferred: lines, sentences, then words.
+_BOUNDARIES = (
+    re.compile(r"(\n+)"),
+    re.compile(r"((?<=[.!?])\s+)"),
+    re.compile(r"(\s+)"),
+)
+
+Kind = typing.Literal["text", "code", "table"]
+
+
+@dataclasses.dataclass
+class Block:
+    """A block of text of a document.
+
+    Attributes:
+        text: Content of the block.
+        headers: Headers the block is nested under, keyed by their
+            metadata name such as "Header 1". Consecutive blocks under
+            the same headers share the same dictionary.
+        kind: "code" and "table" blocks are meant to be kept whole.
+    """
+
+    text: str
+    headers: dict[str, str]
+    kind: Kind = "text"
+
+
+@dataclasses.dataclass
+class Section:
+    """The blocks of text under the same headers, joined.
+
+    Attributes:
+        text: Content of the blocks, separated by blank lines.
+        headers: Headers the section is nested under.
+    """
+
+    text: str
+    headers: dict[str, str]
+
+
+class _Piece(typing.NamedTuple):
+    separator: str
+    text: str
+    atomic: bool
+
+
+class _Headers:
+    """The stack of headers the current block is nested under."""
+
+    def __init__(self) -> None:
+        self._stack: dict[int, tuple[str, str]] = {}
+        self.current: dict[str, str] = {}
+
+    def push(self, level: int, name: str, text: str) -> None:
+        self._stack = {
+            _level: header
+            for _level, header in self._stack.items()
+            if _level < level
+        }
+        self._stack[level] = (name, text)
+        # A new dictionary, so blocks under the previous headers keep
+        # theirs and a change of section is a change of identity.
+        self.current = dict(
+            self._stack[_level] for _level in sorted(self._stack)
+        )
+
+
+def _html_text(element: etree._Element) -> str:
+    # Blocks nested in the element are cleared once yielded, so only
+    # the text of the element and of its inline children is left.
+    _parts = [element.text or ""]
+    for _child in element:
+        if isinstance(_child.tag, str) and _child.tag not in _HTML_SKIPPED:
+            _parts.append(_html_text(_child))
+        _parts.append(_child.tail or "")
+    return "".join(_parts)
+
+
+def _html_leading_text(element: etree._Element) -> str:
+    # Loose text of the parent block before a nested block starts, which
+    # is taken out so it is yielded ahead of the nested block.
+    _parent = element.getparent()
+    if _parent is None or _parent.tag not in _HTML_BLOCKS:
+        return ""
+    _parts = [_parent.text or ""]
+    _parent.text = None
+    while _parent[0] is not element:
+        _child = _parent[0]
+        if isinstance(_child.tag, str) and _child.tag not in _HTML_SKIPPED:
+            _parts.append(_html_text(_child))
+        _parts.append(_child.tail or "")
+        del _parent[0]
+    return "".join(_parts)
+
+
+def _html_table(element: etree._Element) -> str:
+    return "\n".join(
+        " | ".join(
+            " ".join(_html_text(cell).split())
+            for cell in row
+            if cell.tag in ("td", "th")
+        )
+        for row in element.iter("tr")
+    )
+
+
+def _html_block(
+    element: etree._Element,
+    names: dict[str, str],
+    headers: _Headers,
+) -> Block | None:
+    # The block an element ends with, or None for a tracked header,
+    # whose text goes to the headers instead.
+    _tag = element.tag
+    _kind: Kind = "text"
+    if _tag in names:
+        _text = " ".join(_html_text(element).split())
+        if _text:
+            headers.push(int(_tag[1]), names[_tag], _text)
+        return None
+    if _tag == "table":
+        _text, _kind = _html_table(element), "table"
+    elif _tag == "pre":
+        _text, _kind = _html_text(element).strip("\n"), "code"
+    else:
+        _text = " ".join(_html_text(element).split())
+    return Block(_text, headers.current, _kind) if _text.strip() else None
+
+
+def iter_html_blocks(
+    file_path: str | pathlib.Path,
+    headers_to_split_on: Sequence[tuple[str, str]] = HTML_HEADERS,
+    encoding: str | None = None,
+) -> Iterator[Block]:
+    """Yield the blocks of text of an HTML file, in order.
+
+    The file is parsed incrementally, and every element is cleared as
+    soon as its text is yielded. The text of headers is not yielded,
+    but kept in the headers of the blocks following them.
+
+    Args:
+        file_path: Path to the file.
+        headers_to_split_on: Tags of the headers to track and the
+            metadata names to give them. Defaults to h1 to h3.
+        encoding: Encoding of the file. Defaults to None, which
+            detects it from the document.
+
+    Yields:
+        The blocks. Preformatted text is a "code" block, and a table
+        a "table" block with a row per line.
+    """
+    _names = dict(headers_to_split_on)
+    _headers = _Headers()
+    _tables = 0
+    for _event, _element in etree.iterparse(
+        str(file_path),
+        events=("start", "end"),
+        html=True,
+        encoding=encoding,
+        remove_comments=True,
+        remove_pis=True,
+    ):
+        _tag = _element.tag
+        if _tag == "table":
+            _tables += 1 if _event == "start" else -1
+        if _event == "start":
+            if _tag in _HTML_BLOCKS and not _tables:
+                _text = " ".join(_html_leading_text(_element).split())
+                if _text:
+                    yield Block(_text, _headers.current)
+        elif _tag in _HTML_SKIPPED:
+            _element.clear(keep_tail=True)
+        # The content of a table, nested tables included, is read along
+        # with the outermost table.
+        elif _tag in _HTML_BLOCKS and not _tables:
+            _block = _html_block(_element, _names, _headers)
+            if _block is not None:
+                yield _block
+            _element.clear(keep_tail=True)
+
+
+class _MarkdownParser:
+    """Line-by-line state of `iter_markdown_blocks`."""
+
+    def __init__(
+        self,
+        headers_to_split_on: Sequence[tuple[str, str]],
+    ) -> None:
+        self.names = {len(marker): name for marker, name in headers_to_split_on}
+        self.headers = _Headers()
+        self.lines: list[str] = []
+        self.kind: Kind = "text"
+        self.fence = ""
+
+    def flush(self) -> Iterator[Block]:
+        _text = "\n".join(self.lines).strip("\n")
+        if _text.strip():
+            yield Block(_text, self.headers.current, self.kind)
+        self.lines = []
+        self.kind = "text"
+
+    def header(self, level: int, text: str) -> Iterator[Block]:
+        if level not in self.names or not text:
+            # An untracked header is content, as a block of its own.
+            yield from self.flush()
+            self.lines.append(f"{'#' * level} {text}".rstrip())
+            yield from self.flush()
+            return
+        yield from self.flush()
+        self.headers.push(level, self.names[level], text)
+
+    def feed(self, line: str) -> Iterator[Block]:
+        if self.fence:
+            yield from self.fenced(line)
+        elif not line.strip():
+            yield from self.flush()
+        elif self.kind == "table" and "|" in line:
+            self.lines.append(line)
+        else:
+            if self.kind == "table":
+                yield from self.flush()
+            yield from self.start(line)
+
+    def fenced(self, line: str) -> Iterator[Block]:
+        self.lines.append(line)
+        _stripped = line.strip()
+        if _stripped.startswith(self.fence) and not _stripped.strip(
+            self.fence[0],
+        ):
+            self.fence = ""
+            yield from self.flush()
+
+    def start(self, line: str) -> Iterator[Block]:
+        # A line outside fenced code and tables, which may start one.
+        if _match := _FENCE.match(line):
+            yield from self.flush()
+            self.fence = _match.group(1)
+            self.kind = "code"
+            self.lines.append(line)
+            return
+        if _match := _ATX.match(line):
+            yield from self.header(
+                len(_match.group(1)),
+                (_match.group(2) or "").strip(),
+            )
+            return
+        if (
+            len(self.lines) == 1
+            and "|" in self.lines[0]
+            and "|" in line
+            and _TABLE_DELIMITER.match(line)
+        ):
+            self.kind = "table"
+            self.lines.append(line)
+            return
+        if _match := _SETEXT.match(line):
+            if self.lines:
+                _text = " ".join(part.strip() for part in self.lines)
+                self.lines = []
+                yield from self.header(
+                    1 if _match.group(1)[0] == "=" else 2,
+                    _text,
+                )
+            # Otherwise a thematic break, which has no text.
+            return
+        self.lines.append(line)
+
+
+def iter_markdown_blocks(
+    lines: Iterable[str],
+    headers_to_split_on: Sequence[tuple[str, str]] = MARKDOWN_HEADERS,
+) -> Iterator[Block]:
+    """Yield the blocks of text of a Markdown document, in order.
+
+    Lines are consumed one at a time, so an open file is read lazily.
+    Paragraphs and lists are "text" blocks, fenced code is a "code"
+    block and a pipe table a "table" block, each kept as written. The
+    text of tracked headers is not yielded, but kept in the headers of
+    the blocks following them.
+
+    Args:
+        lines: Lines of the document, such as an open file.
+        headers_to_split_on: Markers of the headers to track and the
+            metadata names to give them. Defaults to "#" to "###".
+
+    Yields:
+        The blocks.
+    """
+    _parser = _MarkdownParser(headers_to_split_on)
+    for _line in lines:
+        yield from _parser.feed(_line.rstrip("\r\n"))
+    yield from _parser.flush()
+
+
+def iter_sections(blocks: Iterable[Block]) -> Iterator[Section]:
+    """Join consecutive blocks under the same headers into sections.
+
+    Args:
+        blocks: Blocks from `iter_html_blocks` or
+            `iter_markdown_blocks`.
+
+    Yields:
+        The sections, in order.
+    """
+    _texts: list[str] = []
+    _headers: dict[str, str] | None = None
+    for _block in blocks:
+        if _block.headers is not _headers and _texts:
+            yield Section("\n\n".join(_texts), _headers or {})
+            _texts = []
+        _headers = _block.headers
+        _texts.append(_block.text)
+    if _texts:
+        yield Section("\n\n".join(_texts), _headers or {})
+
+
+def _split_text(
+    text: str,
+    size: int,
+    separator: str,
+    level: int = 0,
+) -> Iterator[_Piece]:
+    if len(text) <= size:
+        yield _Piece(separator, text, atomic=False)
+        return
+    if level == len(_BOUNDARIES):
+        for _start in range(0, len(text), size):
+            yield _Piece(
+                separator if _start == 0 else "",
+                text[_start : _start + size],
+                atomic=False,
+            )
+        return
+    _parts = _BOUNDARIES[level].split(text)
+    for _index in range(0, len(_parts), 2):
+        if _index:
+            separator = _parts[_index - 1]
+        if _parts[_index]:
+            yield from _split_text(_parts[_index], size, separator, level + 1)
+
+
+def _tail(piece: _Piece, size: int) -> _Piece | None:
+    # The longest end of the piece which fits, cut at the coarsest
+    # boundary possible.
+    for _boundary in _BOUNDARIES:
+        for _match in _boundary.finditer(piece.text):
+            _text = piece.text[_match.end() :]
+            if _text and len(_match.group()) + len(_text) <= size:
+                return _Piece(_match.group(), _text, atomic=False)
+    return None
+
+
+def _overlap(pieces: Sequence[_Piece], size: int) -> list[_Piece]:
+    # The trailing text of a chunk which fits in size: its last whole
+    # pieces, then the last lines, sentences or words of the piece
+    # before them. Code and tables are never cut.
+    _kept: list[_Piece] = []
+    for _piece in reversed(pieces):
+        if _piece.atomic:
+            break
+        _length = len(_piece.separator) + len(_piece.text)
+        if _length > size:
+            _end = _tail(_piece, size)
+            if _end is not None:
+                _kept.append(_end)
+            break
+        _kept.append(_piece)
+        size -= _length
+    return _kept[::-1]
+
+
+def _render(pieces: Sequence[_Piece]) -> str:
+    # Only the separator of the first piece is dropped, so a leading
+    # code block keeps its indentation.
+    return pieces[0].text + "".join(
+        piece.separator + piece.text for piece in pieces[1:]
+    )
+
+
+def _block_pieces(block: Block, size: int) -> Iterator[_Piece]:
+    if block.kind == "text":
+        return _split_text(block.text, size, "\n\n")
+    return iter([_Piece("\n\n", block.text, atomic=True)])
+
+
+def _restart(
+    pieces: Sequence[_Piece],
+    overlap: int,
+) -> tuple[list[_Piece], int]:
+    # The pieces a new chunk starts with, and their length.
+    _pieces = _overlap(pieces, overlap)
+    _length = sum(len(_kept.separator) + len(_kept.text) for _kept in _pieces)
+    if _pieces:
+        _length -= len(_pieces[0].separator)
+    return _pieces, _length
+
+
+def iter_chunks(
+    blocks: Iterable[Block],
+    chunk_size: int = 1000,
+    chunk_overlap: int = 0,
+) -> Iterator[Section]:
+    """Pack blocks into chunks bounded in size, in a single pass.
+
+    Chunks never span two sections. Within a section, blocks are
+    packed into a chunk until the next one would not fit, and text
+    blocks longer than `chunk_size` are split at lines, sentences or
+    words, whichever boundary is the coarsest to fit. "code" and
+    "table" blocks are never split: one that is too long becomes a
+    chunk of its own. The overlap is made of the trailing text of the
+    previous chunk in the same section.
+
+    Args:
+        blocks: Blocks from `iter_html_blocks` or
+            `iter_markdown_blocks`.
+        chunk_size: Maximum number of characters of a chunk.
+            Defaults to 1000.
+        chunk_overlap: Maximum number of characters shared by
+            consecutive chunks. Defaults to 0.
+
+    Yields:
+        The chunks, with the headers of their section.
+
+    Raises:
+        ValueError: If the overlap is not smaller than the size.
+    """
+    if chunk_overlap >= chunk_size:
+        msg = "chunk_overlap must be smaller than chunk_size."
+        raise ValueError(msg)
+    _pieces: list[_Piece] = []
+    _length = 0
+    _fresh = False
+    _headers: dict[str, str] | None = None
+    for _block in blocks:
+        if _block.headers is not _headers:
+            if _fresh:
+                yield Section(_render(_pieces), _headers or {})
+            _pieces, _length, _fresh = [], 0, False
+            _headers = _block.headers
+        for _piece in _block_pieces(_block, chunk_size):
+            _added = len(_piece.separator) + len(_piece.text)
+            if _pieces and _length + _added > chunk_size:
+                if _fresh:
+                    yield Section(_render(_pieces), _headers or {})
+                _pieces, _length = _restart(
+                    _pieces,
+                    min(chunk_overlap, chunk_size - _added),
+                )
+            # The separator of the first piece of a chunk is dropped.
+            _length += _added if _pieces else len(_piece.text)
+            _pieces.append(_piece)
+            _fresh = True
+    if _fresh:
+        yield Section(_render(_pieces), _headers or {})
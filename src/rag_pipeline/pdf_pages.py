@@ -0,0 +1,185 @@
+"""Page-level extraction of PDFs with an on-disk cache.
+
+Pages are extracted in ranges by worker processes. Every extracted
+page is written to a cache keyed by the hash of the file and the page
+number, so an interrupted or partly failed ingestion only redoes the
+pages which are missing.
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import pathlib
+import tempfile
+import typing
+
+import pypdf
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = "cache/pdf_pages"
+STRATEGIES = ("text", "auto", "fast", "hi_res")
+
+Element = dict[str, typing.Any]
+"""An extracted element, with its "text" and "category"."""
+
+
+def file_hash(path: str | pathlib.Path, block_size: int = 1 << 20) -> str:
+    """Return the SHA-256 of a file's content, read in blocks."""
+    _hash = hashlib.sha256()
+    with pathlib.Path(path).open("rb") as file:
+        while _block := file.read(block_size):
+            _hash.update(_block)
+    return _hash.hexdigest()
+
+
+def page_count(path: str | pathlib.Path) -> int:
+    """Return the number of pages of a PDF."""
+    return len(pypdf.PdfReader(path).pages)
+
+
+class PageCache:
+    """Extracted pages of PDFs, one JSON file per page."""
+
+    def __init__(
+        self,
+        directory: str | pathlib.Path = DEFAULT_CACHE_DIR,
+    ) -> None:
+        """Instantiate the class.
+
+        Args:
+            directory: Where the pages are cached.
+                Defaults to "cache/pdf_pages".
+        """
+        self.directory = pathlib.Path(directory)
+
+    def path(self, digest: str, strategy: str, page: int) -> pathlib.Path:
+        """Return the path of a cached page.
+
+        Args:
+            digest: Hash of the PDF, see `file_hash`.
+            strategy: Strategy the page is extracted with.
+            page: Number of the page, from 1.
+
+        Returns:
+            The path, which may not exist yet.
+        """
+        return self.directory / digest / strategy / f"{page:06d}.json"
+
+    def get(
+        self,
+        digest: str,
+        strategy: str,
+        page: int,
+    ) -> list[Element] | None:
+        """Return the elements of a cached page, or None on a miss.
+
+        A corrupted page is removed from the cache, and is a miss.
+        """
+        _path = self.path(digest, strategy, page)
+        if not _path.exists():
+            return None
+        try:
+            return json.loads(_path.read_text(encoding="utf-8"))
+        except json.JSONDecodeError:
+            logger.warning("Removing the corrupted cache file %s.", _path)
+            _path.unlink(missing_ok=True)
+            return None
+
+    def put(
+        self,
+        digest: str,
+        strategy: str,
+        page: int,
+        elements: list[Element],
+    ) -> None:
+        """Cache the elements of a page.
+
+        The file is written under a temporary name and renamed,
+        so a crash never leaves a partly written page behind.
+        """
+        _path = self.path(digest, strategy, page)
+        _path.parent.mkdir(parents=True, exist_ok=True)
+        _descriptor, _temporary = tempfile.mkstemp(
+            dir=_path.parent,
+            suffix=".tmp",
+        )
+        with os.fdopen(_descriptor, "w", encoding="utf-8") as file:
+            json.dump(elements, file, ensure_ascii=False)
+        pathlib.Path(_temporary).replace(_path)
+
+    def missing(
+        self,
+        digest: str,
+        strategy: str,
+        pages: typing.Iterable[int],
+    ) -> list[int]:
+        """Return the pages which are not cached yet, or corrupted."""
+        return [
+            page for page in pages if self.get(digest, strategy, page) is None
+        ]
+
+
+def _text_layer(page: pypdf.PageObject) -> list[Element]:
+    _text = page.extract_text() or ""
+    return [{"text": _text, "category": "Text"}] if _text.strip() else []
+
+
+def _partition(
+    reader: pypdf.PdfReader,
+    index: int,
+    strategy: str,
+) -> list[Element]:
+    # Imported here, as unstructured is slow to import and only
+    # needed for pages without a text layer or when asked for.
+    from unstructured.partition import pdf
+
+    _writer = pypdf.PdfWriter()
+    _writer.add_page(reader.pages[index])
+    _buffer = io.BytesIO()
+    _writer.write(_buffer)
+    _buffer.seek(0)
+    return [
+        {"text": element.text, "category": element.category}
+        for element in pdf.partition_pdf(file=_buffer, strategy=strategy)
+        if element.text
+    ]
+
+
+def extract_range(
+    path: str,
+    digest: str,
+    pages: list[int],
+    strategy: str,
+    cache_dir: str,
+) -> list[int]:
+    """Extract pages of a PDF into the cache.
+
+    Meant to run in a worker process. Every page is cached as soon
+    as it is extracted, so the work done survives a later failure.
+
+    Args:
+        path: Path to the PDF.
+        digest: Hash of the PDF.
+        pages: Numbers of the pages to extract, from 1.
+        strategy: "text" to only read the text layer, "auto" to fall
+            back to unstructured's "hi_res" for pages without one, or
+            "fast" and "hi_res" to partition with unstructured.
+        cache_dir: Directory of the `PageCache`.
+
+    Returns:
+        The numbers of the extracted pages.
+    """
+    _cache = PageCache(cache_dir)
+    _reader = pypdf.PdfReader(path)
+    for _page in pages:
+        if strategy in ("text", "auto"):
+            _elements = _text_layer(_reader.pages[_page - 1])
+            if not _elements and strategy == "auto":
+                _elements = _partition(_reader, _page - 1, "hi_res")
+        else:
+            _elements = _partition(_reader, _page - 1, strategy)
+        _cache.put(digest, strategy, _page, _elements)
+    return pages
@@ -4,7 +4,9 @@ All adhere to the strategy pattern as currently implemented.
 """
 
 import abc
+import pathlib
 import typing
+from collections.abc import Sequence
 
 import langchain_chroma
 from langchain_community import vectorstores
@@ -31,6 +33,16 @@ class BaseStorage(abc.ABC):
         """
         self._embedding = embedding
         self.vectorstore = None
+        self._precomputed: PrecomputedEmbeddings | None = None
+
+    @property
+    def embedding(self) -> embeddings.Embeddings:
+        """Model used to generate embeddings."""
+        return self._embedding
+
+    @embedding.setter
+    def embedding(self, embedding: embeddings.Embeddings) -> None:
+        self._embedding = embedding
 
     @abc.abstractmethod
     def store(
@@ -46,6 +58,177 @@ class BaseStorage(abc.ABC):
             This vectorstore's instance.
         """
 
+    def store_embedded(
+        self,
+        docs: list[documents.Document],
+        vectors: Sequence[Sequence[float]],
+        **kwargs: object,
+    ) -> vectorstores.VectorStore:
+        """Store the docs with embeddings computed earlier.
+
+        The vectors are handed to the vectorstore in place of
+        the model's, so the docs are not embedded again.
+
+        Args:
+            docs: Data to be stored.
+            vectors: The embedding of every doc, in the same order.
+            kwargs: Key-word arguments to pass to the wrapped vectorstore.
+
+        Returns:
+            This vectorstore's instance.
+        """
+        _model = self._embedding
+        _precomputed = PrecomputedEmbeddings(
+            _model,
+            {
+                doc.page_content: vector
+                for doc, vector in zip(docs, vectors, strict=True)
+            },
+        )
+        self._embedding = _precomputed
+        try:
+            _vectorstore = self.store(docs, **kwargs)
+        finally:
+            self._embedding = _model
+            # The vectorstore keeps the wrapper, which from now on only
+            # defers to the model.
+            _precomputed.vectors.clear()
+        self._precomputed = _precomputed
+        return _vectorstore
+
+    def add_embedded(
+        self,
+        docs: list[documents.Document],
+        vectors: Sequence[Sequence[float]],
+    ) -> vectorstores.VectorStore:
+        """Add docs with embeddings computed earlier to the vectorstore.
+
+        The vectors are handed to the wrapper the vectorstore was
+        created with by `store_embedded`, so a large set of docs can be
+        stored a part at a time without embedding them again.
+
+        Args:
+            docs: Data to be added.
+            vectors: The embedding of every doc, in the same order.
+
+        Returns:
+            This vectorstore's instance.
+
+        Raises:
+            ValueError: If the vectorstore was not created by
+                `store_embedded`.
+        """
+        if self.vectorstore is None or self._precomputed is None:
+            msg = "The vectorstore must be created by store_embedded first."
+            raise ValueError(msg)
+        self._precomputed.vectors.update(
+            (doc.page_content, vector)
+            for doc, vector in zip(docs, vectors, strict=True)
+        )
+        try:
+            self.vectorstore.add_documents(docs)
+        finally:
+            self._precomputed.vectors.clear()
+        return self.vectorstore
+
+    @property
+    def savable(self) -> bool:
+        """Whether the storage implements `save` and `load`."""
+        return type(self).save is not BaseStorage.save
+
+    def persists(self, **kwargs: object) -> bool:
+        """Return whether a vectorstore writes its docs to disk by itself.
+
+        Such docs outlive the process without being saved.
+
+        Args:
+            kwargs: Key-word arguments the vectorstore is created with.
+
+        Returns:
+            Whether the vectorstore created with these arguments
+            persists by itself.
+        """
+        del kwargs  # Unused, as vectorstores are in memory by default.
+        return False
+
+    def save(self, path: str | pathlib.Path) -> None:
+        """Save the vectorstore, so `load` can restore it.
+
+        Args:
+            path: Where to save it.
+
+        Raises:
+            NotImplementedError: If the vectorstore cannot be saved.
+        """
+        msg = f"{type(self).__name__} cannot be saved."
+        raise NotImplementedError(msg)
+
+    def load(self, path: str | pathlib.Path) -> vectorstores.VectorStore:
+        """Load a vectorstore saved by `save`.
+
+        Docs can then be added to it by `add_embedded`.
+
+        Args:
+            path: Where it was saved.
+
+        Returns:
+            This vectorstore's instance.
+
+        Raises:
+            NotImplementedError: If the vectorstore cannot be saved.
+        """
+        msg = f"{type(self).__name__} cannot be saved."
+        raise NotImplementedError(msg)
+
+
+def _floats(vector: Sequence[float]) -> list[float]:
+    # NumPy rows convert faster, and to Python floats, with tolist.
+    _tolist = getattr(vector, "tolist", None)
+    return _tolist() if _tolist is not None else list(vector)
+
+
+class PrecomputedEmbeddings(embeddings.Embeddings):
+    """Embeddings looked up by text, computed by a model otherwise.
+
+    Lets a vectorstore be built from vectors computed earlier, while
+    queries and unknown texts are still embedded by the model.
+    """
+
+    def __init__(
+        self,
+        model: embeddings.Embeddings,
+        vectors: dict[str, Sequence[float]],
+    ) -> None:
+        """Instantiate the class.
+
+        Args:
+            model: Model embedding the queries and the unknown texts.
+            vectors: The precomputed vectors, keyed by text.
+        """
+        self.model = model
+        self.vectors = vectors
+
+    @typing.override
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        _missing = [text for text in texts if text not in self.vectors]
+        _computed = dict(
+            zip(
+                _missing,
+                self.model.embed_documents(_missing) if _missing else [],
+                strict=True,
+            ),
+        )
+        return [
+            _computed[text]
+            if text in _computed
+            else _floats(self.vectors[text])
+            for text in texts
+        ]
+
+    @typing.override
+    def embed_query(self, text: str) -> list[float]:
+        return self.model.embed_query(text)
+
 
 class ChromaStorage(BaseStorage):
     """Vector storage provided by the Chroma DB.
@@ -75,6 +258,10 @@ class ChromaStorage(BaseStorage):
         )
         return self.vectorstore
 
+    @typing.override
+    def persists(self, **kwargs: object) -> bool:
+        return kwargs.get("persist_directory") is not None
+
 
 class LanceStorage(BaseStorage):
     """Vector storage provided by the Lance DB.
@@ -104,6 +291,13 @@ class LanceStorage(BaseStorage):
         )
         return self.vectorstore
 
+    @typing.override
+    def persists(self, **kwargs: object) -> bool:
+        # LanceDB tables live in a database directory, "/tmp/lancedb"
+        # unless another connection or uri is given.
+        del kwargs
+        return True
+
 
 class FAISSStorage(BaseStorage):
     """Vector storage provided by the FAISS DB.
@@ -132,3 +326,22 @@ class FAISSStorage(BaseStorage):
             **kwargs,
         )
         return self.vectorstore
+
+    @typing.override
+    def save(self, path: str | pathlib.Path) -> None:
+        if self.vectorstore is None:
+            msg = "Nothing is stored yet."
+            raise ValueError(msg)
+        self.vectorstore.save_local(str(path))
+
+    @typing.override
+    def load(self, path: str | pathlib.Path) -> vectorstores.FAISS:
+        # The docstore is pickled, so only files saved by `save` must
+        # be loaded.
+        self._precomputed = PrecomputedEmbeddings(self._embedding, {})
+        self.vectorstore = vectorstores.FAISS.load_local(
+            str(path),
+            self._precomputed,
+            allow_dangerous_deserialization=True,
+        )
+        return self.vectorstore
@@ -1,28 +1,31 @@
 """The central module that orchestrates the entire RAG process."""
 
+import concurrent.futures
+import dataclasses
+import itertools
 import logging
+import time
 import typing
 
 from langchain_community import vectorstores
 from langchain_core import documents
-from langchain_core import vectorstores as core_vectorstores
+from langchain_core import retrievers as core_retrievers
 
 from . import (
+    chunk_batches,
     chunking,
+    deduplicating,
     generating,
+    indexing,
     loading,
     persisting,
     quality_metrics,
     retrieving,
+    structured_logging,
+    telemetry,
 )
 
 logger = logging.getLogger(__name__)
-logging.basicConfig(
-    filename="logs/pipeline.log",
-    filemode="w+",
-    encoding="utf-8",
-    level=logging.INFO,
-)
 
 
 class UnsetComponentError(Exception):
@@ -38,6 +41,128 @@ class UnsetComponentError(Exception):
         super().__init__(f"{component} is set to `None`.")
 
 
+@dataclasses.dataclass
+class EvaluationResult:
+    """Outcome of a single evaluator.
+
+    Attributes:
+        evaluator: Name of the evaluator's class.
+        score: Grade from 0 to 1 or None if the evaluator failed.
+        seconds: Wall time the evaluator took.
+        error: Description of the failure, if any.
+    """
+
+    evaluator: str
+    score: float | None
+    seconds: float
+    error: str | None = None
+
+
+def _timed_evaluation(
+    evaluator: quality_metrics.BaseEvaluation,
+    *,
+    isolate: bool = False,
+) -> EvaluationResult:
+    _name = type(evaluator).__name__
+    _start = time.perf_counter()
+    try:
+        _score = evaluator.evaluate()
+    except Exception as error:
+        if not isolate:
+            raise
+        logger.warning("%s failed.", _name, exc_info=error)
+        return EvaluationResult(
+            _name,
+            None,
+            time.perf_counter() - _start,
+            repr(error),
+        )
+    return EvaluationResult(_name, _score, time.perf_counter() - _start)
+
+
+def run_evaluations(
+    evaluators: typing.Iterable[quality_metrics.BaseEvaluation],
+    *,
+    parallel: bool = False,
+    timeout: float | None = None,
+) -> list[EvaluationResult]:
+    """Run the evaluators and report how each of them went.
+
+    In parallel mode, the evaluators run on a thread pool, so the
+    evaluation takes about as long as the slowest one. A failing
+    or timed out evaluator is reported with no score instead of
+    aborting the others. A timed out evaluator cannot be stopped,
+    so it keeps running in the background until it returns.
+
+    Args:
+        evaluators: The evaluators to run.
+        parallel: Whether to run the evaluators concurrently.
+            Defaults to False.
+        timeout: Number of seconds each evaluator may take.
+            Only used in parallel mode. Defaults to None.
+
+    Returns:
+        The results in the order of the evaluators.
+    """
+    if not parallel:
+        return [_timed_evaluation(evaluator) for evaluator in evaluators]
+    _evaluators = list(evaluators)
+    if not _evaluators:
+        return []
+    _executor = concurrent.futures.ThreadPoolExecutor(len(_evaluators))
+    _futures = [
+        _executor.submit(_timed_evaluation, evaluator, isolate=True)
+        for evaluator in _evaluators
+    ]
+    concurrent.futures.wait(_futures, timeout)
+    _executor.shutdown(wait=False, cancel_futures=True)
+    return [
+        future.result()
+        if future.done()
+        else EvaluationResult(
+            type(evaluator).__name__,
+            None,
+            typing.cast("float", timeout),
+            "Timed out.",
+        )
+        for evaluator, future in zip(_evaluators, _futures, strict=True)
+    ]
+
+
+def aggregate_score(results: typing.Iterable[EvaluationResult]) -> int:
+    """Average the scores of the evaluators into a percentage.
+
+    Evaluators without a score are left out of the average.
+
+    Args:
+        results: Results of the evaluators.
+
+    Returns:
+        An integer from 0 to 100 representing the quality score.
+    """
+    _evaluations = [
+        result.score for result in results if result.score is not None
+    ]
+    if not _evaluations:
+        return 0
+    return int(sum(_evaluations) / len(_evaluations) * 100)
+
+
+@dataclasses.dataclass
+class QueryResult:
+    """Answer to a query together with the context it was generated from.
+
+    Attributes:
+        answer: The answer generated by the LLM.
+        documents: The exact documents the LLM was given.
+        latencies: Number of seconds spent retrieving and generating.
+    """
+
+    answer: str
+    documents: list[documents.Document]
+    latencies: dict[str, float]
+
+
 class RAGPipeline:
     def __init__(
         self,
@@ -48,6 +173,10 @@ class RAGPipeline:
         generator: generating.BaseGenerator | None = None,
         evaluators: typing.Iterable[quality_metrics.BaseEvaluation]
         | None = None,
+        *,
+        telemetry_recorder: telemetry.Telemetry | None = None,
+        deduplicator: deduplicating.Deduplicator | None = None,
+        indexer: indexing.BackgroundIndexer | None = None,
     ) -> None:
         """Initialize the pipeline.
 
@@ -61,6 +190,12 @@ class RAGPipeline:
             retriever: Defaults to None.
             generator: Defaults to None.
             evaluators: Defaults to an empty list.
+            telemetry_recorder: Records the duration and size of every
+                stage. Defaults to a `Telemetry` which records nothing.
+            deduplicator: Drops near-duplicate chunks before they are
+                persisted. Defaults to None, which keeps every chunk.
+            indexer: Indexes submitted chunks in the background, see
+                `submit_documents`. Defaults to None.
         """
         self.loader = loader
         self.chunker = chunker
@@ -68,13 +203,22 @@ class RAGPipeline:
         self.retriever = retriever
         self.generator = generator
         self.eveluators = [] if evaluators is None else evaluators
+        self.telemetry = (
+            telemetry.Telemetry()
+            if telemetry_recorder is None
+            else telemetry_recorder
+        )
+        self.deduplicator = deduplicator
+        self.indexer = indexer
 
     def load_documents(self) -> list[documents.Document]:
         """Load the data."""
         if self.loader is None:
-            raise UnsetComponentError("Loader")
-        _loaded_documents = self.loader.load()
-        logger.info("Loaded documents: %s", _loaded_documents)
+            raise UnsetComponentError(component="Loader")
+        with self.telemetry.span("load") as _span:
+            _loaded_documents = self.loader.load()
+            _span.add_documents(_loaded_documents)
+        structured_logging.log_documents(logger, "loaded", _loaded_documents)
         return _loaded_documents
 
     def chunk_documents(
@@ -83,47 +227,198 @@ class RAGPipeline:
     ) -> list[documents.Document]:
         """Chunk the data."""
         if self.chunker is None:
-            raise UnsetComponentError("Chunker")
-        try:
-            _chunked_documents = self.chunker.text_splitter.split_documents(
-                data,
-            )
-        except AttributeError:
-            _chunked_documents = self.chunker.chunk()
-        logger.info("Chunked documents: %s", _chunked_documents)
+            raise UnsetComponentError(component="Chunker")
+        with self.telemetry.span("chunk") as _span:
+            try:
+                _chunked_documents = self.chunker.text_splitter.split_documents(
+                    data,
+                )
+            except AttributeError:
+                _chunked_documents = self.chunker.chunk()
+            _span.add_documents(_chunked_documents)
+        structured_logging.log_documents(logger, "chunked", _chunked_documents)
         return _chunked_documents
 
-    def persist_documents(
+    def deduplicate_documents(
         self,
         chunked_data: list[documents.Document],
+    ) -> list[documents.Document]:
+        """Drop the near-duplicate chunks, if there is a deduplicator."""
+        if self.deduplicator is None:
+            return chunked_data
+        with self.telemetry.span("deduplicate") as _span:
+            _unique_documents = self.deduplicator.deduplicate(chunked_data)
+            _span.add_documents(_unique_documents)
+        structured_logging.log_documents(
+            logger,
+            "deduplicated",
+            _unique_documents,
+        )
+        return _unique_documents
+
+    def persist_documents(
+        self,
+        chunked_data: list[documents.Document] | chunk_batches.ChunkBatch,
+        batch_size: int = 1000,
     ) -> vectorstores.VectorStore:
-        """Persist the data."""
+        """Persist the data.
+
+        The chunks are stored in slices: the first one creates the
+        vector store, the others are added to it. The chunks of a
+        `ChunkBatch` are only turned into documents a slice at a time,
+        so they are never all held as documents. Once they are stored,
+        the signatures of the deduplicator, if any, are saved.
+
+        Args:
+            chunked_data: The chunks.
+            batch_size: Number of chunks stored at once.
+                Defaults to 1000.
+
+        Returns:
+            The vector store.
+        """
         if self.persister is None:
-            raise UnsetComponentError("Persister")
-        return self.persister.store(chunked_data)
+            raise UnsetComponentError(component="Persister")
+        if self.telemetry.enabled and not isinstance(
+            self.persister.embedding,
+            telemetry.InstrumentedEmbeddings,
+        ):
+            self.persister.embedding = telemetry.InstrumentedEmbeddings(
+                self.persister.embedding,
+                self.telemetry,
+            )
+        _slices = itertools.batched(chunked_data, batch_size)
+        with self.telemetry.span("persist") as _span:
+            _first = list(next(_slices, ()))
+            _span.add_documents(_first)
+            _store = self.persister.store(_first)
+            for _slice in _slices:
+                _span.add_documents(_slice)
+                _store.add_documents(list(_slice))
+        if self.deduplicator is not None:
+            self.deduplicator.save()
+        return _store
 
-    def get_retriever(self) -> core_vectorstores.VectorStoreRetriever:
-        """Retrieve the data."""
+    def submit_documents(
+        self,
+        chunked_data: list[documents.Document],
+    ) -> list[int]:
+        """Queue the data to be persisted in the background.
+
+        Unlike `persist_documents`, it returns at once, and queries keep
+        being answered from the chunks indexed so far.
+
+        Returns:
+            The ids of the chunks in the indexer's queue.
+        """
+        if self.indexer is None:
+            raise UnsetComponentError(component="Indexer")
+        _ids = self.indexer.submit(chunked_data)
+        structured_logging.log_documents(logger, "submitted", chunked_data)
+        return _ids
+
+    def get_retriever(self) -> core_retrievers.BaseRetriever:
+        """Retrieve the data.
+
+        Without a retriever, the chunks indexed in the background are
+        searched, if there is an indexer.
+        """
         if self.retriever is None:
-            raise UnsetComponentError("Retriever")
+            if self.indexer is not None:
+                return self.indexer.as_retriever()
+            raise UnsetComponentError(component="Retriever")
         return self.retriever.get_retriever()
 
     def generate_answer(self, query: str) -> str:
         """Retrieve the data."""
         if self.generator is None:
-            raise UnsetComponentError("Generator")
-        _answer = self.generator.generate(query)
-        logger.info("Received query: %s. Generated answer: %s", query, _answer)
+            raise UnsetComponentError(component="Generator")
+        with self.telemetry.span("generate") as _span:
+            _answer = self.generator.generate(query)
+            _span.add_texts([_answer])
+        structured_logging.log_text(logger, "answered", query, _answer)
         return _answer
 
-    def evaluate(self) -> int:
+    def query(self, query: str) -> QueryResult:
+        """Answer the query, retrieving its context only once.
+
+        The returned documents are the ones the answer was generated
+        from, so they can be handed to the evaluators as they are.
+
+        Args:
+            query: The question to answer.
+
+        Returns:
+            The answer, its context and the time each step took.
+        """
+        if self.generator is None:
+            raise UnsetComponentError(component="Generator")
+        _start = time.perf_counter()
+        with self.telemetry.span("retrieve") as _span:
+            _documents = self.get_retriever().invoke(query)
+            _span.add_documents(_documents)
+        _retrieved = time.perf_counter()
+        with self.telemetry.span("generate") as _span:
+            _answer = self.generator.generate_from_documents(query, _documents)
+            _span.add_texts([_answer])
+        _generated = time.perf_counter()
+        structured_logging.log_text(logger, "answered", query, _answer)
+        return QueryResult(
+            _answer,
+            _documents,
+            {
+                "retrieve": _retrieved - _start,
+                "generate": _generated - _retrieved,
+            },
+        )
+
+    def evaluate_each(
+        self,
+        *,
+        parallel: bool = False,
+        timeout: float | None = None,
+    ) -> list[EvaluationResult]:
+        """Run every evaluator and report how each of them went.
+
+        See `run_evaluations` for details.
+
+        Args:
+            parallel: Whether to run the evaluators concurrently.
+                Defaults to False.
+            timeout: Number of seconds each evaluator may take.
+                Only used in parallel mode. Defaults to None.
+
+        Returns:
+            The results in the order of the evaluators.
+        """
+        with self.telemetry.span("evaluate") as _span:
+            _results = run_evaluations(
+                self.eveluators,
+                parallel=parallel,
+                timeout=timeout,
+            )
+            _span.add("items", len(_results))
+        return _results
+
+    def evaluate(
+        self,
+        *,
+        parallel: bool = False,
+        timeout: float | None = None,
+    ) -> int:
         """Assess the pipeline's quality.
 
+        Evaluators without a score are left out of the average.
+
+        Args:
+            parallel: Whether to run the evaluators concurrently.
+                Defaults to False.
+            timeout: Number of seconds each evaluator may take.
+                Only used in parallel mode. Defaults to None.
+
         Returns:
             An integer from 0 to 100 representing the quality score.
         """
-        _evaluations = [evaluator.evaluate() for evaluator in self.eveluators]
-        if not _evaluations:
-            return 0
-        logger.info("Evaluations: %s", _evaluations)
-        return int(sum(_evaluations) / len(_evaluations) * 100)
+        _results = self.evaluate_each(parallel=parallel, timeout=timeout)
+        logger.info("Evaluations: %s", _results)
+        return aggregate_score(_results)
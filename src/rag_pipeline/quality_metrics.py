@@ -9,7 +9,7 @@ import typing
 from parea.evals import general
 from parea.schemas import log
 
-from . import mad_skillz
+from . import caching, mad_skillz
 
 
 class BaseEvaluation(abc.ABC):
@@ -82,6 +82,8 @@ class SelfCheckEval(BaseEvaluation):
         query: str,
         output: str,
         use_local: bool,
+        cache: caching.LLMCache | None = None,
+        concurrent: bool = False,
     ) -> None:
         super().__init__(
             query,
@@ -89,21 +91,44 @@ class SelfCheckEval(BaseEvaluation):
             output=output,
         )
         self.use_local = use_local
+        self.cache = cache
+        self.concurrent = concurrent
 
     @typing.override
     def evaluate(self) -> float:
-        _result = mad_skillz.self_check.self_check(self._log, self.use_local)
+        _self_check = (
+            mad_skillz.self_check.self_check_concurrent
+            if self.concurrent
+            else mad_skillz.self_check.self_check
+        )
+        _result = _self_check(
+            self._log,
+            use_llamafile=self.use_local,
+            cache=self.cache,
+        )
         return _result if _result is not None else 0
 
 
 class LLMJudgeEval(BaseEvaluation):
-    """Evaluation based on lm_vs_lm_factuality_factory."""
+    """Evaluation based on lm_vs_lm_factuality_factory.
+
+    With `per_claim`, lm_vs_lm_claims_factory is used instead.
+    """
 
     @typing.override
-    def __init__(self, query: str, output: str, **kwargs: typing.Any) -> None:
-        self._llm_factory = mad_skillz.lm_vs_lm.lm_vs_lm_factuality_factory(
-            **kwargs,
+    def __init__(
+        self,
+        query: str,
+        output: str,
+        per_claim: bool = False,
+        **kwargs: typing.Any,
+    ) -> None:
+        _factory = (
+            mad_skillz.lm_vs_lm.lm_vs_lm_claims_factory
+            if per_claim
+            else mad_skillz.lm_vs_lm.lm_vs_lm_factuality_factory
         )
+        self._llm_factory = _factory(**kwargs)
         super().__init__(query, context="", output=output)
 
     @typing.override
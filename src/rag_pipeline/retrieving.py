@@ -4,13 +4,21 @@ All adhere to the strategy pattern as currently implemented.
 """
 
 import abc
+import collections
+import logging
+import threading
+import time
 import typing
 
 from langchain import retrievers
 from langchain.retrievers import document_compressors, multi_query
-from langchain_core import language_models, vectorstores
+from langchain_core import callbacks, documents, language_models, vectorstores
 from langchain_core import retrievers as core_retrievers
 
+from . import caching, identifiers
+
+logger = logging.getLogger(__name__)
+
 
 class BaseRetriever(abc.ABC):
     """Abstract base class defining common retrieving operations."""
@@ -25,6 +33,11 @@ class BaseRetriever(abc.ABC):
         """
         self._storage = storage
 
+    @property
+    def storage(self) -> vectorstores.VectorStore:
+        """The storage the retriever searches."""
+        return self._storage
+
     @abc.abstractmethod
     def get_retriever(
         self,
@@ -106,3 +119,186 @@ class ComressedContextRetriever(BaseRetriever):
             base_compressor=_compressor,
             base_retriever=self._storage.as_retriever(**kwargs),
         )
+
+
+class CrossEncoderScorer:
+    """Score query-chunk pairs with a local cross-encoder.
+
+    The model runs on the CPU. Scores are cached per query hash
+    and chunk id, so candidates seen before are not scored again.
+    """
+
+    def __init__(
+        self,
+        model_name: str = "cross-encoder/ms-marco-MiniLM-L-6-v2",
+        batch_size: int = 32,
+        max_cached_scores: int = 100_000,
+        **kwargs: object,
+    ) -> None:
+        """Instantiate the class.
+
+        Args:
+            model_name: The name of the cross-encoder to use.
+                Defaults to "cross-encoder/ms-marco-MiniLM-L-6-v2".
+            batch_size: Number of pairs scored at once. Defaults to 32.
+            max_cached_scores: Number of scores to remember.
+                Defaults to 100000.
+            kwargs: Key-word arguments to pass to the model.
+        """
+        # Imported here, as it pulls in torch.
+        import sentence_transformers
+
+        self._model = sentence_transformers.CrossEncoder(
+            model_name,
+            **{"device": "cpu", **kwargs},
+        )
+        self.batch_size = batch_size
+        self.max_cached_scores = max_cached_scores
+        self._scores: collections.OrderedDict[tuple[str, str], float] = (
+            collections.OrderedDict()
+        )
+        self._lock = threading.Lock()
+
+    def rank(
+        self,
+        query: str,
+        candidates: list[documents.Document],
+        latency_budget: float | None = None,
+    ) -> list[int]:
+        """Order the candidates from the most to the least relevant.
+
+        Args:
+            query: The question asked by the user.
+            candidates: The chunks to order.
+            latency_budget: Number of seconds scoring may take. It is
+                checked before every batch, so a batch started in time
+                may overrun it. When it runs out, the candidates keep
+                their original order, and the scores computed so far
+                are remembered for the next call. Defaults to None.
+
+        Returns:
+            The indices of the candidates in their new order.
+        """
+        _deadline = None
+        if latency_budget is not None:
+            _deadline = time.monotonic() + latency_budget
+        _query = caching.hash_prompt(query)
+        _keys = [
+            (_query, identifiers.chunk_id(candidate))
+            for candidate in candidates
+        ]
+        with self._lock:
+            _scores = {
+                key: self._scores[key] for key in _keys if key in self._scores
+            }
+        _missing = [i for i, key in enumerate(_keys) if key not in _scores]
+        for _offset in range(0, len(_missing), self.batch_size):
+            if _deadline is not None and time.monotonic() > _deadline:
+                logger.warning(
+                    "Reranking ran out of time, keeping the vector order.",
+                )
+                self._remember(_scores)
+                return list(range(len(candidates)))
+            _batch = _missing[_offset : _offset + self.batch_size]
+            _predictions = self._model.predict(
+                [(query, candidates[i].page_content) for i in _batch],
+                batch_size=self.batch_size,
+            )
+            for i, _score in zip(_batch, _predictions, strict=True):
+                _scores[_keys[i]] = float(_score)
+        self._remember(_scores)
+        return sorted(
+            range(len(candidates)),
+            key=lambda i: _scores[_keys[i]],
+            reverse=True,
+        )
+
+    def _remember(self, scores: dict[tuple[str, str], float]) -> None:
+        with self._lock:
+            for _key, _score in scores.items():
+                self._scores[_key] = _score
+                self._scores.move_to_end(_key)
+            while len(self._scores) > self.max_cached_scores:
+                self._scores.popitem(last=False)
+
+
+class RerankedRetriever(core_retrievers.BaseRetriever):
+    """LangChain retriever reranking the candidates of another one.
+
+    Attributes:
+        base_retriever: Retriever fetching the candidates.
+        scorer: Scorer ordering the candidates.
+        top_n: Number of documents to return.
+        latency_budget: Number of seconds reranking may take.
+    """
+
+    base_retriever: core_retrievers.BaseRetriever
+    scorer: CrossEncoderScorer
+    top_n: int = 4
+    latency_budget: float | None = None
+
+    @typing.override
+    def _get_relevant_documents(
+        self,
+        query: str,
+        *,
+        run_manager: callbacks.CallbackManagerForRetrieverRun,
+    ) -> list[documents.Document]:
+        _candidates = self.base_retriever.invoke(
+            query,
+            config={"callbacks": run_manager.get_child()},
+        )
+        _order = self.scorer.rank(query, _candidates, self.latency_budget)
+        return [_candidates[i] for i in _order[: self.top_n]]
+
+
+class CrossEncoderRetriever(BaseRetriever):
+    """Rerank the candidates of another retriever with a cross-encoder.
+
+    More candidates than needed are fetched and reordered by a local
+    model, which improves precision without any network calls.
+    """
+
+    @typing.override
+    def __init__(
+        self,
+        retriever: BaseRetriever,
+        scorer: CrossEncoderScorer | None = None,
+        top_n: int = 4,
+        overfetch: int = 4,
+        latency_budget: float | None = None,
+    ) -> None:
+        """Instantiate the class.
+
+        Args:
+            retriever: The retriever fetching the candidates.
+            scorer: Scorer ordering the candidates.
+                Defaults to a `CrossEncoderScorer` with its defaults.
+            top_n: Number of documents to return. Defaults to 4.
+            overfetch: How many times more candidates to fetch.
+                Defaults to 4.
+            latency_budget: Number of seconds reranking may take before
+                falling back to the vector order. Defaults to None.
+        """
+        super().__init__(retriever.storage)
+        self._retriever = retriever
+        self._scorer = CrossEncoderScorer() if scorer is None else scorer
+        self.top_n = top_n
+        self.overfetch = overfetch
+        self.latency_budget = latency_budget
+
+    @typing.override
+    def get_retriever(self, **kwargs: typing.Any) -> RerankedRetriever:
+        _search_kwargs = {
+            **kwargs.pop("search_kwargs", {}),
+            "k": self.top_n * self.overfetch,
+        }
+        return RerankedRetriever(
+            base_retriever=self._retriever.get_retriever(
+                search_kwargs=_search_kwargs,
+                **kwargs,
+            ),
+            scorer=self._scorer,
+            top_n=self.top_n,
+            latency_budget=self.latency_budget,
+        )
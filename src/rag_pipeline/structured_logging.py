@@ -0,0 +1,251 @@
+"""Cheap, structured logging of the pipeline's data.
+
+By default only summaries are logged: the number of documents, their
+ids, a hash of their content and their size. Logging the documents
+themselves is opt-in and sampled. Payloads are written by a background
+thread fed through a `QueueHandler`, so formatting and writing them
+never blocks the pipeline.
+
+Nothing is configured at import time; call `configure` once from the
+application's entry point.
+"""
+
+import atexit
+import dataclasses
+import hashlib
+import json
+import logging
+import logging.handlers
+import pathlib
+import queue
+import random
+import typing
+from collections.abc import Iterable
+
+from langchain_core import documents
+
+from . import identifiers
+
+PAYLOAD_LOGGER = "rag_pipeline.payloads"
+MAX_LOGGED_IDS = 20
+
+payload_logger = logging.getLogger(PAYLOAD_LOGGER)
+payload_logger.propagate = False
+payload_logger.addHandler(logging.NullHandler())
+
+
+@dataclasses.dataclass
+class _PayloadLogging:
+    """State of the payload logging, set by `configure`.
+
+    Attributes:
+        listener: Background writer of the payloads, if started.
+        sample_rate: Share of the payloads to log.
+        sampler: Source of the draws deciding which payloads to log.
+    """
+
+    listener: logging.handlers.QueueListener | None = None
+    sample_rate: float = 0.0
+    sampler: random.Random = dataclasses.field(default_factory=random.Random)
+
+
+_payloads = _PayloadLogging()
+
+
+def _sample_payload() -> bool:
+    # Sampled before the record is built, so skipped payloads cost nothing.
+    return (
+        payload_logger.isEnabledFor(logging.DEBUG)
+        and _payloads.sampler.random() < _payloads.sample_rate
+    )
+
+
+def summarize_documents(
+    docs: Iterable[documents.Document],
+) -> dict[str, typing.Any]:
+    """Describe documents without their content.
+
+    Args:
+        docs: The documents to describe.
+
+    Returns:
+        Their count, total size in bytes, the ids of the first
+        `MAX_LOGGED_IDS` of them and a hash of all their contents.
+    """
+    _hash = hashlib.sha256()
+    _count = 0
+    _size = 0
+    _ids = []
+    for doc in docs:
+        _content = doc.page_content.encode("utf-8")
+        _hash.update(_content)
+        _count += 1
+        _size += len(_content)
+        if len(_ids) < MAX_LOGGED_IDS:
+            _ids.append(identifiers.chunk_id(doc)[:16])
+    return {
+        "count": _count,
+        "bytes": _size,
+        "ids": _ids,
+        "sha256": _hash.hexdigest(),
+    }
+
+
+def summarize_text(text: str) -> dict[str, typing.Any]:
+    """Describe a text by its size and hash.
+
+    Args:
+        text: The text to describe.
+
+    Returns:
+        Its size in bytes and its hash.
+    """
+    _content = text.encode("utf-8")
+    return {
+        "bytes": len(_content),
+        "sha256": hashlib.sha256(_content).hexdigest(),
+    }
+
+
+def log_documents(
+    logger: logging.Logger,
+    event: str,
+    docs: list[documents.Document],
+) -> None:
+    """Log a summary of documents and, if enabled, the documents.
+
+    Args:
+        logger: The logger of the calling module.
+        event: Short name of what happened to the documents.
+        docs: The documents.
+    """
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            "%s",
+            event,
+            extra={"data": summarize_documents(docs)},
+        )
+    if _sample_payload():
+        payload_logger.debug(
+            "%s",
+            event,
+            extra={
+                "data": [
+                    {"content": doc.page_content, "metadata": doc.metadata}
+                    for doc in docs
+                ],
+            },
+        )
+
+
+def log_text(
+    logger: logging.Logger,
+    event: str,
+    query: str,
+    text: str,
+) -> None:
+    """Log a summary of a query and a text and, if enabled, both.
+
+    Args:
+        logger: The logger of the calling module.
+        event: Short name of what produced the text.
+        query: The query the text answers.
+        text: The text, usually an answer.
+    """
+    if logger.isEnabledFor(logging.INFO):
+        logger.info(
+            "%s",
+            event,
+            extra={
+                "data": {
+                    "query": summarize_text(query),
+                    "text": summarize_text(text),
+                },
+            },
+        )
+    if _sample_payload():
+        payload_logger.debug(
+            "%s",
+            event,
+            extra={"data": {"query": query, "text": text}},
+        )
+
+
+class JSONFormatter(logging.Formatter):
+    """Format records as JSON Lines, including their structured data."""
+
+    @typing.override
+    def format(self, record: logging.LogRecord) -> str:
+        _record = {
+            "time": self.formatTime(record),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if hasattr(record, "data"):
+            _record["data"] = record.data
+        if record.exc_info:
+            _record["exception"] = self.formatException(record.exc_info)
+        return json.dumps(_record, ensure_ascii=False, default=str)
+
+
+def configure(
+    filename: str | pathlib.Path = "logs/pipeline.log",
+    level: int = logging.INFO,
+    *,
+    log_payloads: bool = False,
+    payload_sample_rate: float = 0.01,
+    payload_filename: str | pathlib.Path = "logs/payloads.log",
+) -> None:
+    """Configure logging for the application.
+
+    Call it once from the entry point. Calling it again replaces the
+    previous configuration.
+
+    Args:
+        filename: File receiving the structured logs, appended to.
+            Defaults to "logs/pipeline.log".
+        level: Level of the root logger. Defaults to INFO.
+        log_payloads: Whether to also log the documents and answers
+            themselves. Defaults to False.
+        payload_sample_rate: Share of the payloads to log.
+            Defaults to 0.01.
+        payload_filename: File receiving the payloads.
+            Defaults to "logs/payloads.log".
+    """
+    shutdown()
+
+    pathlib.Path(filename).parent.mkdir(parents=True, exist_ok=True)
+    _handler = logging.FileHandler(filename, encoding="utf-8")
+    _handler.setFormatter(JSONFormatter())
+    logging.basicConfig(level=level, handlers=[_handler], force=True)
+
+    for _previous in payload_logger.handlers[:]:
+        payload_logger.removeHandler(_previous)
+    if not log_payloads:
+        payload_logger.addHandler(logging.NullHandler())
+        payload_logger.setLevel(logging.WARNING)
+        return
+
+    pathlib.Path(payload_filename).parent.mkdir(parents=True, exist_ok=True)
+    _payload_handler = logging.FileHandler(payload_filename, encoding="utf-8")
+    _payload_handler.setFormatter(JSONFormatter())
+    _queue: queue.SimpleQueue = queue.SimpleQueue()
+    payload_logger.addHandler(logging.handlers.QueueHandler(_queue))
+    payload_logger.setLevel(logging.DEBUG)
+    _payloads.sample_rate = payload_sample_rate
+    _payloads.listener = logging.handlers.QueueListener(
+        _queue,
+        _payload_handler,
+    )
+    _payloads.listener.start()
+
+
+@atexit.register
+def shutdown() -> None:
+    """Flush the pending payloads and stop the background writer."""
+    if _payloads.listener is not None:
+        _payloads.listener.stop()
+        for _handler in _payloads.listener.handlers:
+            _handler.close()
+        _payloads.listener = None
@@ -0,0 +1,381 @@
+"""Spans and counters measuring the stages of the pipeline.
+
+The default `Telemetry` does nothing and costs next to nothing.
+`MetricsRecorder` keeps the measurements in memory and exports them
+in the Prometheus text format, while `OpenTelemetryRecorder` forwards
+them to whatever OpenTelemetry SDK the application has configured.
+"""
+
+import bisect
+import collections
+import threading
+import time
+import typing
+from collections.abc import Iterable
+
+from langchain_core import documents, embeddings
+
+from . import concurrency
+
+STAGES = (
+    "load",
+    "chunk",
+    "deduplicate",
+    "embed",
+    "persist",
+    "retrieve",
+    "generate",
+    "evaluate",
+)
+BUCKETS = (
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+    10.0,
+    30.0,
+    60.0,
+    300.0,
+)
+COUNTERS = ("items", "bytes", "tokens")
+
+
+class Span:
+    """A stage being measured.
+
+    This one measures nothing; recorders return subclasses which do.
+    """
+
+    __slots__ = ()
+
+    def __enter__(self) -> typing.Self:
+        """Start measuring."""
+        return self
+
+    def __exit__(self, *_: object) -> None:
+        """Stop measuring."""
+
+    def add(self, counter: str, value: float) -> None:
+        """Add to one of the stage's counters.
+
+        Args:
+            counter: One of "items", "bytes" or "tokens".
+            value: The amount to add.
+        """
+
+    def add_documents(self, docs: Iterable[documents.Document]) -> None:
+        """Count the documents and the bytes of their content."""
+
+    def add_texts(self, texts: Iterable[str]) -> None:
+        """Count the texts, their bytes and their tokens."""
+
+
+_NOOP_SPAN = Span()
+
+
+class Telemetry:
+    """Telemetry which records nothing.
+
+    Attributes:
+        enabled: Whether measurements are recorded. Lets callers skip
+            work that is only needed for telemetry.
+    """
+
+    enabled = False
+
+    def span(self, stage: str) -> Span:
+        """Return a span measuring a stage.
+
+        Args:
+            stage: Name of the stage, usually one of `STAGES`.
+
+        Returns:
+            A context manager measuring the enclosed block.
+        """
+        del stage  # Unused, every stage gets the same no-op span.
+        return _NOOP_SPAN
+
+
+class _RecordingSpan(Span):
+    __slots__ = ("_counters", "_recorder", "_stage", "_start")
+
+    def __init__(
+        self,
+        recorder: "MetricsRecorder | OpenTelemetryRecorder",
+        stage: str,
+    ) -> None:
+        self._recorder = recorder
+        self._stage = stage
+        self._counters: dict[str, float] = {}
+        self._start = 0.0
+
+    @typing.override
+    def __enter__(self) -> typing.Self:
+        self._start = time.perf_counter()
+        return self
+
+    @typing.override
+    def __exit__(self, *_: object) -> None:
+        self._recorder.record(
+            self._stage,
+            time.perf_counter() - self._start,
+            self._counters,
+        )
+
+    @typing.override
+    def add(self, counter: str, value: float) -> None:
+        self._counters[counter] = self._counters.get(counter, 0) + value
+
+    @typing.override
+    def add_documents(self, docs: Iterable[documents.Document]) -> None:
+        for doc in docs:
+            self.add("items", 1)
+            self.add("bytes", len(doc.page_content.encode("utf-8")))
+
+    @typing.override
+    def add_texts(self, texts: Iterable[str]) -> None:
+        for text in texts:
+            self.add("items", 1)
+            self.add("bytes", len(text.encode("utf-8")))
+            self.add("tokens", concurrency.count_tokens(text))
+
+
+class MetricsRecorder(Telemetry):
+    """Telemetry keeping histograms and counters in memory."""
+
+    enabled = True
+
+    def __init__(self, buckets: tuple[float, ...] = BUCKETS) -> None:
+        """Instantiate the class.
+
+        Args:
+            buckets: Upper bounds of the duration histogram, in seconds.
+                Defaults to `BUCKETS`.
+        """
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self._histograms: dict[str, list[int]] = {}
+        self._sums: collections.Counter[str] = collections.Counter()
+        self._counts: collections.Counter[str] = collections.Counter()
+        self._counters: dict[str, collections.Counter[str]] = {
+            counter: collections.Counter() for counter in COUNTERS
+        }
+
+    @typing.override
+    def span(self, stage: str) -> Span:
+        return _RecordingSpan(self, stage)
+
+    def record(
+        self,
+        stage: str,
+        seconds: float,
+        counters: dict[str, float] | None = None,
+    ) -> None:
+        """Record a measurement of a stage.
+
+        Args:
+            stage: Name of the stage.
+            seconds: Duration of the stage.
+            counters: Items, bytes and tokens processed.
+                Defaults to None.
+        """
+        _bucket = bisect.bisect_left(self.buckets, seconds)
+        with self._lock:
+            _histogram = self._histograms.setdefault(
+                stage,
+                [0] * (len(self.buckets) + 1),
+            )
+            _histogram[_bucket] += 1
+            self._sums[stage] += seconds
+            self._counts[stage] += 1
+            for _counter, _value in (counters or {}).items():
+                self._counters.setdefault(_counter, collections.Counter())[
+                    stage
+                ] += _value
+
+    def snapshot(self) -> dict[str, dict[str, float]]:
+        """Return the totals of every stage.
+
+        Returns:
+            Per stage, the number of spans, their total duration
+            and the totals of the counters.
+        """
+        with self._lock:
+            return {
+                stage: {
+                    "count": self._counts[stage],
+                    "seconds": self._sums[stage],
+                    **{
+                        counter: values[stage]
+                        for counter, values in self._counters.items()
+                        if stage in values
+                    },
+                }
+                for stage in self._counts
+            }
+
+    def to_prometheus(self, prefix: str = "rag_pipeline") -> str:
+        """Export the measurements in the Prometheus text format.
+
+        Args:
+            prefix: Prefix of the metric names. Defaults to "rag_pipeline".
+
+        Returns:
+            The exposition, ready to be served or written to a file.
+        """
+        _name = f"{prefix}_stage_duration_seconds"
+        _lines = [
+            f"# HELP {_name} Time spent in each stage of the pipeline.",
+            f"# TYPE {_name} histogram",
+        ]
+        with self._lock:
+            for _stage, _histogram in self._histograms.items():
+                _cumulative = 0
+                for _bound, _count in zip(
+                    (*self.buckets, "+Inf"),
+                    _histogram,
+                    strict=True,
+                ):
+                    _cumulative += _count
+                    _lines.append(
+                        f'{_name}_bucket{{stage="{_stage}",le="{_bound}"}} '
+                        f"{_cumulative}",
+                    )
+                _lines.append(
+                    f'{_name}_sum{{stage="{_stage}"}} {self._sums[_stage]}',
+                )
+                _lines.append(
+                    f'{_name}_count{{stage="{_stage}"}} {self._counts[_stage]}',
+                )
+            for _counter, _values in self._counters.items():
+                _name = f"{prefix}_stage_{_counter}_total"
+                _lines.append(
+                    f"# HELP {_name} Number of {_counter} processed "
+                    "in each stage of the pipeline.",
+                )
+                _lines.append(f"# TYPE {_name} counter")
+                _lines.extend(
+                    f'{_name}{{stage="{stage}"}} {value}'
+                    for stage, value in _values.items()
+                )
+        return "\n".join(_lines) + "\n"
+
+
+class _OpenTelemetrySpan(_RecordingSpan):
+    __slots__ = ("_context",)
+
+    def __init__(
+        self,
+        recorder: "OpenTelemetryRecorder",
+        stage: str,
+    ) -> None:
+        super().__init__(recorder, stage)
+        self._context = recorder.tracer.start_as_current_span(stage)
+
+    @typing.override
+    def __enter__(self) -> typing.Self:
+        self._context.__enter__()
+        return super().__enter__()
+
+    @typing.override
+    def __exit__(self, *exc_info: object) -> None:
+        super().__exit__(*exc_info)
+        self._context.__exit__(*exc_info)
+
+
+class OpenTelemetryRecorder(Telemetry):
+    """Telemetry forwarding spans and metrics to OpenTelemetry.
+
+    Only the OpenTelemetry API is used, so the exporters are whatever
+    the application configured through the SDK.
+
+    Attributes:
+        tracer: Tracer creating a span per stage.
+    """
+
+    enabled = True
+
+    def __init__(self, name: str = "rag_pipeline") -> None:
+        """Instantiate the class.
+
+        Args:
+            name: Name of the tracer and the meter.
+                Defaults to "rag_pipeline".
+        """
+        # Imported here, as only this recorder needs it.
+        from opentelemetry import metrics, trace
+
+        self.tracer = trace.get_tracer(name)
+        _meter = metrics.get_meter(name)
+        self._duration = _meter.create_histogram(
+            f"{name}.stage.duration",
+            unit="s",
+            description="Time spent in each stage of the pipeline.",
+        )
+        self._counters = {
+            counter: _meter.create_counter(
+                f"{name}.stage.{counter}",
+                description=f"Number of {counter} processed in each stage.",
+            )
+            for counter in COUNTERS
+        }
+
+    @typing.override
+    def span(self, stage: str) -> Span:
+        return _OpenTelemetrySpan(self, stage)
+
+    def record(
+        self,
+        stage: str,
+        seconds: float,
+        counters: dict[str, float] | None = None,
+    ) -> None:
+        """Record a measurement of a stage.
+
+        Args:
+            stage: Name of the stage.
+            seconds: Duration of the stage.
+            counters: Items, bytes and tokens processed.
+                Defaults to None.
+        """
+        _attributes = {"stage": stage}
+        self._duration.record(seconds, _attributes)
+        for _counter, _value in (counters or {}).items():
+            if _counter in self._counters:
+                self._counters[_counter].add(_value, _attributes)
+
+
+class InstrumentedEmbeddings(embeddings.Embeddings):
+    """Embeddings measured under the "embed" stage."""
+
+    def __init__(
+        self,
+        embedding: embeddings.Embeddings,
+        telemetry: Telemetry,
+    ) -> None:
+        """Instantiate the class.
+
+        Args:
+            embedding: The embeddings to measure.
+            telemetry: Where to record the measurements.
+        """
+        self.embedding = embedding
+        self.telemetry = telemetry
+
+    @typing.override
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        with self.telemetry.span("embed") as _span:
+            _span.add_texts(texts)
+            return self.embedding.embed_documents(texts)
+
+    @typing.override
+    def embed_query(self, text: str) -> list[float]:
+        with self.telemetry.span("embed") as _span:
+            _span.add_texts([text])
+            return self.embedding.embed_query(text)
@@ -0,0 +1,93 @@
+"""Unit tests for batch_evaluation.py."""
+
+import json
+import pathlib
+import tempfile
+import typing
+import unittest
+from unittest import mock
+
+from langchain_core import documents
+
+from src.rag_pipeline import batch_evaluation, pipeline, quality_metrics
+
+
+class _FakeEvaluation(quality_metrics.BaseEvaluation):
+    """Evaluation returning a fixed score."""
+
+    @typing.override
+    def __init__(self, score: float) -> None:
+        self.score = score
+
+    @typing.override
+    def evaluate(self) -> float:
+        return self.score
+
+
+class TestBatchEvaluator(unittest.TestCase):
+    """Tests for BatchEvaluator."""
+
+    @typing.override
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.directory.name)
+        self.query_file = self.path / "queries.jsonl"
+        self.query_file.write_text(
+            "\n".join(
+                json.dumps({"id": i, "query": f"Question {i}?"})
+                for i in range(3)
+            ),
+        )
+        self.rag_pipeline = mock.Mock()
+        self.rag_pipeline.query.return_value = pipeline.QueryResult(
+            "answer",
+            [documents.Document(page_content="context")],
+            {"retrieve": 0.1, "generate": 0.2},
+        )
+        self.evaluator = batch_evaluation.BatchEvaluator(
+            self.rag_pipeline,
+            lambda *_: [_FakeEvaluation(1), _FakeEvaluation(0.5)],
+            self.path / "output",
+        )
+
+    @typing.override
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_run(self) -> None:
+        """Every query is scored and the stages are timed."""
+        summary = self.evaluator.run(self.query_file)
+        self.assertEqual(summary["queries"], 3)
+        self.assertEqual(summary["score"], 75)
+        self.assertIn("p50", summary["latencies"]["generate"])
+        self.assertTrue(self.evaluator.summary_path.exists())
+
+    def test_resume(self) -> None:
+        """Checkpointed queries are not evaluated again."""
+        self.evaluator.run(self.query_file)
+        self.evaluator.run(self.query_file)
+        self.assertEqual(self.rag_pipeline.query.call_count, 3)
+        self.assertEqual(len(self.evaluator.load_results()), 3)
+
+    def test_resume_partial_line(self) -> None:
+        """A line cut short is dropped instead of corrupting the next one."""
+        self.evaluator.run(self.query_file)
+        lines = self.evaluator.results_path.read_text().splitlines()
+        self.evaluator.results_path.write_text(
+            "\n".join([*lines[:2], lines[2][:10]]),
+        )
+        self.evaluator.run(self.query_file)
+        self.assertEqual(self.rag_pipeline.query.call_count, 4)
+        for line in self.evaluator.results_path.read_text().splitlines():
+            json.loads(line)
+        self.assertEqual(len(self.evaluator.load_results()), 3)
+
+
+class TestPercentiles(unittest.TestCase):
+    """Tests for percentiles."""
+
+    def test_percentiles(self) -> None:
+        """Percentiles are ordered and bounded by the maximum."""
+        summary = batch_evaluation.percentiles([float(i) for i in range(101)])
+        self.assertEqual(summary["p50"], 50)
+        self.assertEqual(summary["max"], 100)
@@ -0,0 +1,39 @@
+"""Unit tests for the benchmark suite."""
+
+import pathlib
+import tempfile
+import unittest
+
+from src.benchmarks import suite
+
+
+class TestBaseline(unittest.TestCase):
+    """Tests for saving and comparing baselines."""
+
+    def test_round_trip(self) -> None:
+        """Saved baselines load back, leaving failed benchmarks out."""
+        results = [
+            suite.BenchmarkResult("load", "txt", 0.5, 1, 100),
+            suite.BenchmarkResult("load", "pdf", error="missing"),
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            path = pathlib.Path(directory) / "baseline.json"
+            suite.save_baseline(results, path)
+            baseline = suite.load_baseline(path)
+        self.assertEqual(list(baseline), ["load/txt"])
+        self.assertEqual(baseline["load/txt"], results[0])
+
+    def test_find_regressions(self) -> None:
+        """Only benchmarks slower than the tolerance are flagged."""
+        baseline = {
+            "chunk/token": suite.BenchmarkResult("chunk", "token", 1.0),
+            "chunk/recursive": suite.BenchmarkResult("chunk", "recursive", 1.0),
+        }
+        results = [
+            suite.BenchmarkResult("chunk", "token", 1.1),
+            suite.BenchmarkResult("chunk", "recursive", 1.5),
+            suite.BenchmarkResult("chunk", "semantic", 9.0),
+        ]
+        regressions = suite.find_regressions(results, baseline, tolerance=0.2)
+        self.assertEqual(len(regressions), 1)
+        self.assertIn("chunk/recursive", regressions[0])
@@ -0,0 +1,64 @@
+"""Unit tests for caching.py."""
+
+import typing
+import unittest
+
+from langchain_core import outputs
+
+from src.rag_pipeline import caching
+
+
+class TestLLMCache(unittest.TestCase):
+    """Tests for LLMCache."""
+
+    @typing.override
+    def setUp(self) -> None:
+        self.cache = caching.LLMCache(":memory:", max_entries=2)
+
+    @typing.override
+    def tearDown(self) -> None:
+        self.cache.close()
+
+    def test_get_or_call(self) -> None:
+        """The model is called only once for identical calls."""
+        calls = []
+
+        def call() -> str:
+            calls.append(None)
+            return "answer"
+
+        for _ in range(3):
+            self.assertEqual(
+                self.cache.get_or_call(call, "model", "prompt", temperature=0),
+                "answer",
+            )
+        self.assertEqual(len(calls), 1)
+
+    def test_key_includes_params(self) -> None:
+        """Different parameters do not share an entry."""
+        self.cache.put("model", "prompt", "answer", top_p=1)
+        self.assertIsNone(self.cache.get("model", "prompt", top_p=0.5))
+        self.assertEqual(self.cache.get("model", "prompt", top_p=1), "answer")
+
+    def test_nonzero_temperature_bypasses(self) -> None:
+        """Sampled calls are not cached by default."""
+        self.cache.get_or_call(lambda: "a", "model", "prompt", temperature=1)
+        self.assertEqual(len(self.cache), 0)
+
+    def test_eviction(self) -> None:
+        """The number of entries stays within max_entries."""
+        for i in range(5):
+            self.cache.put("model", f"prompt {i}", "answer")
+        self.assertEqual(len(self.cache), 2)
+        self.assertEqual(self.cache.get("model", "prompt 4"), "answer")
+
+    def test_ttl(self) -> None:
+        """Expired entries are not returned."""
+        self.cache.ttl = -1
+        self.cache.put("model", "prompt", "answer")
+        self.assertIsNone(self.cache.get("model", "prompt"))
+
+    def test_lookup(self) -> None:
+        """LangChain generations survive a round trip."""
+        self.cache.update("prompt", "llm", [outputs.Generation(text="hi")])
+        self.assertEqual(self.cache.lookup("prompt", "llm")[0].text, "hi")
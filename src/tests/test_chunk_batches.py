@@ -0,0 +1,63 @@
+"""Unit tests for chunk_batches.py."""
+
+import unittest
+
+from langchain_core import documents
+
+from src.rag_pipeline import chunk_batches
+
+
+class TestChunkBatch(unittest.TestCase):
+    """Tests for ChunkBatch."""
+
+    def test_round_trip(self) -> None:
+        """Documents come back as they were added, in order."""
+        docs = [
+            documents.Document(
+                page_content=f"Chunk {index}.",
+                metadata={"source": "a.md", "Header 1": "Intro"},
+            )
+            for index in range(3)
+        ]
+        docs.append(
+            documents.Document(page_content="Other.", metadata={"tags": [1]}),
+        )
+        batch = chunk_batches.ChunkBatch.from_documents(docs)
+        self.assertEqual(batch.to_documents(), docs)
+        self.assertIs(batch.metadata(0), batch.metadata(2))
+
+    def test_equal_values_of_other_types(self) -> None:
+        """Metadata values which are equal but of other types are kept."""
+        docs = [
+            documents.Document(page_content="Chunk.", metadata={"page": value})
+            for value in (1, True, 1.0)
+        ]
+        batch = chunk_batches.ChunkBatch.from_documents(docs)
+        self.assertEqual(
+            [type(doc.metadata["page"]) for doc in batch],
+            [int, bool, float],
+        )
+
+    def test_spans(self) -> None:
+        """Spans share their source, and mix with appended texts."""
+        source = "The quick brown fox."
+        batch = chunk_batches.ChunkBatch()
+        batch.add_span(source, 4, 9, {})
+        batch.append("jumps", {})
+        batch.add_span(source, 10, 15, {})
+        self.assertEqual(batch.texts(), ["quick", "jumps", "brown"])
+
+    def test_reads_between_appends(self) -> None:
+        """Chunks read while the arena fills are still read correctly."""
+        batch = chunk_batches.ChunkBatch()
+        batch.add_span("The quick brown fox.", 4, 9, {})
+        batch.append("jumps", {})
+        self.assertEqual(batch.text(0), "quick")
+        batch.append(" over", {})
+        self.assertEqual(batch.text(1), "jumps")
+        batch.append(" the", {})
+        batch.add_span("The lazy dog.", 4, 8, {})
+        self.assertEqual(
+            batch.texts(),
+            ["quick", "jumps", " over", " the", "lazy"],
+        )
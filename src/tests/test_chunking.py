@@ -1,6 +1,8 @@
 """Unit tests for chunking.py."""
 
+import itertools
 import pathlib
+import tempfile
 import typing
 import unittest
 
@@ -31,6 +33,13 @@ class TestCharacterChunker(unittest.TestCase):
         """A list of Document objects is successfully returned."""
         self.assertIsInstance(self.chunker.chunk()[0], documents.Document)
 
+    def test_chunk_batch(self) -> None:
+        """The batch holds the same chunks as the documents."""
+        self.assertEqual(
+            self.chunker.chunk_batch().texts(),
+            [doc.page_content for doc in self.chunker.chunk()],
+        )
+
 
 class TestRecursiveChunker(unittest.TestCase):
     """Tests for RecursiveChunker."""
@@ -44,6 +53,13 @@ class TestRecursiveChunker(unittest.TestCase):
         """A list of Document objects is successfully returned."""
         self.assertIsInstance(self.chunker.chunk()[0], documents.Document)
 
+    def test_chunk_batch(self) -> None:
+        """The batch holds the same chunks as the documents."""
+        self.assertEqual(
+            self.chunker.chunk_batch().texts(),
+            [doc.page_content for doc in self.chunker.chunk()],
+        )
+
 
 class TestHTMLHeaderChunker(unittest.TestCase):
     """Tests for HTMLHeaderChunker."""
@@ -89,6 +105,23 @@ class TestHTMLSectionChunker(unittest.TestCase):
         )
 
 
+class TestStructuralHTMLChunker(unittest.TestCase):
+    """Tests for StructuralHTMLChunker."""
+
+    def test_chunk(self) -> None:
+        """Chunks are bounded in size and carry their headers."""
+        chunk_size = 500
+        chunks = chunking.StructuralHTMLChunker(
+            PATH_TO_HTML,
+            chunk_size=chunk_size,
+            chunk_overlap=100,
+        ).chunk()
+        self.assertTrue(
+            all(len(doc.page_content) <= chunk_size for doc in chunks),
+        )
+        self.assertIn("Header 1", chunks[-1].metadata)
+
+
 class TestMarkdownHeaderChunker(unittest.TestCase):
     """Tests for MarkdownHeaderChunker."""
 
@@ -109,6 +142,52 @@ class TestMarkdownHeaderChunker(unittest.TestCase):
         self.assertIsInstance(self.chunker.chunk()[0], documents.Document)
 
 
+class TestStructuralMarkdownChunker(unittest.TestCase):
+    """Tests for StructuralMarkdownChunker."""
+
+    def test_chunk(self) -> None:
+        """Code blocks are kept whole, with the headers they are under."""
+        chunks = chunking.StructuralMarkdownChunker(
+            PATH_TO_MARKDOWN,
+            chunk_size=40,
+            chunk_overlap=10,
+        ).chunk()
+        code = [doc for doc in chunks if "```" in doc.page_content]
+        self.assertEqual(len(code), 2)
+        self.assertEqual({doc.page_content.count("```") for doc in code}, {2})
+        self.assertEqual(
+            code[1].metadata,
+            {"Header 1": "Foobar", "Header 2": "Usage"},
+        )
+
+    def test_overlap(self) -> None:
+        """Consecutive chunks share the end of the previous one."""
+        paragraphs = [
+            f"Paragraph {i} starts here. "
+            + "It goes on and on. " * 7
+            + "It ends here."
+            for i in range(5)
+        ]
+        with tempfile.TemporaryDirectory() as directory:
+            path = pathlib.Path(directory) / "document.md"
+            path.write_text("\n\n".join(paragraphs), encoding="utf-8")
+            chunks = [
+                doc.page_content
+                for doc in chunking.StructuralMarkdownChunker(
+                    path,
+                    chunk_size=400,
+                    chunk_overlap=100,
+                ).chunk()
+            ]
+        self.assertGreater(len(chunks), 2)
+        for previous, chunk in itertools.pairwise(chunks):
+            self.assertLessEqual(len(chunk), 400)
+            overlap = chunk.split("\n\n")[0]
+            self.assertTrue(previous.endswith(overlap))
+            self.assertLessEqual(len(overlap), 100)
+            self.assertGreater(len(overlap), 50)
+
+
 class TestSemanticChunker(unittest.TestCase):
     """Tests for SemanticChunker."""
 
@@ -0,0 +1,163 @@
+"""Unit tests for clients.py."""
+
+import http.server
+import json
+import os
+import threading
+import typing
+import unittest
+from unittest import mock
+
+from src.rag_pipeline import caching, clients
+
+_RESPONSES = {
+    "/completion": {"content": "answer"},
+    "/chat/completions": {
+        "id": "completion",
+        "object": "chat.completion",
+        "created": 0,
+        "model": "model",
+        "choices": [
+            {
+                "index": 0,
+                "message": {"role": "assistant", "content": "answer"},
+                "finish_reason": "stop",
+            },
+        ],
+    },
+    "/v1/messages": {
+        "id": "message",
+        "type": "message",
+        "role": "assistant",
+        "model": "model",
+        "content": [{"type": "text", "text": "answer"}],
+        "stop_reason": "end_turn",
+        "stop_sequence": None,
+        "usage": {"input_tokens": 1, "output_tokens": 1},
+    },
+}
+
+
+class _CompletionHandler(http.server.BaseHTTPRequestHandler):
+    """Answer completion requests over keep-alive connections."""
+
+    protocol_version = "HTTP/1.1"
+
+    def do_POST(self) -> None:
+        """Answer with a fixed completion in the format of the API."""
+        self.rfile.read(int(self.headers["Content-Length"]))
+        _body = json.dumps(_RESPONSES[self.path]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(_body)))
+        self.end_headers()
+        self.wfile.write(_body)
+
+    @typing.override
+    def log_message(self, *_: typing.Any) -> None:
+        pass
+
+
+class TestClientRegistry(unittest.TestCase):
+    """Tests for ClientRegistry."""
+
+    @typing.override
+    def setUp(self) -> None:
+        self.registry = clients.ClientRegistry()
+        self.addCleanup(self.registry.close)
+
+    def test_shared_instance(self) -> None:
+        """Identical arguments hand out the same client."""
+        first = self.registry.get_llamafile(base_url="http://localhost:1")
+        second = self.registry.get_llamafile(base_url="http://localhost:1")
+        other = self.registry.get_llamafile(
+            base_url="http://localhost:1",
+            temperature=0.5,
+        )
+        self.assertIs(first, second)
+        self.assertIsNot(first, other)
+        self.assertEqual(self.registry.stats()["llamafile"].created, 2)
+        self.assertEqual(self.registry.stats()["llamafile"].reused, 1)
+
+    def test_session_reuse(self) -> None:
+        """Clients of the same server share a session."""
+        first = self.registry.get_llamafile(base_url="http://localhost:1")
+        other = self.registry.get_llamafile(
+            base_url="http://localhost:1",
+            temperature=0.5,
+        )
+        elsewhere = self.registry.get_llamafile(base_url="http://localhost:2")
+        self.assertIsNotNone(first.session)
+        self.assertIs(first.session, other.session)
+        self.assertIsNot(first.session, elsewhere.session)
+
+    def test_openai_http_client(self) -> None:
+        """OpenAI clients share one pooled HTTP client."""
+        first = self.registry.get_openai(api_key="key")
+        other = self.registry.get_openai(api_key="key", temperature=0.5)
+        self.assertIs(first, self.registry.get_openai(api_key="key"))
+        self.assertIs(first.http_client, other.http_client)
+
+    def test_openai_sdk(self) -> None:
+        """Identical arguments hand out the same SDK client."""
+        environment = {
+            "OPENAI_API_KEY": "key",
+            "AZURE_OPENAI_API_KEY": "key",
+            "AZURE_OPENAI_ENDPOINT": "http://localhost:1",
+            "OPENAI_API_VERSION": "2024-06-01",
+        }
+        with mock.patch.dict(os.environ, environment):
+            client = self.registry.get_openai_sdk()
+            self.assertIs(client, self.registry.get_openai_sdk())
+            self.assertIsNot(
+                client,
+                self.registry.get_openai_sdk(is_azure=True),
+            )
+
+    def test_cached_call_openai(self) -> None:
+        """Calls of the mad skillz go through the registry."""
+        url = self._serve()
+        environment = {"OPENAI_API_KEY": "key", "OPENAI_BASE_URL": url}
+        with (
+            mock.patch.dict(os.environ, environment),
+            mock.patch.object(clients, "REGISTRY", self.registry),
+        ):
+            for _ in range(2):
+                answer = caching.cached_call_openai(
+                    None,
+                    [{"role": "user", "content": "prompt"}],
+                    model="model",
+                    temperature=0.0,
+                )
+                self.assertEqual(answer, "answer")
+        stats = self.registry.stats()["openai"]
+        self.assertEqual((stats.created, stats.reused), (1, 1))
+        self.assertEqual(stats.requests, 2)
+
+    def test_anthropic_stats(self) -> None:
+        """Anthropic requests are counted."""
+        url = self._serve()
+        for _ in range(2):
+            client = self.registry.get_anthropic(api_key="key", base_url=url)
+            self.assertEqual(client.invoke("prompt").content, "answer")
+        stats = self.registry.stats()["anthropic"]
+        self.assertEqual((stats.created, stats.requests), (1, 2))
+
+    def test_stats(self) -> None:
+        """Requests are counted and sent over one kept-alive connection."""
+        client = self.registry.get_llamafile(base_url=self._serve())
+        for _ in range(3):
+            self.assertEqual(client.invoke("prompt"), "answer")
+        stats = self.registry.stats()["llamafile"]
+        self.assertEqual(stats.requests, 3)
+        self.assertEqual(stats.connections, 1)
+
+    def _serve(self) -> str:
+        server = http.server.ThreadingHTTPServer(
+            ("localhost", 0),
+            _CompletionHandler,
+        )
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        return f"http://localhost:{server.server_port}"
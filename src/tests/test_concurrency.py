@@ -0,0 +1,73 @@
+"""Unit tests for concurrency.py."""
+
+import threading
+import time
+import unittest
+
+from src.rag_pipeline import concurrency
+
+
+class TestRateLimiter(unittest.TestCase):
+    """Tests for RateLimiter."""
+
+    def test_invalid_rate(self) -> None:
+        """A rate which is not positive is rejected."""
+        with self.assertRaises(ValueError):
+            concurrency.RateLimiter(0)
+
+    def test_burst(self) -> None:
+        """A burst of calls is issued at once, the next one waits."""
+        limiter = concurrency.RateLimiter(10, burst=3)
+        start = time.monotonic()
+        for _ in range(3):
+            limiter.acquire()
+        self.assertLess(time.monotonic() - start, 0.05)
+        limiter.acquire()
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+    def test_rate(self) -> None:
+        """Calls from several threads are spaced by the rate."""
+        limiter = concurrency.RateLimiter(50)
+        threads = [threading.Thread(target=limiter.acquire) for _ in range(6)]
+        start = time.monotonic()
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        # The first call is free, the other five wait 20 ms each.
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
+
+
+class TestMapConcurrently(unittest.TestCase):
+    """Tests for map_concurrently."""
+
+    def test_order(self) -> None:
+        """Results are in the order of the items, not of completion."""
+
+        def slow_square(item: int) -> int:
+            time.sleep((5 - item) * 0.01)
+            return item * item
+
+        self.assertEqual(
+            concurrency.map_concurrently(slow_square, range(6), 6),
+            [0, 1, 4, 9, 16, 25],
+        )
+
+    def test_exception(self) -> None:
+        """An exception raised for an item propagates to the caller."""
+
+        def fail(item: int) -> int:
+            if item == failing:
+                raise ValueError(item)
+            return item
+
+        failing = 3
+        with self.assertRaises(ValueError):
+            concurrency.map_concurrently(fail, range(6), 3)
+
+    def test_limiter(self) -> None:
+        """Every item acquires the limiter."""
+        limiter = concurrency.RateLimiter(50)
+        start = time.monotonic()
+        concurrency.map_concurrently(lambda item: item, range(6), 6, limiter)
+        self.assertGreaterEqual(time.monotonic() - start, 0.09)
@@ -0,0 +1,97 @@
+"""Unit tests for context_ranking_listwise.py."""
+
+import re
+import typing
+import unittest
+from unittest import mock
+
+from parea.schemas.log import Log
+
+from src.rag_pipeline import caching
+from src.rag_pipeline.mad_skillz import context_ranking_listwise
+
+MODES = ("progressive", "tournament")
+
+
+class TestContextRankingListwise(unittest.TestCase):
+    """Tests for context_ranking_listwise_factory, with a stubbed LLM."""
+
+    @typing.override
+    def setUp(self) -> None:
+        self.answer: typing.Callable[[list[str]], str] = self._in_order
+        self.enterContext(
+            mock.patch.object(caching, "cached_call_openai", self._call),
+        )
+
+    def _call(
+        self,
+        _: caching.LLMCache | None,
+        messages: list[dict[str, str]],
+        **__: object,
+    ) -> str:
+        return self.answer(
+            re.findall(r"^\d+ = (.*)$", messages[0]["content"], re.MULTILINE),
+        )
+
+    @staticmethod
+    def _in_order(passages: list[str]) -> str:
+        return ", ".join(str(i + 1) for i in range(len(passages)))
+
+    @staticmethod
+    def _by_score(passages: list[str]) -> str:
+        # Passages are "score N"; the higher, the more relevant.
+        _order = sorted(
+            range(len(passages)),
+            key=lambda i: -int(passages[i].split()[1]),
+        )
+        return ", ".join(str(i + 1) for i in _order)
+
+    def _rank(self, contexts: list[str], mode: str) -> float:
+        return context_ranking_listwise.context_ranking_listwise_factory(
+            n_contexts_to_rank=4,
+            mode=mode,
+        )(Log(inputs={"question": "query", "context": contexts}))
+
+    def test_identity(self) -> None:
+        """Passages returned in their order are a perfect ranking."""
+        contexts = [f"score {10 - i}" for i in range(10)]
+        for mode in MODES:
+            with self.subTest(mode=mode):
+                self.assertAlmostEqual(self._rank(contexts, mode), 1.0)
+
+    def test_reversed(self) -> None:
+        """Reversed contexts are not a perfect ranking."""
+        self.answer = self._by_score
+        contexts = [f"score {i}" for i in range(10)]
+        for mode in MODES:
+            with self.subTest(mode=mode):
+                self.assertLess(self._rank(contexts, mode), 1.0)
+
+    def _relevance(self, contexts: list[str], mode: str) -> list[int]:
+        _relevance = []
+        with mock.patch.object(
+            context_ranking_listwise,
+            "ndcg",
+            lambda relevance, _: _relevance.extend(relevance) or 0.0,
+        ):
+            self._rank(contexts, mode)
+        return _relevance
+
+    def test_most_relevant_first(self) -> None:
+        """The most relevant context is graded highest."""
+        self.answer = self._by_score
+        contexts = [f"score {i}" for i in (3, 1, 4, 0, 5, 9, 2, 6, 8, 7)]
+        for mode in MODES:
+            with self.subTest(mode=mode):
+                relevance = self._relevance(contexts, mode)
+                self.assertEqual(sorted(relevance), list(range(1, 11)))
+                self.assertEqual(relevance[5], 10)
+
+    def test_incomplete_answer(self) -> None:
+        """Missing, repeated and invalid passages still give a permutation."""
+        self.answer = lambda _: "Sorted Passages = [3, 3, 7, 0, 1]"
+        # Ranked as 3, 1, 2, 4.
+        self.assertEqual(
+            self._relevance(["a", "b", "c", "d"], "progressive"),
+            [3, 2, 4, 1],
+        )
@@ -0,0 +1,56 @@
+"""Unit tests for the synthetic corpus generator."""
+
+import csv
+import json
+import pathlib
+import tempfile
+import typing
+import unittest
+
+from src.benchmarks import corpus
+
+
+class TestGenerate(unittest.TestCase):
+    """Tests for generate."""
+
+    @typing.override
+    def setUp(self) -> None:
+        self.directory = tempfile.TemporaryDirectory()
+        self.path = pathlib.Path(self.directory.name)
+
+    @typing.override
+    def tearDown(self) -> None:
+        self.directory.cleanup()
+
+    def test_size(self) -> None:
+        """Every format is generated, close to the target size."""
+        generated = corpus.generate(self.path, 100_000, file_size=10_000)
+        self.assertTrue(all(generated.files.values()))
+        self.assertGreaterEqual(generated.size, 100_000)
+        self.assertLess(generated.size, 110_000)
+
+    def test_seeded(self) -> None:
+        """The same seed yields the same documents."""
+        first = corpus.generate(self.path / "first", 20_000, seed=1)
+        second = corpus.generate(self.path / "second", 20_000, seed=1)
+        for file_format, files in first.files.items():
+            for path, other in zip(
+                files,
+                second.files[file_format],
+                strict=True,
+            ):
+                self.assertEqual(path.read_bytes(), other.read_bytes())
+
+    def test_structure(self) -> None:
+        """CSV and JSON documents stay parsable."""
+        generated = corpus.generate(
+            self.path,
+            50_000,
+            formats=["csv", "json"],
+            file_size=25_000,
+        )
+        with generated.files["csv"][0].open(newline="") as file:
+            rows = list(csv.reader(file))
+        self.assertEqual({len(row) for row in rows}, {7})
+        messages = json.loads(generated.files["json"][0].read_text())
+        self.assertTrue(messages["messages"])
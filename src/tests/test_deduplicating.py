@@ -0,0 +1,82 @@
+"""Unit tests for deduplicating.py."""
+
+import pathlib
+import tempfile
+import unittest
+
+from langchain_core import documents
+
+from src.rag_pipeline import deduplicating
+
+TEXT = (
+    "The ideal economic policy, both for today and tomorrow, is very "
+    "simple. Government should protect and defend against domestic and "
+    "foreign aggression the lives and property of the persons under its "
+    "jurisdiction, settle disputes that arise, and leave the people "
+    "otherwise free to pursue their various goals and ends in life."
+)
+
+
+class TestDeduplicator(unittest.TestCase):
+    """Tests for Deduplicator."""
+
+    def test_deduplicate(self) -> None:
+        """Copies differing in format are dropped, other chunks kept."""
+        docs = [
+            documents.Document(page_content=TEXT),
+            documents.Document(page_content=f"## {TEXT.upper()}\n"),
+            documents.Document(page_content=TEXT[::-1]),
+        ]
+        kept = deduplicating.Deduplicator().deduplicate(docs)
+        self.assertEqual(kept, [docs[0], docs[2]])
+
+    def test_no_words(self) -> None:
+        """Chunks without words are only dropped when they are copies."""
+        docs = [
+            documents.Document(page_content="!!!"),
+            documents.Document(page_content="???"),
+            documents.Document(page_content=" !!!\n"),
+        ]
+        kept = deduplicating.Deduplicator().deduplicate(docs)
+        self.assertEqual(kept, docs[:2])
+
+    def test_index_path(self) -> None:
+        """Chunks seen by an earlier run are dropped."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = pathlib.Path(directory) / "signatures.npz"
+            doc = documents.Document(page_content=TEXT)
+            deduplicator = deduplicating.Deduplicator(index_path=path)
+            deduplicator.deduplicate([doc])
+            self.assertFalse(path.exists())
+            deduplicator.save()
+            later = deduplicating.Deduplicator(index_path=path)
+            self.assertEqual(len(later.index), 1)
+            self.assertEqual(later.deduplicate([doc]), [])
+
+    def test_parameters(self) -> None:
+        """Signatures computed with other parameters are rejected."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = pathlib.Path(directory) / "signatures.npz"
+            deduplicator = deduplicating.Deduplicator(index_path=path)
+            deduplicator.deduplicate([documents.Document(page_content=TEXT)])
+            deduplicator.save()
+            for parameters in (
+                {"num_perm": 64},
+                {"shingle_size": 3},
+                {"seed": 1},
+            ):
+                with (
+                    self.subTest(parameters=parameters),
+                    self.assertRaises(ValueError),
+                ):
+                    deduplicating.Deduplicator(index_path=path, **parameters)
+
+
+class TestLSHParameters(unittest.TestCase):
+    """Tests for lsh_parameters."""
+
+    def test_threshold(self) -> None:
+        """The bands fit in the signature and approach the threshold."""
+        bands, rows = deduplicating.lsh_parameters(0.8, 128)
+        self.assertLessEqual(bands * rows, 128)
+        self.assertAlmostEqual((1 / bands) ** (1 / rows), 0.8, delta=0.05)
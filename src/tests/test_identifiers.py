@@ -0,0 +1,32 @@
+"""Unit tests for identifiers.py."""
+
+import unittest
+
+from langchain_core import documents
+
+from src.rag_pipeline import identifiers
+
+
+class TestIdentifiers(unittest.TestCase):
+    """Tests for the identifiers."""
+
+    def test_stable_hash(self) -> None:
+        """Equal structures hash alike, whatever their key order."""
+        self.assertEqual(
+            identifiers.stable_hash({"a": 1, "b": [2, 3]}),
+            identifiers.stable_hash({"b": [2, 3], "a": 1}),
+        )
+        self.assertNotEqual(
+            identifiers.stable_hash("text"),
+            identifiers.stable_hash("other text"),
+        )
+
+    def test_chunk_id(self) -> None:
+        """A chunk's own id wins over the hash of its content."""
+        chunk = documents.Document(page_content="text", metadata={"page": 1})
+        self.assertEqual(
+            identifiers.chunk_id(chunk),
+            identifiers.stable_hash(["text", {"page": 1}]),
+        )
+        chunk.id = "chunk-1"
+        self.assertEqual(identifiers.chunk_id(chunk), "chunk-1")
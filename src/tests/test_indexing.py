@@ -0,0 +1,218 @@
+"""Unit tests for indexing.py."""
+
+import pathlib
+import tempfile
+import typing
+import unittest
+
+from langchain_core import documents, embeddings
+
+from src.rag_pipeline import indexing, persisting
+
+
+class TestIndexQueue(unittest.TestCase):
+    """Tests for IndexQueue."""
+
+    @typing.override
+    def setUp(self) -> None:
+        directory = self.enterContext(tempfile.TemporaryDirectory())
+        self.path = str(pathlib.Path(directory) / "queue.sqlite3")
+        self.queue = indexing.IndexQueue(self.path, max_attempts=2)
+        self.addCleanup(self.queue.close)
+
+    def test_claim(self) -> None:
+        """Chunks are claimed once, oldest first."""
+        ids = self.queue.put(
+            documents.Document(page_content=str(index), metadata={"i": index})
+            for index in range(3)
+        )
+        claimed = self.queue.claim(2)
+        self.assertEqual([id_ for id_, _ in claimed], ids[:2])
+        self.assertEqual(claimed[1][1].metadata, {"i": 1})
+        self.assertEqual([id_ for id_, _ in self.queue.claim(2)], ids[2:])
+        self.queue.complete(ids)
+        self.assertEqual(self.queue.unfinished(), 0)
+
+    def test_recovery(self) -> None:
+        """Claimed chunks are pending again when the queue is reopened."""
+        self.queue.put([documents.Document(page_content="chunk")])
+        self.queue.claim(1)
+        reopened = indexing.IndexQueue(self.path)
+        self.addCleanup(reopened.close)
+        self.assertEqual(reopened.counts(), {"pending": 1})
+
+    def test_commit(self) -> None:
+        """Indexed chunks are only removed once committed."""
+        ids = self.queue.put(
+            documents.Document(page_content=str(index)) for index in range(2)
+        )
+        self.queue.claim(2)
+        self.queue.complete(ids[:1])
+        self.assertEqual(self.queue.counts(), {"claimed": 1, "indexed": 1})
+        reopened = indexing.IndexQueue(self.path)
+        self.addCleanup(reopened.close)
+        self.assertEqual(reopened.counts(), {"pending": 1, "indexed": 1})
+        reopened.requeue_indexed()
+        self.assertEqual(reopened.counts(), {"pending": 2})
+        reopened.claim(2)
+        reopened.complete(ids)
+        reopened.commit()
+        self.assertEqual(reopened.counts(), {})
+
+    def test_fail(self) -> None:
+        """Chunks are retried until they fail too often."""
+        ids = self.queue.put([documents.Document(page_content="chunk")])
+        self.queue.claim(1)
+        self.queue.fail(ids, "error")
+        self.assertEqual(self.queue.counts(), {"pending": 1})
+        self.queue.claim(1)
+        self.queue.fail(ids, "error")
+        self.assertEqual(self.queue.counts(), {"failed": 1})
+
+
+class TestBackgroundIndexer(unittest.TestCase):
+    """Tests for BackgroundIndexer."""
+
+    def test_index(self) -> None:
+        """Submitted chunks become searchable once indexed."""
+        indexer = indexing.BackgroundIndexer(
+            persisting.FAISSStorage(
+                embeddings.DeterministicFakeEmbedding(size=8),
+            ),
+            indexing.IndexQueue(":memory:"),
+            workers=2,
+            batch_size=2,
+            poll_interval=0.05,
+        )
+        retriever = indexer.as_retriever(k=1)
+        self.assertEqual(retriever.invoke("chunk 3"), [])
+        with indexer:
+            indexer.submit(
+                documents.Document(page_content=f"chunk {index}")
+                for index in range(5)
+            )
+            self.assertTrue(indexer.join(timeout=10))
+        self.assertEqual(
+            retriever.invoke("chunk 3")[0].page_content,
+            "chunk 3",
+        )
+        self.assertEqual(len(indexer.store.index_to_docstore_id), 5)
+
+    def test_embedding_kept(self) -> None:
+        """The storage's model is not replaced by the indexer's."""
+        embedding = embeddings.DeterministicFakeEmbedding(size=8)
+        persister = persisting.FAISSStorage(embedding)
+        indexing.BackgroundIndexer(persister, indexing.IndexQueue(":memory:"))
+        self.assertIs(persister.embedding, embedding)
+
+    def test_restart(self) -> None:
+        """A restarted indexer resumes from the saved vectorstore."""
+        directory = pathlib.Path(
+            self.enterContext(tempfile.TemporaryDirectory()),
+        )
+
+        def indexer() -> indexing.BackgroundIndexer:
+            return indexing.BackgroundIndexer(
+                persisting.FAISSStorage(
+                    embeddings.DeterministicFakeEmbedding(size=8),
+                ),
+                indexing.IndexQueue(str(directory / "queue.sqlite3")),
+                batch_size=2,
+                poll_interval=0.05,
+                save_path=directory / "index",
+            )
+
+        with indexer() as first:
+            first.submit(
+                documents.Document(page_content=f"chunk {index}")
+                for index in range(5)
+            )
+            self.assertTrue(first.join(timeout=10))
+        first.queue.close()
+        second = indexer()
+        self.addCleanup(second.queue.close)
+        self.assertEqual(second.queue.counts(), {})
+        self.assertEqual(len(second.store.index_to_docstore_id), 5)
+        with second:
+            second.submit([documents.Document(page_content="chunk 5")])
+            self.assertTrue(second.join(timeout=10))
+        self.assertEqual(len(second.store.index_to_docstore_id), 6)
+        self.assertEqual(
+            second.search("chunk 5", k=1)[0].page_content,
+            "chunk 5",
+        )
+
+    def test_restart_unsaved(self) -> None:
+        """Chunks of a vectorstore which was not saved are indexed again."""
+        directory = pathlib.Path(
+            self.enterContext(tempfile.TemporaryDirectory()),
+        )
+
+        def indexer() -> indexing.BackgroundIndexer:
+            return indexing.BackgroundIndexer(
+                persisting.FAISSStorage(
+                    embeddings.DeterministicFakeEmbedding(size=8),
+                ),
+                indexing.IndexQueue(str(directory / "queue.sqlite3")),
+                poll_interval=0.05,
+            )
+
+        with indexer() as first:
+            first.submit([documents.Document(page_content="chunk")])
+            self.assertTrue(first.join(timeout=10))
+        self.assertEqual(first.queue.counts(), {"indexed": 1})
+        first.queue.close()
+        second = indexer()
+        self.addCleanup(second.queue.close)
+        self.assertEqual(second.queue.counts(), {"pending": 1})
+        with second:
+            self.assertTrue(second.join(timeout=10))
+        self.assertEqual(
+            second.search("chunk", k=1)[0].page_content,
+            "chunk",
+        )
+
+    def test_restart_persistent(self) -> None:
+        """Chunks of a vectorstore persisting by itself are not lost."""
+        directory = pathlib.Path(
+            self.enterContext(tempfile.TemporaryDirectory()),
+        )
+
+        def indexer() -> indexing.BackgroundIndexer:
+            return indexing.BackgroundIndexer(
+                persisting.ChromaStorage(
+                    embeddings.DeterministicFakeEmbedding(size=8),
+                ),
+                indexing.IndexQueue(str(directory / "queue.sqlite3")),
+                poll_interval=0.05,
+                persist_directory=str(directory / "chroma"),
+            )
+
+        with indexer() as first:
+            first.submit(
+                documents.Document(page_content=f"chunk {index}")
+                for index in range(2)
+            )
+            self.assertTrue(first.join(timeout=10))
+        self.assertEqual(first.queue.counts(), {})
+        first.queue.close()
+        second = indexer()
+        self.addCleanup(second.queue.close)
+        with second:
+            second.submit([documents.Document(page_content="chunk 2")])
+            self.assertTrue(second.join(timeout=10))
+        self.assertEqual(
+            sorted(doc.page_content for doc in second.search("chunk", k=5)),
+            ["chunk 0", "chunk 1", "chunk 2"],
+        )
+
+    def test_unsupported_save_path(self) -> None:
+        """A save path is rejected if the storage cannot be saved."""
+        with self.assertRaises(ValueError):
+            indexing.BackgroundIndexer(
+                persisting.ChromaStorage(
+                    embeddings.DeterministicFakeEmbedding(size=8),
+                ),
+                indexing.IndexQueue(":memory:"),
+                save_path="index",
+            )
@@ -0,0 +1,109 @@
+"""Unit tests for interchange.py."""
+
+import pathlib
+import tempfile
+import typing
+import unittest
+from unittest import mock
+
+import numpy as np
+from langchain_core import documents, embeddings
+
+from src.rag_pipeline import interchange, persisting
+
+
+class _OfflineEmbedding(embeddings.DeterministicFakeEmbedding):
+    """Fake embeddings which may only embed queries."""
+
+    @typing.override
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        if texts:
+            msg = "Documents are embedded again."
+            raise AssertionError(msg)
+        return []
+
+
+class TestInterchange(unittest.TestCase):
+    """Tests for interchange.py."""
+
+    @typing.override
+    def setUp(self) -> None:
+        self.directory = pathlib.Path(
+            self.enterContext(tempfile.TemporaryDirectory()),
+        )
+        self.path = self.directory / "chunks.arrow"
+        self.docs = [
+            documents.Document(
+                page_content=f"Chunk {index}.",
+                metadata={"source": "a.md", "index": index},
+            )
+            for index in range(5)
+        ]
+        self.embedding = embeddings.DeterministicFakeEmbedding(size=8)
+
+    def test_round_trip(self) -> None:
+        """Chunks and vectors are read back as written, across batches."""
+        rows = interchange.write(
+            self.path,
+            self.docs,
+            self.embedding,
+            batch_size=2,
+        )
+        self.assertEqual(rows, 5)
+        batches = list(interchange.read(self.path))
+        self.assertEqual(len(batches), 3)
+        self.assertEqual(
+            [doc for docs, _ in batches for doc in docs],
+            self.docs,
+        )
+        np.testing.assert_allclose(
+            np.concatenate([vectors for _, vectors in batches]),
+            self.embedding.embed_documents(
+                [doc.page_content for doc in self.docs],
+            ),
+            rtol=1e-6,
+        )
+
+    def test_load_into(self) -> None:
+        """A storage is loaded batch by batch, without embedding again."""
+        interchange.write(self.path, self.docs, self.embedding, batch_size=2)
+        storage = persisting.FAISSStorage(_OfflineEmbedding(size=8))
+        with mock.patch.object(
+            storage,
+            "add_embedded",
+            wraps=storage.add_embedded,
+        ) as add_embedded:
+            store = interchange.load_into(self.path, storage)
+        self.assertEqual(add_embedded.call_count, 2)
+        self.assertEqual(
+            [
+                store.docstore.search(doc_id).page_content
+                for doc_id in store.index_to_docstore_id.values()
+            ],
+            [doc.page_content for doc in self.docs],
+        )
+        np.testing.assert_allclose(
+            store.index.reconstruct_n(0, 5),
+            self.embedding.embed_documents(
+                [doc.page_content for doc in self.docs],
+            ),
+            rtol=1e-6,
+        )
+
+    def test_load_empty(self) -> None:
+        """A file without chunks leaves the storage as it was."""
+        interchange.write(self.path, [], self.embedding)
+        storage = persisting.FAISSStorage(_OfflineEmbedding(size=8))
+        with mock.patch.object(storage, "store_embedded") as store_embedded:
+            self.assertIsNone(interchange.load_into(self.path, storage))
+        store_embedded.assert_not_called()
+
+    def test_no_embeddings(self) -> None:
+        """Chunks without embeddings cannot be bulk-loaded."""
+        interchange.write(self.path, self.docs)
+        self.assertIsNone(interchange.embedding_model(self.path))
+        with self.assertRaises(ValueError):
+            interchange.load_into(
+                self.path,
+                persisting.FAISSStorage(self.embedding),
+            )
@@ -0,0 +1,63 @@
+"""Unit tests for json_stream.py."""
+
+import io
+import json
+import unittest
+
+from src.rag_pipeline import json_stream
+
+
+class TestIterPath(unittest.TestCase):
+    """Tests for iter_path."""
+
+    def test_split_tokens(self) -> None:
+        """Values split across chunks are decoded whole."""
+        document = {
+            "skipped": [{"a": "]}\\"}, -1.5e10],
+            "items": [12345678901234, 'a "quoted" [string]', {"b": None}],
+        }
+        for chunk_size in (1, 2, 7):
+            self.assertEqual(
+                list(
+                    json_stream.iter_path(
+                        io.StringIO(json.dumps(document)),
+                        ".items[]",
+                        chunk_size,
+                    ),
+                ),
+                document["items"],
+            )
+
+    def test_nested_path(self) -> None:
+        """Steps after the streamed array apply to every element."""
+        text = json.dumps(
+            {"messages": [{"content": "hi"}, {"photo": 1}, {"content": "bye"}]},
+        )
+        self.assertEqual(
+            list(
+                json_stream.iter_path(io.StringIO(text), ".messages[].content"),
+            ),
+            ["hi", "bye"],
+        )
+
+    def test_parse_path(self) -> None:
+        """Keys, quoted keys and iterations are supported."""
+        self.assertEqual(json_stream.parse_path("."), [])
+        self.assertEqual(
+            json_stream.parse_path('.["a key"][].b'),
+            ["a key", None, "b"],
+        )
+        with self.assertRaises(ValueError):
+            json_stream.parse_path(".a | .b")
+
+
+class TestIterLines(unittest.TestCase):
+    """Tests for iter_lines."""
+
+    def test_iter_lines(self) -> None:
+        """The path is applied to every line, skipping blank ones."""
+        text = '{"text": "first"}\n\n{"text": "second"}\n'
+        self.assertEqual(
+            list(json_stream.iter_lines(io.StringIO(text), ".text")),
+            ["first", "second"],
+        )
@@ -0,0 +1,126 @@
+"""Unit tests for lm_vs_lm.py."""
+
+import typing
+import unittest
+from unittest import mock
+
+from parea.schemas.log import Log
+
+from src.rag_pipeline import caching, concurrency
+from src.rag_pipeline.mad_skillz import lm_vs_lm
+
+OUTPUT = "Paris is the capital of France. Berlin is the capital of Spain."
+
+
+class TestVerdictPattern(unittest.TestCase):
+    """Tests for VERDICT_PATTERN."""
+
+    def test_verdicts(self) -> None:
+        """Verdicts are found whatever their case and punctuation."""
+        for response, verdict in (
+            ("Verdict: correct", "correct"),
+            ("I am sure now. VERDICT: Incorrect.", "Incorrect"),
+            ("**Verdict:** *correct*", "correct"),
+            ("Verdict:\nincorrect", "incorrect"),
+        ):
+            with self.subTest(response=response):
+                match = lm_vs_lm.VERDICT_PATTERN.search(response)
+                if match is None:
+                    self.fail(f"No verdict in {response!r}.")
+                self.assertEqual(match.group(1), verdict)
+
+    def test_no_verdict(self) -> None:
+        """Questions and hedges are not verdicts."""
+        for response in (
+            "Is it correct that Paris is in France?",
+            "The verdict is not clear yet.",
+        ):
+            with self.subTest(response=response):
+                self.assertIsNone(lm_vs_lm.VERDICT_PATTERN.search(response))
+
+
+class TestLmVsLmClaims(unittest.TestCase):
+    """Tests for lm_vs_lm_claims_factory, with stubbed LLMs."""
+
+    @typing.override
+    def setUp(self) -> None:
+        self.log = Log(inputs={"question": "Capitals?"}, output=OUTPUT)
+        self.examiner_calls: list[str] = []
+        self.examiner = self._examine
+        self.enterContext(
+            mock.patch.object(caching, "cached_call_openai", self._call),
+        )
+        self.enterContext(
+            mock.patch.object(
+                lm_vs_lm,
+                "_ask_examinee",
+                lambda *_: "Berlin is the capital of Germany.",
+            ),
+        )
+
+    def _call(
+        self,
+        _: caching.LLMCache | None,
+        messages: list[dict[str, str]],
+        **__: object,
+    ) -> str:
+        _prompt = "\n".join(message["content"] for message in messages)
+        self.examiner_calls.append(_prompt)
+        return self.examiner(_prompt)
+
+    @staticmethod
+    def _examine(prompt: str) -> str:
+        if "Paris" in prompt:
+            return "Verdict: correct"
+        if "Germany" in prompt:
+            return "Verdict: incorrect"
+        return "What is the capital of Germany?"
+
+    def test_claims(self) -> None:
+        """Every claim is verified, and stops at its verdict."""
+        self.assertEqual(
+            lm_vs_lm.lm_vs_lm_claims_factory()(self.log),
+            0.5,
+        )
+        # One call for Paris, a question and a verdict for Berlin.
+        self.assertEqual(len(self.examiner_calls), 3)
+
+    def test_decision(self) -> None:
+        """Without a verdict, the examiner decides after max_rounds."""
+        self.examiner = lambda prompt: (
+            "I think it is incorrect."
+            if "conclusion" in prompt
+            else "Any more details?"
+        )
+        self.assertEqual(
+            lm_vs_lm.lm_vs_lm_claims_factory(max_rounds=2)(
+                Log(output="Berlin is the capital of Spain."),
+            ),
+            0.0,
+        )
+        # The setup, two rounds and the decision.
+        self.assertEqual(len(self.examiner_calls), 4)
+
+    def test_compaction(self) -> None:
+        """A long interview is summarized instead of re-sent."""
+        self.examiner = lambda _: "Any more details?"
+        lm_vs_lm.lm_vs_lm_claims_factory(
+            max_rounds=3,
+            max_history_messages=3,
+        )(Log(output="Berlin is the capital of Spain."))
+        self.assertTrue(
+            any("Summarize" in prompt for prompt in self.examiner_calls),
+        )
+        self.assertLessEqual(
+            max(
+                prompt.count("Any more details?")
+                for prompt in self.examiner_calls
+            ),
+            2,
+        )
+
+    def test_rate_limit_per_call(self) -> None:
+        """Every examiner call acquires the limiter."""
+        with mock.patch.object(concurrency.RateLimiter, "acquire") as acquire:
+            lm_vs_lm.lm_vs_lm_claims_factory()(self.log)
+        self.assertEqual(acquire.call_count, len(self.examiner_calls))
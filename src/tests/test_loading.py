@@ -1,11 +1,15 @@
 """Unit tests for loading.py."""
 
+import pathlib
+import tempfile
 import typing
 import unittest
 
+import pypdf
 from langchain_core import documents
+from pypdf import generic
 
-from src.rag_pipeline import loading
+from src.rag_pipeline import loading, pdf_pages
 
 PATH_TO_HTML = "src/tests/resources/documents/economic_policy.html"
 PATH_TO_MARKDOWN = "src/tests/resources/documents/markdown_example.md"
@@ -28,6 +32,24 @@ class TestMarkdownLoader(unittest.TestCase):
         self.assertIsInstance(self.loader.load()[0], documents.Document)
 
 
+class TestStreamingMarkdownLoader(unittest.TestCase):
+    """Tests for MarkdownLoader with the "stream" strategy."""
+
+    @classmethod
+    @typing.override
+    def setUpClass(cls) -> None:
+        cls.loader = loading.MarkdownLoader(
+            PATH_TO_MARKDOWN,
+            strategy="stream",
+        )
+
+    def test_load(self) -> None:
+        """A document per section is returned, with its headers."""
+        docs = self.loader.load()
+        self.assertEqual(docs[0].metadata["Header 1"], "Foobar")
+        self.assertEqual(docs[-1].metadata["Header 2"], "License")
+
+
 class TestHTMLLoader(unittest.TestCase):
     """Tests for HTMLLoader."""
 
@@ -41,6 +63,21 @@ class TestHTMLLoader(unittest.TestCase):
         self.assertIsInstance(self.loader.load()[0], documents.Document)
 
 
+class TestLXMLHTMLLoader(unittest.TestCase):
+    """Tests for HTMLLoader with the "lxml" strategy."""
+
+    @classmethod
+    @typing.override
+    def setUpClass(cls) -> None:
+        cls.loader = loading.HTMLLoader(PATH_TO_HTML, strategy="lxml")
+
+    def test_load(self) -> None:
+        """A document per section is returned, with its headers."""
+        docs = self.loader.load()
+        self.assertEqual(docs[1].metadata["Header 1"], "Introduction")
+        self.assertTrue(all(doc.page_content for doc in docs))
+
+
 class TestPDFLoader(unittest.TestCase):
     """Tests for PDFLoader."""
 
@@ -98,3 +135,162 @@ class TestFileSystemLoader(unittest.TestCase):
     def test_load(self) -> None:
         """A list of Document objects is successfully returned."""
         self.assertIsInstance(self.loader.load()[0], documents.Document)
+
+
+class TestStreamingCSVLoader(unittest.TestCase):
+    """Tests for StreamingCSVLoader."""
+
+    @classmethod
+    @typing.override
+    def setUpClass(cls) -> None:
+        cls.fieldnames = ["first", "last", "address", "city", "state", "zip"]
+
+    def test_load(self) -> None:
+        """Quoted fields are parsed and rows grouped into documents."""
+        docs = loading.StreamingCSVLoader(
+            PATH_TO_CSV,
+            fieldnames=self.fieldnames,
+        ).load()
+        self.assertEqual(len(docs), 1)
+        self.assertIn('first: Joan "the bone", Anne', docs[0].page_content)
+        self.assertEqual(docs[0].metadata["last_row"], 5)
+
+    def test_columns(self) -> None:
+        """Columns are selected and typed, one row per document."""
+        docs = list(
+            loading.StreamingCSVLoader(
+                PATH_TO_CSV,
+                columns=["address", "zip"],
+                column_types={"zip": int},
+                fieldnames=self.fieldnames,
+                batch_rows=2,
+                max_document_size=None,
+            ).lazy_load(),
+        )
+        self.assertEqual(len(docs), 6)
+        self.assertEqual(
+            docs[3].page_content,
+            'address: 7452 Terrace "At the Plaza" road\nzip: 91234',
+        )
+
+
+class TestStreamingJSONLoader(unittest.TestCase):
+    """Tests for StreamingJSONLoader."""
+
+    def test_load(self) -> None:
+        """The values matching the path are loaded in order."""
+        docs = loading.StreamingJSONLoader(
+            PATH_TO_JSON,
+            ".messages[].content",
+            chunk_size=16,
+        ).load()
+        self.assertEqual(docs[0].page_content, "Bye!")
+        self.assertEqual(docs[-1].metadata["seq_num"], len(docs))
+
+    def test_objects(self) -> None:
+        """Values which are not strings are serialized."""
+        docs = loading.StreamingJSONLoader(
+            PATH_TO_JSON,
+            ".participants[]",
+        ).load()
+        self.assertEqual(
+            [doc.page_content for doc in docs],
+            ['{"name": "User 1"}', '{"name": "User 2"}'],
+        )
+
+
+def _pdf_dictionary(**entries: object) -> generic.DictionaryObject:
+    return generic.DictionaryObject(
+        {
+            generic.NameObject(f"/{key}"): value
+            for key, value in entries.items()
+        },
+    )
+
+
+def _write_pdf(path: pathlib.Path, pages: int) -> None:
+    """Write a PDF whose every page reads "Page N."."""
+    _font = _pdf_dictionary(
+        Type=generic.NameObject("/Font"),
+        Subtype=generic.NameObject("/Type1"),
+        BaseFont=generic.NameObject("/Helvetica"),
+    )
+    _writer = pypdf.PdfWriter()
+    for _number in range(1, pages + 1):
+        _page = _writer.add_blank_page(200, 200)
+        _page[generic.NameObject("/Resources")] = _pdf_dictionary(
+            Font=_pdf_dictionary(F1=_font),
+        )
+        _content = generic.DecodedStreamObject()
+        _content.set_data(
+            f"BT /F1 12 Tf 20 100 Td (Page {_number}.) Tj ET".encode(),
+        )
+        _page.replace_contents(_content)
+    _writer.write(path)
+
+
+class TestParallelPDFLoader(unittest.TestCase):
+    """Tests for ParallelPDFLoader."""
+
+    @typing.override
+    def setUp(self) -> None:
+        _directory = pathlib.Path(
+            self.enterContext(tempfile.TemporaryDirectory()),
+        )
+        self.cache_dir = _directory / "cache"
+        self.path = _directory / "document.pdf"
+        _write_pdf(self.path, 3)
+
+    def _load(self) -> list[documents.Document]:
+        return loading.ParallelPDFLoader(
+            self.path,
+            strategy="text",
+            max_workers=2,
+            pages_per_task=1,
+            cache_dir=self.cache_dir,
+        ).load()
+
+    def test_load(self) -> None:
+        """One document per page is returned, and every page cached."""
+        docs = self._load()
+        self.assertEqual(
+            [doc.page_content for doc in docs],
+            ["Page 1.", "Page 2.", "Page 3."],
+        )
+        self.assertEqual(
+            [doc.metadata["page_number"] for doc in docs],
+            [1, 2, 3],
+        )
+        self.assertFalse(
+            pdf_pages.PageCache(self.cache_dir).missing(
+                pdf_pages.file_hash(self.path),
+                "text",
+                [1, 2, 3],
+            ),
+        )
+
+    def test_corrupted_page(self) -> None:
+        """A corrupted cached page is extracted again."""
+        self._load()
+        cache = pdf_pages.PageCache(self.cache_dir)
+        digest = pdf_pages.file_hash(self.path)
+        cache.path(digest, "text", 2).write_text("[{", encoding="utf-8")
+        self.assertEqual(self._load()[1].page_content, "Page 2.")
+        self.assertEqual(cache.get(digest, "text", 2)[0]["text"], "Page 2.")
+
+    def test_cache(self) -> None:
+        """Cached pages are returned as they were put."""
+        cache = pdf_pages.PageCache(self.cache_dir)
+        elements = [{"text": "Page one.", "category": "Title"}]
+        cache.put("digest", "text", 1, elements)
+        self.assertEqual(cache.get("digest", "text", 1), elements)
+        self.assertEqual(cache.missing("digest", "text", [1, 2]), [2])
+
+    def test_corrupted_cache(self) -> None:
+        """A corrupted page is missing, and removed from the cache."""
+        cache = pdf_pages.PageCache(self.cache_dir)
+        cache.put("digest", "text", 1, [])
+        cache.path("digest", "text", 1).write_text("[{", encoding="utf-8")
+        with self.assertLogs(pdf_pages.logger, "WARNING"):
+            self.assertEqual(cache.missing("digest", "text", [1]), [1])
+        self.assertFalse(cache.path("digest", "text", 1).exists())
@@ -0,0 +1,213 @@
+"""Unit tests for local_embeddings.py."""
+
+import os
+import pathlib
+import types
+import typing
+import unittest
+from unittest import mock
+
+import numpy as np
+import onnxruntime
+import threadpoolctl
+import transformers
+from langchain_core import embeddings
+
+from src.rag_pipeline import local_embeddings
+
+
+class _FakeTokenizer:
+    """Tokenizer giving every word of a text the text's word count."""
+
+    def __call__(
+        self,
+        texts: list[str],
+        **_: object,
+    ) -> dict[str, list[list[int]]]:
+        _ids = [[len(text.split())] * len(text.split()) for text in texts]
+        return {
+            "input_ids": _ids,
+            "attention_mask": [[1] * len(ids) for ids in _ids],
+        }
+
+    @staticmethod
+    def pad(
+        encodings: list[dict[str, list[int]]],
+        **_: object,
+    ) -> dict[str, np.ndarray]:
+        _width = max(len(encoding["input_ids"]) for encoding in encodings)
+        return {
+            name: np.array(
+                [
+                    encoding[name] + [0] * (_width - len(encoding[name]))
+                    for encoding in encodings
+                ],
+            )
+            for name in encodings[0]
+        }
+
+
+class _FakeSession:
+    """Session whose hidden state of a token is [token id, position]."""
+
+    def __init__(self) -> None:
+        self.widths: list[int] = []
+
+    @staticmethod
+    def get_inputs() -> list[types.SimpleNamespace]:
+        """Return the inputs of the model."""
+        return [
+            types.SimpleNamespace(name="input_ids"),
+            types.SimpleNamespace(name="attention_mask"),
+        ]
+
+    def run(
+        self,
+        _: None,
+        feeds: dict[str, np.ndarray],
+    ) -> list[np.ndarray]:
+        """Return the hidden states of a padded batch."""
+        _ids = feeds["input_ids"]
+        self.widths.append(_ids.shape[1])
+        _positions = np.broadcast_to(np.arange(_ids.shape[1]), _ids.shape)
+        return [np.stack([_ids, _positions], axis=-1).astype(np.float32)]
+
+
+class _FakeEmbeddings(embeddings.Embeddings):
+    """Embeddings of a text as [length, threads, BLAS threads, process id]."""
+
+    def __init__(self, _: str, __: str, num_threads: int) -> None:
+        self.num_threads = num_threads
+
+    @typing.override
+    def embed_documents(self, texts: list[str]) -> list[list[float]]:
+        _blas_threads = max(
+            (pool["num_threads"] for pool in threadpoolctl.threadpool_info()),
+            default=0,
+        )
+        return [
+            [len(text), self.num_threads, _blas_threads, os.getpid()]
+            for text in texts
+        ]
+
+    @typing.override
+    def embed_query(self, text: str) -> list[float]:
+        return self.embed_documents([text])[0]
+
+
+class TestONNXEmbeddings(unittest.TestCase):
+    """Tests for ONNXEmbeddings, with a stubbed session and tokenizer."""
+
+    @typing.override
+    def setUp(self) -> None:
+        self.session = _FakeSession()
+        self.enterContext(
+            mock.patch.object(
+                local_embeddings,
+                "export",
+                return_value=pathlib.Path("model.onnx"),
+            ),
+        )
+        self.enterContext(
+            mock.patch.object(
+                onnxruntime,
+                "InferenceSession",
+                return_value=self.session,
+            ),
+        )
+        self.enterContext(
+            mock.patch.object(
+                transformers.AutoTokenizer,
+                "from_pretrained",
+                return_value=_FakeTokenizer(),
+            ),
+        )
+        self.texts = ["a b c d e", "a", "a b c d", "a b"]
+
+    def test_order_restored(self) -> None:
+        """Vectors come back in the order of the texts."""
+        vectors = local_embeddings.ONNXEmbeddings(
+            batch_size=2,
+            normalize=False,
+        ).embed_documents(self.texts)
+        self.assertEqual([vector[0] for vector in vectors], [5, 1, 4, 2])
+
+    def test_length_buckets(self) -> None:
+        """Texts of similar lengths are padded together."""
+        local_embeddings.ONNXEmbeddings(batch_size=2).embed_documents(
+            self.texts,
+        )
+        # Sorted by length: 1 and 2 words, then 4 and 5 words.
+        self.assertEqual(self.session.widths, [2, 5])
+
+    def test_mean_pooling_ignores_padding(self) -> None:
+        """Padded positions do not count towards the mean."""
+        vectors = local_embeddings.ONNXEmbeddings(
+            batch_size=4,
+            normalize=False,
+        ).embed_documents(self.texts)
+        # The mean position of n tokens is (n - 1) / 2.
+        self.assertEqual([vector[1] for vector in vectors], [2, 0, 1.5, 0.5])
+
+    def test_cls_pooling_normalized(self) -> None:
+        """CLS pooling keeps the first token, scaled to unit length."""
+        vectors = local_embeddings.ONNXEmbeddings(
+            pooling="cls",
+        ).embed_documents(self.texts)
+        np.testing.assert_allclose(vectors, [[1, 0]] * 4)
+
+    def test_empty(self) -> None:
+        """No texts need no inference."""
+        self.assertEqual(
+            local_embeddings.ONNXEmbeddings().embed_documents([]),
+            [],
+        )
+        self.assertEqual(self.session.widths, [])
+
+
+class TestGetEmbeddings(unittest.TestCase):
+    """Tests for get_embeddings."""
+
+    def test_unknown_backend(self) -> None:
+        """Unknown backends are rejected."""
+        with self.assertRaises(ValueError):
+            local_embeddings.get_embeddings(backend="tensorflow")
+
+
+class TestEmbeddingPool(unittest.TestCase):
+    """Tests for EmbeddingPool, with two workers and fake embeddings."""
+
+    @classmethod
+    @typing.override
+    def setUpClass(cls) -> None:
+        cls.pool = local_embeddings.EmbeddingPool(
+            backend="onnx",
+            processes=2,
+            threads_per_process=3,
+            batch_size=2,
+            factory=_FakeEmbeddings,
+        )
+        cls.addClassCleanup(cls.pool.close)
+
+    def test_dimension(self) -> None:
+        """The dimension is read from the workers' model."""
+        self.assertEqual(self.pool.dimension, 4)
+
+    def test_order_and_values(self) -> None:
+        """Vectors written by the workers come back in order."""
+        vectors = self.pool.embed_documents(["a" * i for i in range(9)])
+        self.assertEqual([vector[0] for vector in vectors], list(range(9)))
+        self.assertEqual({vector[1] for vector in vectors}, {3})
+        self.assertNotIn(os.getpid(), {vector[3] for vector in vectors})
+
+    def test_blas_threads(self) -> None:
+        """The BLAS pool numpy loaded in a worker is limited too."""
+        self.assertEqual(self.pool.embed_query("a")[2], 3)
+
+    def test_query(self) -> None:
+        """A query is embedded by a worker too."""
+        self.assertEqual(self.pool.embed_query("a" * 7)[0], 7)
+
+    def test_empty(self) -> None:
+        """No texts need no workers."""
+        self.assertEqual(self.pool.embed_documents([]), [])
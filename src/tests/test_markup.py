@@ -0,0 +1,126 @@
+"""Unit tests for markup.py."""
+
+import pathlib
+import tempfile
+import unittest
+
+from src.rag_pipeline import markup
+
+MARKDOWN = """Title
+=====
+
+Intro.
+
+## Usage
+
+```python
+# not a header
+```
+
+| a | b |
+|---|---|
+| 1 | 2 |
+
+#### Untracked
+"""
+HTML = """<html><head><title>Skipped</title><script>skipped()</script></head>
+<body><h1>Title</h1><div>Loose <b>bold</b><p>First.</p></div>
+<h2>Usage</h2><pre>x = 1
+y = 2</pre><table><tr><th>a</th><th>b</th></tr><tr><td>1</td><td>2</td></tr>
+</table></body></html>"""
+
+
+class TestIterMarkdownBlocks(unittest.TestCase):
+    """Tests for iter_markdown_blocks."""
+
+    def test_blocks(self) -> None:
+        """Code and tables are kept whole, and headers tracked."""
+        blocks = list(
+            markup.iter_markdown_blocks(MARKDOWN.splitlines(keepends=True)),
+        )
+        self.assertEqual(
+            [(block.kind, block.text) for block in blocks],
+            [
+                ("text", "Intro."),
+                ("code", "```python\n# not a header\n```"),
+                ("table", "| a | b |\n|---|---|\n| 1 | 2 |"),
+                ("text", "#### Untracked"),
+            ],
+        )
+        self.assertEqual(
+            blocks[-1].headers,
+            {"Header 1": "Title", "Header 2": "Usage"},
+        )
+
+    def test_sections(self) -> None:
+        """Blocks under the same headers are joined."""
+        sections = list(
+            markup.iter_sections(
+                markup.iter_markdown_blocks(MARKDOWN.splitlines()),
+            ),
+        )
+        self.assertEqual(len(sections), 2)
+        self.assertEqual(sections[0].headers, {"Header 1": "Title"})
+
+
+class TestIterHTMLBlocks(unittest.TestCase):
+    """Tests for iter_html_blocks."""
+
+    def test_blocks(self) -> None:
+        """Text outside the body is skipped, and headers tracked."""
+        with tempfile.TemporaryDirectory() as directory:
+            path = pathlib.Path(directory) / "page.html"
+            path.write_text(HTML, encoding="utf-8")
+            blocks = list(markup.iter_html_blocks(path))
+        self.assertEqual(
+            [(block.kind, block.text) for block in blocks],
+            [
+                ("text", "Loose bold"),
+                ("text", "First."),
+                ("code", "x = 1\ny = 2"),
+                ("table", "a | b\n1 | 2"),
+            ],
+        )
+        self.assertEqual(
+            blocks[-1].headers,
+            {"Header 1": "Title", "Header 2": "Usage"},
+        )
+
+
+class TestIterChunks(unittest.TestCase):
+    """Tests for iter_chunks."""
+
+    def test_bounds(self) -> None:
+        """Text is split to fit, with overlap, but code is kept whole."""
+        headers = {"Header 1": "Title"}
+        blocks = [
+            markup.Block("One two. Three four. Five six.", headers),
+            markup.Block("```\n" + "x" * 30 + "\n```", headers, "code"),
+        ]
+        chunks = [chunk.text for chunk in markup.iter_chunks(blocks, 25, 12)]
+        self.assertEqual(
+            chunks,
+            ["One two. Three four.", "Three four. Five six.", blocks[1].text],
+        )
+
+    def test_leading_indentation(self) -> None:
+        """A chunk starting with indented code keeps its indentation."""
+        blocks = [
+            markup.Block("    indented code\n    more", {}, "code"),
+            markup.Block("Text.", {}),
+        ]
+        self.assertEqual(
+            [chunk.text for chunk in markup.iter_chunks(blocks, 30)],
+            ["    indented code\n    more", "Text."],
+        )
+
+    def test_sections(self) -> None:
+        """Chunks never span two sections."""
+        blocks = [
+            markup.Block("First.", {"Header 1": "A"}),
+            markup.Block("Second.", {"Header 1": "B"}),
+        ]
+        self.assertEqual(
+            [chunk.headers for chunk in markup.iter_chunks(blocks)],
+            [{"Header 1": "A"}, {"Header 1": "B"}],
+        )
@@ -0,0 +1,126 @@
+"""Unit tests for pipeline.py."""
+
+import pathlib
+import tempfile
+import time
+import typing
+import unittest
+from unittest import mock
+
+from langchain_core import documents, embeddings
+
+from src.rag_pipeline import (
+    chunk_batches,
+    deduplicating,
+    persisting,
+    pipeline,
+    quality_metrics,
+)
+
+
+class _FakeEvaluation(quality_metrics.BaseEvaluation):
+    """Evaluation returning a fixed score after a delay."""
+
+    @typing.override
+    def __init__(self, score: float, delay: float = 0) -> None:
+        self.score = score
+        self.delay = delay
+
+    @typing.override
+    def evaluate(self) -> float:
+        time.sleep(self.delay)
+        if self.score < 0:
+            msg = "Evaluation failed."
+            raise RuntimeError(msg)
+        return self.score
+
+
+class TestRAGPipelineEvaluate(unittest.TestCase):
+    """Tests for RAGPipeline.evaluate."""
+
+    def test_evaluate(self) -> None:
+        """The scores are averaged into a percentage."""
+        _pipeline = pipeline.RAGPipeline(
+            evaluators=[_FakeEvaluation(1), _FakeEvaluation(0.5)],
+        )
+        self.assertEqual(_pipeline.evaluate(), 75)
+        self.assertEqual(_pipeline.evaluate(parallel=True), 75)
+
+    def test_parallel_isolates_failures(self) -> None:
+        """Failing and timed out evaluators are left out."""
+        _pipeline = pipeline.RAGPipeline(
+            evaluators=[
+                _FakeEvaluation(1),
+                _FakeEvaluation(-1),
+                _FakeEvaluation(0, delay=1),
+            ],
+        )
+        _results = _pipeline.evaluate_each(parallel=True, timeout=0.5)
+        self.assertEqual(_results[0].score, 1)
+        self.assertIsNotNone(_results[1].error)
+        self.assertEqual(_results[2].error, "Timed out.")
+        self.assertEqual(_pipeline.evaluate(parallel=True, timeout=0.5), 100)
+
+    def test_parallel_wall_time(self) -> None:
+        """Evaluators run concurrently."""
+        _pipeline = pipeline.RAGPipeline(
+            evaluators=[_FakeEvaluation(1, delay=0.2) for _ in range(5)],
+        )
+        _start = time.perf_counter()
+        _pipeline.evaluate(parallel=True)
+        self.assertLess(time.perf_counter() - _start, 0.6)
+
+
+class TestRAGPipelinePersist(unittest.TestCase):
+    """Tests for RAGPipeline.persist_documents."""
+
+    @typing.override
+    def setUp(self) -> None:
+        _directory = self.enterContext(tempfile.TemporaryDirectory())
+        self.path = pathlib.Path(_directory) / "signatures.npz"
+        self.pipeline = pipeline.RAGPipeline(
+            persister=persisting.FAISSStorage(
+                embeddings.DeterministicFakeEmbedding(size=8),
+            ),
+            deduplicator=deduplicating.Deduplicator(index_path=self.path),
+        )
+        self.docs = self.pipeline.deduplicate_documents(
+            [documents.Document(page_content="A chunk.")],
+        )
+
+    def test_signatures_saved(self) -> None:
+        """The signatures are saved once the chunks are stored."""
+        self.pipeline.persist_documents(self.docs)
+        self.assertTrue(self.path.exists())
+
+    def test_slices(self) -> None:
+        """A batch is stored a slice at a time."""
+        batch = chunk_batches.ChunkBatch()
+        for index in range(5):
+            batch.append(f"Chunk {index}.", {"index": index})
+        with mock.patch.object(
+            chunk_batches.ChunkBatch,
+            "to_documents",
+            side_effect=AssertionError("Converted at once."),
+        ):
+            store = self.pipeline.persist_documents(batch, batch_size=2)
+        self.assertEqual(
+            [
+                store.docstore.search(doc_id).metadata["index"]
+                for doc_id in store.index_to_docstore_id.values()
+            ],
+            list(range(5)),
+        )
+
+    def test_failure(self) -> None:
+        """The signatures are not saved if the chunks are not stored."""
+        with (
+            mock.patch.object(
+                persisting.FAISSStorage,
+                "store",
+                side_effect=RuntimeError("Store failed."),
+            ),
+            self.assertRaises(RuntimeError),
+        ):
+            self.pipeline.persist_documents(self.docs)
+        self.assertFalse(self.path.exists())
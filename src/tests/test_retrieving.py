@@ -0,0 +1,132 @@
+"""Unit tests for retrieving.py."""
+
+import time
+import typing
+import unittest
+from unittest import mock
+
+import sentence_transformers
+from langchain_community import vectorstores
+from langchain_core import documents, embeddings
+
+from src.rag_pipeline import retrieving
+
+
+class _FakeCrossEncoder:
+    """Cross-encoder scoring a chunk by the number it ends with."""
+
+    def __init__(self) -> None:
+        self.delay = 0.0
+        self.scored: list[str] = []
+
+    def predict(
+        self,
+        pairs: list[tuple[str, str]],
+        **__: object,
+    ) -> list[float]:
+        """Return the score of every pair."""
+        time.sleep(self.delay)
+        self.scored.extend(text for _, text in pairs)
+        return [float(text.split()[-1]) for _, text in pairs]
+
+
+def _chunks(*scores: int) -> list[documents.Document]:
+    return [documents.Document(page_content=f"chunk {i}") for i in scores]
+
+
+class TestCrossEncoderScorer(unittest.TestCase):
+    """Tests for CrossEncoderScorer, with a stubbed model."""
+
+    @typing.override
+    def setUp(self) -> None:
+        self.model = _FakeCrossEncoder()
+        with mock.patch.object(
+            sentence_transformers,
+            "CrossEncoder",
+            return_value=self.model,
+        ):
+            self.scorer = retrieving.CrossEncoderScorer(batch_size=2)
+
+    def test_rank(self) -> None:
+        """Candidates are ordered by decreasing score."""
+        self.assertEqual(
+            self.scorer.rank("query", _chunks(1, 3, 0, 2)),
+            [1, 3, 0, 2],
+        )
+
+    def test_cache_hits(self) -> None:
+        """Pairs scored before are not scored again."""
+        self.scorer.rank("query", _chunks(1, 3, 0))
+        self.scorer.rank("query", _chunks(0, 2, 3))
+        self.assertEqual(
+            self.model.scored,
+            ["chunk 1", "chunk 3", "chunk 0", "chunk 2"],
+        )
+        self.scorer.rank("other query", _chunks(0))
+        self.assertEqual(len(self.model.scored), 5)
+
+    def test_eviction(self) -> None:
+        """The number of remembered scores stays within the maximum."""
+        self.scorer.max_cached_scores = 2
+        self.scorer.rank("query", _chunks(1, 3, 0))
+        self.scorer.rank("query", _chunks(1))
+        self.assertEqual(self.model.scored.count("chunk 1"), 2)
+
+    def test_budget_fallback(self) -> None:
+        """Out of time, the order is kept and partial scores remembered."""
+        self.model.delay = 0.05
+        with self.assertLogs(retrieving.logger, "WARNING"):
+            self.assertEqual(
+                self.scorer.rank("query", _chunks(1, 3, 0, 2), 0.01),
+                [0, 1, 2, 3],
+            )
+        # Only the first batch was scored before the budget ran out.
+        self.assertEqual(self.model.scored, ["chunk 1", "chunk 3"])
+        self.assertEqual(
+            self.scorer.rank("query", _chunks(1, 3, 0, 2)),
+            [1, 3, 0, 2],
+        )
+        self.assertEqual(len(self.model.scored), 4)
+
+
+class TestCrossEncoderRetriever(unittest.TestCase):
+    """Tests for CrossEncoderRetriever and RerankedRetriever."""
+
+    @typing.override
+    def setUp(self) -> None:
+        with mock.patch.object(
+            sentence_transformers,
+            "CrossEncoder",
+            return_value=_FakeCrossEncoder(),
+        ):
+            self.scorer = retrieving.CrossEncoderScorer()
+        self.storage = vectorstores.FAISS.from_documents(
+            _chunks(*range(12)),
+            embeddings.DeterministicFakeEmbedding(size=8),
+        )
+
+    def test_top_n(self) -> None:
+        """The best top_n of the overfetched candidates are returned."""
+        retriever = retrieving.CrossEncoderRetriever(
+            retrieving.StandardRetriever(self.storage),
+            self.scorer,
+            top_n=2,
+            overfetch=6,
+        ).get_retriever()
+        self.assertEqual(retriever.base_retriever.search_kwargs["k"], 12)
+        self.assertEqual(
+            [doc.page_content for doc in retriever.invoke("query")],
+            ["chunk 11", "chunk 10"],
+        )
+
+    def test_reranked_retriever(self) -> None:
+        """The candidates of the base retriever are reordered."""
+        retriever = retrieving.RerankedRetriever(
+            base_retriever=self.storage.as_retriever(search_kwargs={"k": 12}),
+            scorer=self.scorer,
+            top_n=3,
+        )
+        self.assertEqual(
+            [doc.page_content for doc in retriever.invoke("query")],
+            ["chunk 11", "chunk 10", "chunk 9"],
+        )
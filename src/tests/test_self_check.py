@@ -0,0 +1,86 @@
+"""Unit tests for self_check.py."""
+
+import typing
+import unittest
+from unittest import mock
+
+from parea.schemas.log import Log
+
+from src.rag_pipeline import caching
+from src.rag_pipeline.mad_skillz import self_check
+
+OUTPUT = "Paris is the capital of France. It has ten million inhabitants."
+
+
+class TestSelfCheckConcurrent(unittest.TestCase):
+    """Tests for self_check_concurrent, with a stubbed LLM."""
+
+    @typing.override
+    def setUp(self) -> None:
+        self.log = Log(inputs={"question": "What is Paris?"}, output=OUTPUT)
+        self.batch_answer = '["Yes", "No"]'
+        self.prompts: list[str] = []
+        self.enterContext(
+            mock.patch.object(caching, "cached_call_openai", self._answer),
+        )
+
+    def _answer(
+        self,
+        _: caching.LLMCache | None,
+        messages: list[dict[str, str]],
+        **__: object,
+    ) -> str:
+        _prompt = messages[0]["content"]
+        self.prompts.append(_prompt)
+        if "Question:" in _prompt:
+            return "Paris is the capital of France."
+        if "Sentences:" in _prompt:
+            return self.batch_answer
+        return "Yes" if "capital" in _prompt.split("Sentence:")[1] else "No"
+
+    def _calls(self, kind: str) -> int:
+        return sum(kind in prompt for prompt in self.prompts)
+
+    def test_batched(self) -> None:
+        """A parsable answer verifies all sentences in one call."""
+        self.assertEqual(
+            self_check.self_check_concurrent(self.log, use_llamafile=False),
+            0.5,
+        )
+        self.assertEqual(self._calls("Sentences:"), 5)
+        self.assertEqual(self._calls("Sentence:"), 0)
+
+    def test_answer_in_prose(self) -> None:
+        """The JSON list is found inside a longer answer."""
+        self.batch_answer = 'Here you go:\n["yes",\n "no"]\nHope it helps.'
+        self.assertEqual(
+            self_check.self_check_concurrent(self.log, use_llamafile=False),
+            0.5,
+        )
+        self.assertEqual(self._calls("Sentence:"), 0)
+
+    def test_malformed_json(self) -> None:
+        """Unparsable answers fall back to one call per sentence."""
+        for answer in ('["Yes", "No"', "[Yes, No]", '["Yes"]', "Yes, no"):
+            with self.subTest(answer=answer):
+                self.prompts.clear()
+                self.batch_answer = answer
+                self.assertEqual(
+                    self_check.self_check_concurrent(
+                        self.log,
+                        use_llamafile=False,
+                    ),
+                    0.5,
+                )
+                self.assertEqual(self._calls("Sentence:"), 10)
+
+    def test_matches_serial(self) -> None:
+        """Both versions agree on the score."""
+        self.assertEqual(
+            self_check.self_check_concurrent(
+                self.log,
+                use_llamafile=False,
+                batch_sentences=False,
+            ),
+            self_check.self_check(self.log, use_llamafile=False),
+        )
@@ -0,0 +1,34 @@
+"""Unit tests for structured_logging.py."""
+
+import logging
+import unittest
+
+from langchain_core import documents
+
+from src.rag_pipeline import structured_logging
+
+
+class TestStructuredLogging(unittest.TestCase):
+    """Tests for the structured logging helpers."""
+
+    def test_summarize_documents(self) -> None:
+        """Summaries hold sizes and hashes instead of the content."""
+        docs = [
+            documents.Document(page_content="first"),
+            documents.Document(page_content="second"),
+        ]
+        summary = structured_logging.summarize_documents(docs)
+        self.assertEqual(summary["count"], 2)
+        self.assertEqual(summary["bytes"], 11)
+        self.assertEqual(len(summary["ids"]), 2)
+        self.assertNotIn("first", str(summary))
+
+    def test_payloads_disabled_by_default(self) -> None:
+        """Only the summary is logged unless payloads are enabled."""
+        logger = logging.getLogger("test_structured_logging")
+        docs = [documents.Document(page_content="secret")]
+        with self.assertLogs(logger, logging.INFO) as logs:
+            structured_logging.log_documents(logger, "loaded", docs)
+        self.assertEqual(len(logs.records), 1)
+        self.assertEqual(logs.records[0].data["count"], 1)
+        self.assertNotIn("secret", str(logs.records[0].data))
@@ -0,0 +1,47 @@
+"""Unit tests for telemetry.py."""
+
+import unittest
+
+from langchain_core import documents
+
+from src.rag_pipeline import telemetry
+
+
+class TestMetricsRecorder(unittest.TestCase):
+    """Tests for MetricsRecorder."""
+
+    def test_span(self) -> None:
+        """Spans record their duration and counters."""
+        recorder = telemetry.MetricsRecorder()
+        with recorder.span("chunk") as span:
+            span.add_documents(
+                [documents.Document(page_content="abc")] * 2,
+            )
+        snapshot = recorder.snapshot()
+        self.assertEqual(snapshot["chunk"]["count"], 1)
+        self.assertEqual(snapshot["chunk"]["items"], 2)
+        self.assertEqual(snapshot["chunk"]["bytes"], 6)
+
+    def test_to_prometheus(self) -> None:
+        """Histogram buckets are cumulative and end with +Inf."""
+        recorder = telemetry.MetricsRecorder(buckets=(0.1, 1.0))
+        recorder.record("retrieve", 0.05)
+        recorder.record("retrieve", 0.5)
+        exposition = recorder.to_prometheus()
+        self.assertIn(
+            'rag_pipeline_stage_duration_seconds_bucket{stage="retrieve",'
+            'le="0.1"} 1',
+            exposition,
+        )
+        self.assertIn(
+            'rag_pipeline_stage_duration_seconds_bucket{stage="retrieve",'
+            'le="+Inf"} 2',
+            exposition,
+        )
+
+    def test_noop(self) -> None:
+        """The default telemetry records nothing."""
+        noop = telemetry.Telemetry()
+        with noop.span("load") as span:
+            span.add("items", 1)
+        self.assertFalse(noop.enabled)